@@ -0,0 +1,70 @@
+"""
+Scanning archived chats: dataclass materialization vs memory-mapped columns
+
+Run from the repository root:
+    python benchmarks/bench_archive.py [chats]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append('.')
+from src.henotace_ai import (
+    InMemoryConnector, SQLiteConnector, MmapArchiveConnector, write_mmap_archive,
+    SessionTutor, SessionSubject, SessionChat
+)
+
+
+def build(total, per_tutor=200):
+    connector = InMemoryConnector()
+    subject = SessionSubject(id='math', name='Math', topic='algebra')
+    for t in range(total // per_tutor):
+        chats = [
+            SessionChat(message=f"message {i} " + 'lorem ipsum ' * 8, is_reply=bool(i % 2), timestamp=i)
+            for i in range(per_tutor)
+        ]
+        connector.upsert_tutor(f"s{t}", SessionTutor(id='t0', name='t0', subject=subject, chats=chats))
+    return connector
+
+
+def timed(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<44}{elapsed:>9.3f} s{peak / 1e6:>10.1f} MB peak   -> {result}")
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    source = build(total)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteConnector(os.path.join(tmp, 'chats.db'))
+        db.set_all(source.get_all())
+        path = os.path.join(tmp, 'archive')
+        timed('write_mmap_archive', lambda: write_mmap_archive(source, path))
+        del source
+
+        def sqlite_scan():
+            replies = 0
+            for student in db.list_students():
+                for chat in db.list_chats(student.id, 't0'):
+                    replies += chat.is_reply
+            return replies
+        timed('SQLite list_chats -> SessionChat (is_reply)', sqlite_scan)
+
+        archive = MmapArchiveConnector(path)
+        timed('mmap columns (is_reply)', lambda: sum(sum(view.is_reply) for _, _, view in archive.scan()))
+        timed('mmap lazy chats (is_reply)', lambda: sum(chat.is_reply for _, _, view in archive.scan() for chat in view))
+        timed('mmap lazy chats (decode message)', lambda: sum(len(chat.message) for _, _, view in archive.scan() for chat in view))
+        archive.close()
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
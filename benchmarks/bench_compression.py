@@ -0,0 +1,96 @@
+"""
+Memory and disk saved by compressing chats outside the active window, and what it costs to read them
+
+Run from the repository root:
+    python benchmarks/bench_compression.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append('.')
+from src.henotace_ai import InMemoryConnector, SQLiteConnector, SessionChat, ZlibCodec, build_dictionary
+
+TUTORS = 200
+CHATS = 500
+WINDOW = 64
+
+PHRASES = [
+    "Let's work through this step by step.",
+    "Great question! First, isolate the variable on one side.",
+    "Remember that whatever you do to one side of the equation, you do to the other.",
+    "Can you tell me what you get when you subtract {a} from both sides?",
+    "Not quite. Check the sign when you move {a} across the equals sign.",
+    "How do I solve {a}x + {b} = {c}?",
+    "So x equals {a}? I divided {c} by {b}.",
+    "Exactly right, well done! Try the next one: {b}x - {a} = {c}.",
+]
+
+
+def history(seed):
+    rng = random.Random(seed)
+    chats = []
+    for i in range(CHATS):
+        text = ' '.join(rng.choice(PHRASES).format(a=rng.randint(1, 99), b=rng.randint(2, 9), c=rng.randint(10, 999))
+                        for _ in range(rng.randint(1, 3)))
+        chats.append(SessionChat(message=text, is_reply=bool(i % 2), timestamp=1_700_000_000_000 + i))
+    return chats
+
+
+def fill(connector):
+    for t in range(TUTORS):
+        connector.append_chats('s1', f"t{t}", history(t))
+    return connector
+
+
+def read_latency(connector, **window):
+    start = time.perf_counter()
+    for t in range(TUTORS):
+        for chat in connector.list_chats('s1', f"t{t}", **window):
+            chat.message
+    return (time.perf_counter() - start) / TUTORS * 1e6
+
+
+def memory(label, factory):
+    tracemalloc.start()
+    connector = fill(factory())
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>22}: {size / 2**20:7.1f} MiB  recent {read_latency(connector, limit=WINDOW):7.1f} us"
+          f"  full {read_latency(connector):8.1f} us  per tutor")
+
+
+def disk(label, directory, compression):
+    path = os.path.join(directory, f"{label}.db")
+    connector = fill(SQLiteConnector(path, compression=compression, active_window=WINDOW))
+    connector._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    connector._conn.execute("VACUUM")
+    size = os.path.getsize(path)
+    print(f"{label:>22}: {size / 2**20:7.1f} MiB  recent {read_latency(connector, limit=WINDOW):7.1f} us"
+          f"  full {read_latency(connector):8.1f} us  per tutor")
+    connector.close()
+
+
+if __name__ == '__main__':
+    samples = [chat.message for t in range(1000, 1020) for chat in history(t)]
+    shared = ZlibCodec(dictionary=build_dictionary(samples, size=4096))
+    print(f"{TUTORS} tutors x {CHATS} chats, active window {WINDOW}")
+
+    print('memory (tracemalloc)')
+    memory('list', lambda: InMemoryConnector())
+    memory('list + zlib', lambda: InMemoryConnector(compression='zlib', active_window=WINDOW))
+    memory('list + zlib dict', lambda: InMemoryConnector(compression=shared, active_window=WINDOW))
+    memory('columnar', lambda: InMemoryConnector(columnar=True))
+    memory('columnar + zlib', lambda: InMemoryConnector(columnar=True, compression='zlib', active_window=WINDOW))
+    memory('columnar + zlib dict',
+           lambda: InMemoryConnector(columnar=True, compression=shared, active_window=WINDOW))
+
+    print('disk (SQLite file after VACUUM)')
+    with tempfile.TemporaryDirectory() as directory:
+        disk('sqlite', directory, None)
+        disk('sqlite + zlib', directory, 'zlib')
+        disk('sqlite + zlib dict', directory, shared)
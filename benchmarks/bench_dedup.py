@@ -0,0 +1,96 @@
+"""
+Memory and disk used by 100k tutors sharing a few personas and context lists, with and without dedup
+
+Run from the repository root:
+    python benchmarks/bench_dedup.py
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append('.')
+from src.henotace_ai import InMemoryConnector, SQLiteConnector, SessionStudent, SessionTutor, SessionSubject
+
+STUDENTS = 10_000
+TUTORS_PER_STUDENT = 10
+PERSONAS = 20
+CONTEXTS = 50
+
+SUBJECT = SessionSubject(id='math', name='Math', topic='algebra')
+
+
+def dataset():
+    """100k tutors; every field value is a fresh object, as when loaded from JSON or a database"""
+    rng = random.Random(7)
+    personas = [f"You are tutor persona {p}. " + 'Explain each step patiently and check understanding. ' * 30
+                for p in range(PERSONAS)]
+    contexts = [[f"Curriculum {c} unit {u}: " + 'objectives and worked examples. ' * 5 for u in range(8)]
+                for c in range(CONTEXTS)]
+    students = []
+    for s in range(STUDENTS):
+        profile = {'grade': 6 + s % 6, 'language': 'en'}
+        students.append(SessionStudent(id=f"s{s}", name=f"Student {s}", tutors=[
+            SessionTutor(id=f"t{t}", name=f"Tutor {t}", subject=SUBJECT,
+                         persona=json.loads(json.dumps(rng.choice(personas))),
+                         context=json.loads(json.dumps(rng.choice(contexts))),
+                         user_profile=dict(profile))
+            for t in range(TUTORS_PER_STUDENT)
+        ]))
+    return students
+
+
+def load(students, dedup):
+    connector = InMemoryConnector(dedup=dedup)
+    for student in students:
+        connector.upsert_student(student)
+    return connector
+
+
+def memory(label, dedup):
+    students = dataset()
+    start = time.perf_counter()
+    load(students, dedup)
+    elapsed = time.perf_counter() - start
+    del students
+
+    # Traced from before the dataset is built, since the plain connector keeps it as is
+    tracemalloc.start()
+    connector = load(dataset(), dedup)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>18}: {size / 2**20:8.1f} MiB  load {elapsed:6.2f} s")
+
+
+def disk(label, directory, dedup):
+    path = os.path.join(directory, f"{label}.db")
+    connector = SQLiteConnector(path, synchronous='OFF', dedup=dedup)
+    students = dataset()
+    start = time.perf_counter()
+    connector.set_all({'students': students})
+    write = time.perf_counter() - start
+    connector._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    connector._conn.execute("VACUUM")
+    size = os.path.getsize(path)
+    start = time.perf_counter()
+    for s in range(0, STUDENTS, 10):
+        connector.list_tutors(f"s{s}")
+    read = (time.perf_counter() - start) / (STUDENTS // 10) * 1e6
+    print(f"{label:>18}: {size / 2**20:8.1f} MiB  write {write:6.2f} s  list_tutors {read:7.1f} us")
+    connector.close()
+
+
+if __name__ == '__main__':
+    total = STUDENTS * TUTORS_PER_STUDENT
+    print(f"{total:,} tutors, {PERSONAS} personas, {CONTEXTS} context lists\n")
+    print('InMemoryConnector (traced memory)')
+    memory('plain', dedup=False)
+    memory('dedup', dedup=True)
+    print('\nSQLiteConnector (file size after VACUUM)')
+    with tempfile.TemporaryDirectory() as directory:
+        disk('plain', directory, dedup=False)
+        disk('dedup', directory, dedup=True)
@@ -0,0 +1,58 @@
+"""
+Memory of a long-running server: InMemoryConnector vs EvictingConnector
+
+Students arrive one after another and a small hot set keeps chatting.
+Run from the repository root:
+    python benchmarks/bench_eviction.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append('.')
+from src.henotace_ai import InMemoryConnector, EvictingConnector, SQLiteConnector, SessionChat
+
+STUDENTS = 20_000
+CHATS = 20
+HOT = 100
+
+
+def chats(s):
+    return [SessionChat(message=f"How do I solve {i}x + {s} = {i * s}?", is_reply=bool(i % 2), timestamp=i)
+            for i in range(CHATS)]
+
+
+def run(label, connector):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for s in range(STUDENTS):
+        connector.append_chats(f"s{s}", 't1', chats(s))
+        connector.list_chats(f"s{s % HOT}", 't1', limit=10)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+
+    start = time.perf_counter()
+    for _ in range(100):
+        for s in range(HOT):
+            connector.list_chats(f"s{s}", 't1', limit=10)
+    hot = (time.perf_counter() - start) / (100 * HOT) * 1e6
+    start = time.perf_counter()
+    for s in range(HOT, HOT + 100):
+        connector.list_chats(f"s{s}", 't1', limit=10)
+    cold = (time.perf_counter() - start) / 100 * 1e6
+    tracemalloc.stop()
+    print(f"{label:>28}: {size / 2**20:7.1f} MiB held  ingest {elapsed:5.2f} s  "
+          f"hot read {hot:6.1f} us  cold read {cold:7.1f} us")
+    return connector
+
+
+if __name__ == '__main__':
+    print(f"{STUDENTS:,} students x {CHATS} chats, {HOT} hot students")
+    run('InMemoryConnector', InMemoryConnector())
+    with tempfile.TemporaryDirectory() as directory:
+        spill = SQLiteConnector(os.path.join(directory, 'spill.db'))
+        connector = run('EvictingConnector(1000)', EvictingConnector(spill, max_students=1000))
+        print(f"{'':>28}  {connector.stats}")
@@ -0,0 +1,56 @@
+"""
+Memory held by 1M chats in different representations
+
+Run from the repository root:
+    python benchmarks/bench_memory.py
+"""
+
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+sys.path.append('.')
+from src.henotace_ai import ChatColumns, SessionChat
+
+
+@dataclass
+class DictChat:
+    """SessionChat as it was before slots"""
+    message: str
+    is_reply: bool
+    timestamp: Optional[int] = None
+
+
+def measure(label, build, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build(count)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>22}: {size / 2**20:8.1f} MiB  {size / count:6.1f} B/chat  build {elapsed:5.2f} s")
+    return held
+
+
+def messages(count):
+    # Realistic short turns; every message is a distinct string
+    return (f"Question {i}: how do I solve x + {i} = {2 * i}?" for i in range(1_700_000_000, 1_700_000_000 + count))
+
+
+if __name__ == '__main__':
+    count = 1_000_000
+    print(f"{count:,} chats")
+    measure('dataclass (__dict__)',
+            lambda n: [DictChat(m, bool(i & 1), 1_700_000_000_000 + i) for i, m in enumerate(messages(n))], count)
+    measure('slotted SessionChat',
+            lambda n: [SessionChat(m, bool(i & 1), 1_700_000_000_000 + i) for i, m in enumerate(messages(n))], count)
+    columns = measure('ChatColumns',
+                      lambda n: ChatColumns(SessionChat(m, bool(i & 1), 1_700_000_000_000 + i)
+                                            for i, m in enumerate(messages(n))), count)
+    print(f"{'ChatColumns.nbytes':>22}: {columns.nbytes / 2**20:8.1f} MiB")
+
+    start = time.perf_counter()
+    window = columns[-24:]
+    print(f"last 24 chats from columns: {(time.perf_counter() - start) * 1e6:.1f} us")
@@ -0,0 +1,95 @@
+"""
+Save and load time of a session tree: binary snapshot vs JSON vs pickle
+
+Run from the repository root:
+    python benchmarks/bench_snapshot.py
+"""
+
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+
+sys.path.append('.')
+from src.henotace_ai import (
+    SessionStudent, SessionTutor, SessionSubject, SessionChat, save_snapshot, load_snapshot
+)
+
+STUDENTS = 10_000
+TUTORS = 2
+CHATS = 50
+
+PERSONA = 'You are a patient, encouraging tutor who explains every step and checks understanding.'
+
+
+def build():
+    students = []
+    for s in range(STUDENTS):
+        tutors = [
+            SessionTutor(
+                id=f"tutor_{t}", name='Algebra tutor', subject=SessionSubject(id='math', name='Mathematics', topic='algebra'),
+                persona=PERSONA, context=['Unit 3: linear equations'], user_profile={'grade': 9},
+                chats=[SessionChat(message=f"Question {i}: how do I solve {i}x + {s} = {i * s}?",
+                                   is_reply=bool(i % 2), timestamp=1_700_000_000_000 + i) for i in range(CHATS)]
+            )
+            for t in range(TUTORS)
+        ]
+        students.append(SessionStudent(id=f"student_{s}", name=f"Student {s}", tutors=tutors))
+    return {'students': students}
+
+
+def json_save(schema, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'students': [asdict(s) for s in schema['students']]}, f)
+
+
+def json_load(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {'students': [
+        SessionStudent(id=s['id'], name=s['name'], tutors=[
+            SessionTutor(
+                id=t['id'], name=t['name'], subject=SessionSubject(**t['subject']),
+                chats=[SessionChat(**c) for c in t['chats']], context=t['context'], persona=t['persona'],
+                user_profile=t['user_profile'], metadata=t['metadata']
+            ) for t in s['tutors']
+        ]) for s in data['students']
+    ]}
+
+
+def pickle_save(schema, path):
+    with open(path, 'wb') as f:
+        pickle.dump(schema, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def pickle_load(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    schema = build()
+    print(f"{STUDENTS:,} students x {TUTORS} tutors x {CHATS} chats = {STUDENTS * TUTORS * CHATS:,} chats")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, save, load in (
+            ('json', json_save, json_load),
+            ('pickle', pickle_save, pickle_load),
+            ('snapshot (eager)', save_snapshot, lambda p: load_snapshot(p, lazy=False)),
+            ('snapshot (lazy)', save_snapshot, load_snapshot),
+        ):
+            path = os.path.join(directory, label.split()[0])
+            _, save_s = timed(save, schema, path)
+            loaded, load_s = timed(load, path)
+            # Touch the most recent chat of every tutor, as a warm restart would
+            _, touch_s = timed(lambda: [t.chats[-1].message for s in loaded['students'] for t in s.tutors])
+            print(f"{label:>18}: save {save_s:6.2f} s  load {load_s:6.2f} s  "
+                  f"+recent {touch_s:5.2f} s  size {os.path.getsize(path) / 2**20:7.1f} MiB")
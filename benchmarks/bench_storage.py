@@ -0,0 +1,111 @@
+"""
+Per-operation storage cost as the student population grows
+
+Run from the repository root:
+    python benchmarks/bench_storage.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append('.')
+from src.henotace_ai import InMemoryConnector, SQLiteConnector, LogConnector, WriteBehindConnector, SessionStudent, SessionTutor, SessionSubject, SessionChat
+
+
+def populate(connector, students):
+    subject = SessionSubject(id='math', name='Math', topic='algebra')
+    for i in range(students):
+        connector.upsert_student(SessionStudent(id=f"s{i}"))
+        connector.upsert_tutor(f"s{i}", SessionTutor(id='t0', name='t0', subject=subject))
+
+
+def per_op_us(fn, ops):
+    start = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def bench(factory, populations, ops=2000):
+    print(f"{'students':>10}{'append_chat':>14}{'list_chats':>14}{'list_tutors':>14}{'upsert_tutor':>14}   (us/op)")
+    subject = SessionSubject(id='math', name='Math', topic='algebra')
+    for n in populations:
+        connector = factory()
+        populate(connector, n)
+        # Touch students spread across the population, newest last
+        ids = [f"s{(n - 1) - (i * 7919) % n}" for i in range(ops)]
+        append = per_op_us(lambda i: connector.append_chat(ids[i], 't0', SessionChat(message='hi', is_reply=False, timestamp=i)), ops)
+        chats = per_op_us(lambda i: connector.list_chats(ids[i], 't0'), ops)
+        tutors = per_op_us(lambda i: connector.list_tutors(ids[i]), ops)
+        upsert = per_op_us(lambda i: connector.upsert_tutor(ids[i], SessionTutor(id='t1', name='t1', subject=subject)), ops)
+        print(f"{n:>10,}{append:>14.2f}{chats:>14.2f}{tutors:>14.2f}{upsert:>14.2f}")
+
+
+def bench_sqlite_turns(turns=5000):
+    """Appends per second when each turn's two chats share one transaction"""
+    with tempfile.TemporaryDirectory() as tmp:
+        connector = SQLiteConnector(os.path.join(tmp, 'bench.db'))
+        start = time.perf_counter()
+        for i in range(turns):
+            with connector.transaction():
+                connector.append_chat(f"s{i % 500}", 't0', SessionChat(message='question', is_reply=False, timestamp=2 * i))
+                connector.append_chat(f"s{i % 500}", 't0', SessionChat(message='answer ' * 50, is_reply=True, timestamp=2 * i + 1))
+        elapsed = time.perf_counter() - start
+        print(f"append_chat: {2 * turns / elapsed:,.0f} appends/s ({turns:,} turns, one commit per turn)")
+
+        start = time.perf_counter()
+        for i in range(turns):
+            connector.list_chats(f"s{i % 500}", 't0', limit=24)
+        elapsed = time.perf_counter() - start
+        print(f"list_chats(limit=24): {elapsed / turns * 1e6:.1f} us/op")
+        connector.close()
+
+
+def bench_log_appends(batches=(10_000, 100_000), fsync='interval'):
+    """Append latency should not depend on how much is already stored"""
+    with tempfile.TemporaryDirectory() as tmp:
+        connector = LogConnector(os.path.join(tmp, 'log'), fsync=fsync)
+        written = 0
+        for target in batches:
+            start = time.perf_counter()
+            for i in range(written, target):
+                connector.append_chat(f"s{i % 1000}", 't0', SessionChat(message='answer ' * 50, is_reply=True, timestamp=i))
+            elapsed = time.perf_counter() - start
+            print(f"after {target:>9,} chats: {elapsed / (target - written) * 1e6:.1f} us/append (fsync={fsync})")
+            written = target
+        connector.close()
+
+
+def bench_write_behind(turns=2000):
+    """Caller-visible turn latency on a strict SQLite store, direct and buffered"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, wrap in (('direct', lambda c: c), ('write-behind', WriteBehindConnector)):
+            inner = SQLiteConnector(os.path.join(tmp, f"{label}.db"), synchronous='FULL')
+            connector = wrap(inner)
+            start = time.perf_counter()
+            for i in range(turns):
+                connector.append_chats(f"s{i % 100}", 't0', [
+                    SessionChat(message='question', is_reply=False, timestamp=2 * i),
+                    SessionChat(message='answer ' * 50, is_reply=True, timestamp=2 * i + 1)
+                ])
+            elapsed = time.perf_counter() - start
+            if connector is not inner:
+                connector.close()
+            print(f"{label:>13}: {elapsed / turns * 1e6:.1f} us/turn")
+            inner.close()
+
+
+if __name__ == '__main__':
+    print('InMemoryConnector')
+    bench(InMemoryConnector, [1_000, 10_000, 50_000])
+    print()
+    print('SQLiteConnector')
+    bench_sqlite_turns()
+    print()
+    print('LogConnector')
+    bench_log_appends()
+    print()
+    print('WriteBehindConnector over SQLite (synchronous=FULL)')
+    bench_write_behind()
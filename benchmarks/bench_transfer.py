@@ -0,0 +1,59 @@
+"""
+Streaming NDJSON export/import against get_all/set_all: throughput and peak memory
+
+Run from the repository root:
+    python benchmarks/bench_transfer.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append('.')
+from src.henotace_ai import SQLiteConnector, SessionTutor, SessionSubject, SessionChat, export_ndjson, import_ndjson
+
+STUDENTS = 500
+CHATS = 400
+
+SUBJECT = SessionSubject(id='math', name='Math', topic='algebra')
+
+
+def populate(path):
+    connector = SQLiteConnector(path)
+    for s in range(STUDENTS):
+        connector.upsert_tutor(f"s{s}", SessionTutor(id='t1', name='Tutor', subject=SUBJECT))
+        connector.append_chats(f"s{s}", 't1', [
+            SessionChat(message=f"How do I solve {i}x + {s} = {i * s}?", is_reply=bool(i % 2), timestamp=i)
+            for i in range(CHATS)
+        ])
+    return connector
+
+
+def measure(label, run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>22}: {elapsed:6.2f} s  peak {peak / 2**20:7.1f} MiB  "
+          f"{STUDENTS * CHATS / elapsed:10,.0f} chats/s")
+    return result
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        source = populate(os.path.join(directory, 'source.db'))
+        print(f"{STUDENTS} students x {CHATS} chats")
+
+        schema = measure('get_all', source.get_all)
+        measure('set_all', lambda: SQLiteConnector(os.path.join(directory, 'a.db')).set_all(schema))
+        del schema
+
+        path = os.path.join(directory, 'export.ndjson')
+        stats = measure('export_ndjson', lambda: export_ndjson(source, path))
+        print(f"{'':>22}  {stats}")
+        stats = measure('import_ndjson', lambda: import_ndjson(SQLiteConnector(os.path.join(directory, 'b.db')), path))
+        print(f"{'':>22}  {stats}")
@@ -0,0 +1,63 @@
+"""
+Payload size vs history length for the built-in history strategies
+
+Run from the repository root:
+    python benchmarks/bench_windowing.py
+"""
+
+import json
+import random
+import sys
+import time
+
+sys.path.append('.')
+from src.henotace_ai import (
+    SessionChat, SlidingWindowStrategy, HeadTailStrategy,
+    SizeWeightedStrategy, ImportanceScoredStrategy
+)
+
+
+def make_history(turns, seed=7):
+    rng = random.Random(seed)
+    chats = []
+    for i in range(turns):
+        question = f"Question {i}: why does {rng.choice(['ice', 'iron', 'air'])} behave this way?"
+        chats.append(SessionChat(message=question, is_reply=False, timestamp=2 * i))
+        answer = 'Because ' + ' '.join(rng.choice(['energy', 'mass', 'heat', 'force']) for _ in range(rng.randint(40, 160)))
+        chats.append(SessionChat(message=answer, is_reply=True, timestamp=2 * i + 1))
+    return chats
+
+
+def payload_bytes(chats):
+    history = [{'role': 'assistant' if c.is_reply else 'user', 'content': c.message} for c in chats]
+    return len(json.dumps(history).encode('utf-8'))
+
+
+def main():
+    strategies = {
+        'none': None,
+        'sliding(24)': SlidingWindowStrategy(24),
+        'head_tail(4,20)': HeadTailStrategy(4, 20),
+        'size(8000 chars)': SizeWeightedStrategy(8000),
+        'size(2000 tokens)': SizeWeightedStrategy(2000, measure='tokens'),
+        'importance(8000)': ImportanceScoredStrategy(8000),
+    }
+    lengths = [10, 100, 1000, 5000]
+
+    print(f"{'strategy':<20}" + ''.join(f"{n:>14}" for n in lengths) + f"{'select us':>12}")
+    for name, strategy in strategies.items():
+        row = f"{name:<20}"
+        elapsed = 0.0
+        for n in lengths:
+            chats = make_history(n)
+            start = time.perf_counter()
+            selected = strategy.select(chats) if strategy else chats
+            elapsed = time.perf_counter() - start
+            row += f"{payload_bytes(selected):>14,}"
+        row += f"{elapsed * 1e6:>12.0f}"
+        print(row)
+    print('(columns: payload bytes by number of turns; select time at the largest size)')
+
+
+if __name__ == '__main__':
+    main()
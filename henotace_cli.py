@@ -1,7 +1,11 @@
 import os
+import sys
 import argparse
 import asyncio
-from src.henotace_ai import HenotaceAI, create_tutor
+from src.henotace_ai import (
+    HenotaceAI, create_tutor, InMemoryConnector, SQLiteConnector, LogConnector,
+    load_snapshot, save_snapshot, migrate
+)
 
 
 async def run_chat(args):
@@ -42,7 +46,66 @@ async def run_chat(args):
     return 0
 
 
+def open_connector(spec, target=False):
+    """Open a connector from 'sqlite:PATH', 'log:DIR' or 'snapshot:PATH'"""
+    kind, _, path = spec.partition(":")
+    if not path:
+        raise ValueError(f"Expected KIND:PATH, got {spec!r}")
+    if kind == "sqlite":
+        return SQLiteConnector(path)
+    if kind == "log":
+        return LogConnector(path)
+    if kind == "snapshot":
+        # Snapshots are read and written whole; the copy goes through memory
+        connector = InMemoryConnector()
+        if not target:
+            connector.set_all(load_snapshot(path, lazy=False))
+        return connector
+    raise ValueError(f"Unknown connector kind {kind!r} (use sqlite, log or snapshot)")
+
+
+def run_migrate(argv):
+    parser = argparse.ArgumentParser(
+        prog="henotace migrate",
+        description="Copy all students, tutors and chats from one connector to another"
+    )
+    parser.add_argument("source", help="Source: sqlite:PATH, log:DIR or snapshot:PATH")
+    parser.add_argument("target", help="Target: sqlite:PATH, log:DIR or snapshot:PATH")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel workers (default 4)")
+    parser.add_argument("--batch-size", dest="batch_size", type=int, default=1000,
+                        help="Records per target transaction (default 1000)")
+    parser.add_argument("--checkpoint", help="Checkpoint file; rerun with it to resume")
+    parser.add_argument("--no-verify", dest="verify", action="store_false",
+                        help="Skip comparing source and target afterwards")
+    args = parser.parse_args(argv)
+
+    try:
+        source = open_connector(args.source)
+        target = open_connector(args.target, target=True)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    stats = migrate(
+        source, target, workers=args.workers, batch_size=args.batch_size,
+        checkpoint=args.checkpoint, verify=args.verify,
+        progress=lambda s: s.finished is None and print(f"  {s}", file=sys.stderr)
+    )
+    if args.target.startswith("snapshot:"):
+        save_snapshot(target, args.target.partition(":")[2])
+    for connector in (source, target):
+        if hasattr(connector, "close"):
+            connector.close()
+    print(stats)
+    if stats.mismatched:
+        print(f"Error: {len(stats.mismatched)} students differ, e.g. {', '.join(stats.mismatched[:5])}")
+        return 1
+    return 0
+
+
 def main():
+    if sys.argv[1:2] == ["migrate"]:
+        exit(run_migrate(sys.argv[2:]))
+
     parser = argparse.ArgumentParser(description="Henotace AI Python SDK CLI")
     parser.add_argument("message", nargs="?", help="Message to send (omit for interactive mode)")
     parser.add_argument("--api-key", dest="api_key", help="Henotace API key")
@@ -8,19 +8,46 @@ from .tutor import Tutor, create_tutor
 from .types import (
     SessionStudent, SessionTutor, SessionChat, SessionSubject,
     HenotaceError, HenotaceAPIError, HenotaceNetworkError,
-    StorageConnector, Logger, LogLevel, ClassworkQuestion, ClassworkResponse
+    StorageConnector, AsyncStorageConnector, Logger, LogLevel, ClassworkQuestion, ClassworkResponse,
+    window_chats
 )
-from .connectors import InMemoryConnector
+from .connectors import (
+    InMemoryConnector, SQLiteConnector, LogConnector, MmapArchiveConnector, write_mmap_archive,
+    AsyncConnectorAdapter, WriteBehindConnector, EvictingConnector, EvictionStats,
+    ShardedConnector, HashRing, ShardStats, CachedConnector, CacheStats, StripedLock
+)
+from .windowing import (
+    HistoryStrategy, SlidingWindowStrategy, HeadTailStrategy,
+    SizeWeightedStrategy, ImportanceScoredStrategy
+)
+from .columnar import ChatColumns
+from .codec import TextCodec, ZlibCodec, ZstdCodec, CompressedChat, build_dictionary, get_codec
+from .transfer import TransferStats, export_ndjson, import_ndjson
+from .migrate import MigrationStats, migrate, verify_migration
+from .snapshot import save_snapshot, load_snapshot
+from .archive import ChatArchive, FileChatArchive, SQLiteChatArchive
+from .interning import BlobInterner, InternStats
+from .changes import Change, ChangeFeed, FileChangeFeed, SQLiteChangeFeed, ChangeFeedGapError
 from .logger import ConsoleLogger, NoOpLogger, create_logger
 
 # Export main classes and functions
 __all__ = [
     'HenotaceAI', 'Tutor', 'create_tutor',
-    'StorageConnector', 'InMemoryConnector',
-    'SessionStudent', 'SessionTutor', 'SessionChat', 'SessionSubject',
+    'StorageConnector', 'InMemoryConnector', 'SQLiteConnector', 'LogConnector',
+    'MmapArchiveConnector', 'write_mmap_archive', 'WriteBehindConnector', 'EvictingConnector', 'EvictionStats',
+    'ShardedConnector', 'HashRing', 'ShardStats', 'CachedConnector', 'CacheStats', 'StripedLock',
+    'AsyncStorageConnector', 'AsyncConnectorAdapter', 'window_chats',
+    'SessionStudent', 'SessionTutor', 'SessionChat', 'SessionSubject', 'ChatColumns',
+    'TextCodec', 'ZlibCodec', 'ZstdCodec', 'CompressedChat', 'build_dictionary', 'get_codec',
+    'TransferStats', 'export_ndjson', 'import_ndjson', 'save_snapshot', 'load_snapshot',
+    'MigrationStats', 'migrate', 'verify_migration',
+    'ChatArchive', 'FileChatArchive', 'SQLiteChatArchive', 'BlobInterner', 'InternStats',
+    'Change', 'ChangeFeed', 'FileChangeFeed', 'SQLiteChangeFeed', 'ChangeFeedGapError',
     'HenotaceError', 'HenotaceAPIError', 'HenotaceNetworkError',
     'Logger', 'LogLevel', 'ConsoleLogger', 'NoOpLogger', 'create_logger',
-    'ClassworkQuestion', 'ClassworkResponse'
+    'ClassworkQuestion', 'ClassworkResponse',
+    'HistoryStrategy', 'SlidingWindowStrategy', 'HeadTailStrategy',
+    'SizeWeightedStrategy', 'ImportanceScoredStrategy'
 ]
 
 # Version info
@@ -0,0 +1,258 @@
+"""
+Archive tier for compressed-away chats in Henotace AI Python SDK
+
+``Tutor.compress_history`` folds older chats into a summary and keeps only
+the recent ones in the connector. When the tutor has an archive (see
+``Tutor.set_archive``), the folded chats are appended to it first, so full
+transcripts survive while hot-path reads stay small. ``Tutor.full_history``
+reads them back lazily.
+
+Chats are archived in frames: one compressed JSON array per compaction.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Union
+
+from .types import SessionChat, HenotaceError
+from .codec import TextCodec, get_codec
+from .connectors.locking import StripedLock
+
+# Payload length, chat count, codec tag
+_FRAME = struct.Struct('<IIB3x')
+
+
+def _codec_for(tag: int, codec: Optional[TextCodec]) -> Optional[TextCodec]:
+    if tag == 0:
+        return None
+    if codec is None or codec.tag != tag:
+        raise HenotaceError(f"Archived chats use codec tag {tag}; open the archive with that codec")
+    return codec
+
+
+class ChatArchive:
+    """
+    Append-only store of chats removed from the hot connector
+
+    Args:
+        compression: 'zlib' (default), 'zstd', a codec such as ``ZlibCodec``,
+            or None for plain JSON
+    """
+
+    def __init__(self, compression: Union[None, str, TextCodec] = 'zlib'):
+        self.codec = get_codec(compression)
+
+    def _encode(self, chats: List[SessionChat]) -> bytes:
+        text = json.dumps([[c.message, c.is_reply, c.timestamp] for c in chats], separators=(',', ':'))
+        return self.codec.encode(text) if self.codec else text.encode('utf-8')
+
+    def _decode(self, tag: int, data: bytes) -> List[SessionChat]:
+        codec = _codec_for(tag, self.codec)
+        text = codec.decode(data) if codec else bytes(data).decode('utf-8')
+        return [SessionChat(message, bool(is_reply), ts) for message, is_reply, ts in json.loads(text)]
+
+    def append(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        """Archive chats after those already archived for the tutor"""
+        raise NotImplementedError
+
+    def iter_chats(self, student_id: str, tutor_id: str) -> Iterator[SessionChat]:
+        """Yield a tutor's archived chats, oldest first, one frame in memory at a time"""
+        raise NotImplementedError
+
+    def count(self, student_id: str, tutor_id: str) -> int:
+        """Number of archived chats, without decoding them"""
+        raise NotImplementedError
+
+    def delete(self, student_id: str, tutor_id: str) -> None:
+        """Drop a tutor's archived chats"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class FileChatArchive(ChatArchive):
+    """
+    One append-only file of compressed frames per tutor
+
+    A frame is only counted once fully written, so a crash mid-append
+    leaves the file readable. The end of the last complete frame is found
+    by scanning the file on the first append and kept in memory for the
+    ``max_tails`` most recently appended files. Later appends only compare
+    it with the file size and rescan when they differ or it was dropped.
+    A rescan cuts off a torn tail.
+
+    Args:
+        directory: Directory for the archive files (created if missing)
+        compression: See ``ChatArchive``
+        stripes: Number of per-tutor write locks
+        max_tails: Most file tails kept in memory
+    """
+
+    def __init__(self, directory: str, compression: Union[None, str, TextCodec] = 'zlib', stripes: int = 64,
+                 max_tails: int = 4096):
+        super().__init__(compression)
+        self.directory = directory
+        self.max_tails = max_tails
+        os.makedirs(directory, exist_ok=True)
+        self._stripes = StripedLock(stripes)
+        # Path -> end of its last complete frame, least recently appended first
+        self._tails: 'OrderedDict[str, int]' = OrderedDict()
+        self._tails_lock = threading.Lock()
+
+    def _path(self, student_id: str, tutor_id: str) -> str:
+        # Hashed, so any id is a safe file name
+        digest = hashlib.blake2b(f"{student_id}\x00{tutor_id}".encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + '.chats')
+
+    @staticmethod
+    def _frames(f) -> Iterator[tuple]:
+        """(offset, payload length, chat count, tag) of each complete frame"""
+        size = os.fstat(f.fileno()).st_size
+        offset = 0
+        while offset + _FRAME.size <= size:
+            f.seek(offset)
+            length, count, tag = _FRAME.unpack(f.read(_FRAME.size))
+            if offset + _FRAME.size + length > size:
+                return
+            yield offset, length, count, tag
+            offset += _FRAME.size + length
+
+    def append(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        if not chats:
+            return
+        path = self._path(student_id, tutor_id)
+        data = self._encode(chats)
+        frame = _FRAME.pack(len(data), len(chats), self.codec.tag if self.codec else 0) + data
+        with self._stripes((student_id, tutor_id)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Forget the tail until the frame is safely written, so a failed append rescans
+            with self._tails_lock:
+                end = self._tails.pop(path, None)
+            with open(path, 'ab+') as f:
+                # A size other than the remembered tail means a torn write or another writer
+                if end is None or os.fstat(f.fileno()).st_size != end:
+                    end = 0
+                    for offset, length, _, _ in self._frames(f):
+                        end = offset + _FRAME.size + length
+                    f.truncate(end)
+                f.seek(end)
+                f.write(frame)
+                f.flush()
+                os.fsync(f.fileno())
+            with self._tails_lock:
+                self._tails[path] = end + len(frame)
+                while len(self._tails) > self.max_tails:
+                    self._tails.popitem(last=False)
+
+    def iter_chats(self, student_id: str, tutor_id: str) -> Iterator[SessionChat]:
+        try:
+            f = open(self._path(student_id, tutor_id), 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            for offset, length, _, tag in self._frames(f):
+                f.seek(offset + _FRAME.size)
+                yield from self._decode(tag, f.read(length))
+
+    def count(self, student_id: str, tutor_id: str) -> int:
+        try:
+            f = open(self._path(student_id, tutor_id), 'rb')
+        except FileNotFoundError:
+            return 0
+        with f:
+            return sum(count for _, _, count, _ in self._frames(f))
+
+    def delete(self, student_id: str, tutor_id: str) -> None:
+        with self._stripes((student_id, tutor_id)):
+            path = self._path(student_id, tutor_id)
+            with self._tails_lock:
+                self._tails.pop(path, None)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class SQLiteChatArchive(ChatArchive):
+    """
+    Archived frames in their own SQLite database, apart from the hot store
+
+    Args:
+        path: Database file
+        compression: See ``ChatArchive``
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS archived_chats (
+            student_id TEXT NOT NULL,
+            tutor_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            codec INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (student_id, tutor_id, seq)
+        ) WITHOUT ROWID
+    """
+    # Frames fetched per query while iterating, so no cursor stays open between yields
+    _PAGE = 16
+
+    def __init__(self, path: str, compression: Union[None, str, TextCodec] = 'zlib'):
+        super().__init__(compression)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(self._SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def append(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        if not chats:
+            return
+        data = self._encode(chats)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO archived_chats (student_id, tutor_id, seq, count, codec, data) "
+                "SELECT ?, ?, COALESCE(MAX(seq) + 1, 0), ?, ?, ? FROM archived_chats "
+                "WHERE student_id = ? AND tutor_id = ?",
+                (student_id, tutor_id, len(chats), self.codec.tag if self.codec else 0, data,
+                 student_id, tutor_id)
+            )
+
+    def iter_chats(self, student_id: str, tutor_id: str) -> Iterator[SessionChat]:
+        seq = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, codec, data FROM archived_chats "
+                    "WHERE student_id = ? AND tutor_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (student_id, tutor_id, seq, self._PAGE)
+                ).fetchall()
+            for seq, tag, data in rows:
+                yield from self._decode(tag, data)
+            if len(rows) < self._PAGE:
+                return
+
+    def count(self, student_id: str, tutor_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(count), 0) FROM archived_chats WHERE student_id = ? AND tutor_id = ?",
+                (student_id, tutor_id)
+            ).fetchone()
+        return row[0]
+
+    def delete(self, student_id: str, tutor_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM archived_chats WHERE student_id = ? AND tutor_id = ?", (student_id, tutor_id)
+            )
@@ -0,0 +1,312 @@
+"""
+Change feeds for Henotace AI Python SDK storage connectors
+
+A connector created with ``changes=N`` records every write as a ``Change``
+with a sequence number that only ever grows, and keeps the last ``N`` of
+them in ``connector.changes``. Consumers remember the last sequence number
+they handled and ask for what came after it instead of rescanning::
+
+    seq = 0
+    for change in connector.changes.tail(seq):
+        handle(change)
+        seq = change.seq
+
+If a consumer falls more than ``N`` changes behind, ``since`` raises
+``ChangeFeedGapError`` and the consumer must rescan before tailing again.
+``InMemoryConnector`` keeps its feed in memory only. ``LogConnector`` also
+writes it to ``changes.log`` next to its segments, and ``SQLiteConnector``
+to a ``changes`` table in the same transaction as the write, so sequence
+numbers carry on across restarts. The SQLite feed can be tailed from
+another process.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+from .types import SessionChat, HenotaceError
+
+# Change kinds
+RESET = 'reset'
+STUDENT_UPSERTED = 'student_upserted'
+STUDENT_DELETED = 'student_deleted'
+TUTOR_UPSERTED = 'tutor_upserted'
+TUTOR_DELETED = 'tutor_deleted'
+CHATS_APPENDED = 'chats_appended'
+CHATS_REPLACED = 'chats_replaced'
+
+
+class ChangeFeedGapError(HenotaceError):
+    """The requested changes are older than the feed retains"""
+    pass
+
+
+@dataclass
+class Change:
+    """
+    One write to a connector
+
+    ``chats`` holds the new chats of a ``chats_appended`` change and is None
+    otherwise. ``reset`` (from ``set_all``) replaces everything and has no
+    student id.
+    """
+    seq: int
+    kind: str
+    student_id: Optional[str] = None
+    tutor_id: Optional[str] = None
+    chats: Optional[List[SessionChat]] = None
+    timestamp: Optional[int] = None
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            'seq': self.seq, 'kind': self.kind, 's': self.student_id, 't': self.tutor_id,
+            'chats': _chats_to_json(self.chats), 'ts': self.timestamp
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> 'Change':
+        return cls(record['seq'], record['kind'], record['s'], record['t'],
+                   _chats_from_json(record['chats']), record['ts'])
+
+
+def _chats_to_json(chats: Optional[List[SessionChat]]) -> Optional[list]:
+    return None if chats is None else [[c.message, bool(c.is_reply), c.timestamp] for c in chats]
+
+
+def _chats_from_json(rows: Optional[list]) -> Optional[List[SessionChat]]:
+    return None if rows is None else [SessionChat(m, bool(r), ts) for m, r, ts in rows]
+
+
+def _now() -> int:
+    return int(time.time() * 1000)
+
+
+class ChangeFeed:
+    """
+    Bounded in-memory change feed
+
+    Args:
+        capacity: Most recent changes kept
+    """
+
+    #: Seconds between re-checks while waiting, for feeds that other processes write (None: never)
+    poll_interval: Optional[float] = None
+
+    def __init__(self, capacity: int = 10000):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self.capacity = capacity
+        self._buffer: 'deque[Change]' = deque(maxlen=capacity)
+        self._seq = 0
+        # Bumped on every publish in this process; waiters sleep until it moves
+        self._published = 0
+        self._cond = threading.Condition()
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest change (0 before the first)"""
+        with self._cond:
+            return self._seq
+
+    def publish(self, kind: str, student_id: Optional[str] = None, tutor_id: Optional[str] = None,
+                chats: Optional[List[SessionChat]] = None) -> Change:
+        """Record a change; connectors call this from their write methods"""
+        with self._cond:
+            change = self._store(Change(0, kind, student_id, tutor_id,
+                                        None if chats is None else list(chats), _now()))
+            self._published += 1
+            self._cond.notify_all()
+        return change
+
+    def _store(self, change: Change) -> Change:
+        self._seq += 1
+        change.seq = self._seq
+        self._buffer.append(change)
+        return change
+
+    def since(self, after_seq: int = 0, limit: Optional[int] = None) -> List[Change]:
+        """
+        Changes with a sequence number above ``after_seq``, oldest first
+
+        Raises:
+            ChangeFeedGapError: Some of those changes are no longer retained
+        """
+        with self._cond:
+            buffer = self._buffer
+            if after_seq >= self._seq:
+                return []
+            first = buffer[0].seq if buffer else self._seq + 1
+            if after_seq < first - 1:
+                raise ChangeFeedGapError(
+                    f"Changes after {after_seq} are gone; the feed starts at {first}. Rescan and tail from {self._seq}"
+                )
+            start = after_seq - first + 1
+            return list(islice(buffer, start, None if limit is None else start + limit))
+
+    def wait(self, after_seq: int = 0, timeout: Optional[float] = None,
+             limit: Optional[int] = None) -> List[Change]:
+        """Like ``since``, but block up to ``timeout`` seconds (None: forever) until there is a change"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                published = self._published
+            changes = self.since(after_seq, limit)
+            if changes:
+                return changes
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return []
+            if self.poll_interval is not None:
+                remaining = self.poll_interval if remaining is None else min(remaining, self.poll_interval)
+            with self._cond:
+                if self._published == published:
+                    self._cond.wait(remaining)
+
+    def tail(self, after_seq: int = 0, timeout: Optional[float] = None) -> Iterator[Change]:
+        """Yield changes after ``after_seq`` as they arrive; stops once ``timeout`` passes with none"""
+        while True:
+            changes = self.wait(after_seq, timeout)
+            if not changes:
+                return
+            for change in changes:
+                yield change
+            after_seq = changes[-1].seq
+
+
+class FileChangeFeed(ChangeFeed):
+    """
+    Change feed that is also appended to a file, for ``LogConnector``
+
+    Lines go to ``changes.log``. Once it holds ``capacity`` changes it
+    becomes ``changes.log.1`` (replacing the previous one) and a new file
+    starts, so at least the last ``capacity`` changes survive a restart.
+    Reads are served from memory, so only this process can tail the feed.
+
+    Args:
+        directory: Directory for the change files
+        capacity: Most recent changes kept
+        fsync: Fsync after every change instead of leaving it to ``sync()``
+    """
+
+    def __init__(self, directory: str, capacity: int = 10000, fsync: bool = False):
+        super().__init__(capacity)
+        self.path = os.path.join(directory, 'changes.log')
+        self.fsync = fsync
+        if os.path.exists(self.path + '.1'):
+            self._load(self.path + '.1')
+        # Changes in the current file; it rotates once this reaches capacity
+        self._lines = self._load(self.path) if os.path.exists(self.path) else 0
+        self._file = open(self.path, 'ab')
+
+    def _load(self, path: str) -> int:
+        """Replay a change file into the buffer, cutting off a torn last line; returns the line count"""
+        offset = 0
+        lines = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('torn record')
+                    change = Change.from_record(json.loads(line))
+                except ValueError:
+                    break
+                if change.seq > self._seq:
+                    self._buffer.append(change)
+                    self._seq = change.seq
+                offset += len(line)
+                lines += 1
+        if os.path.getsize(path) != offset:
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+        return lines
+
+    def _store(self, change: Change) -> Change:
+        super()._store(change)
+        self._file.write((json.dumps(change.to_record(), separators=(',', ':')) + '\n').encode('utf-8'))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._lines += 1
+        if self._lines >= self.capacity:
+            self.sync()
+            self._file.close()
+            os.replace(self.path, self.path + '.1')
+            self._file = open(self.path, 'ab')
+            self._lines = 0
+        return change
+
+    def sync(self) -> None:
+        """Fsync the change file"""
+        with self._cond:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._cond:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+class SQLiteChangeFeed(ChangeFeed):
+    """
+    Change feed stored in a ``changes`` table of a ``SQLiteConnector`` database
+
+    ``publish`` runs inside the connector's write transaction, so a change
+    is committed or rolled back with the write it describes. Readers query
+    the table, and waiters re-check every ``poll_interval`` seconds to see
+    changes made by other processes.
+
+    Args:
+        connector: The connector whose connection and lock are used
+        capacity: Most recent changes kept in the table
+        poll_interval: Seconds between checks while waiting
+    """
+
+    def __init__(self, connector: Any, capacity: int = 10000, poll_interval: float = 0.5):
+        super().__init__(capacity)
+        self._connector = connector
+        self.poll_interval = poll_interval
+
+    @property
+    def last_seq(self) -> int:
+        with self._connector._lock:
+            row = self._connector._conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'changes'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def _store(self, change: Change) -> Change:
+        conn = self._connector._conn
+        cursor = conn.execute(
+            "INSERT INTO changes (kind, student_id, tutor_id, chats, ts) VALUES (?, ?, ?, ?, ?)",
+            (change.kind, change.student_id, change.tutor_id,
+             None if change.chats is None else json.dumps(_chats_to_json(change.chats)), change.timestamp)
+        )
+        change.seq = cursor.lastrowid
+        conn.execute("DELETE FROM changes WHERE seq <= ?", (change.seq - self.capacity,))
+        return change
+
+    def since(self, after_seq: int = 0, limit: Optional[int] = None) -> List[Change]:
+        with self._connector._lock:
+            conn = self._connector._conn
+            rows = conn.execute(
+                "SELECT seq, kind, student_id, tutor_id, chats, ts FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (after_seq, -1 if limit is None else limit)
+            ).fetchall()
+            if not rows or rows[0][0] != after_seq + 1:
+                last = self.last_seq
+                if after_seq < last:
+                    first = rows[0][0] if rows else last + 1
+                    raise ChangeFeedGapError(
+                        f"Changes after {after_seq} are gone; the feed starts at {first}. Rescan and tail from {last}"
+                    )
+        return [
+            Change(seq, kind, sid, tid, None if chats is None else _chats_from_json(json.loads(chats)), ts)
+            for seq, kind, sid, tid, chats, ts in rows
+        ]
@@ -0,0 +1,173 @@
+"""
+Text codecs for compressed chat storage in Henotace AI Python SDK
+
+Connectors that take a ``compression`` option keep the most recent chats as
+plain text. Older chats are stored compressed and decoded when read.
+"""
+
+import zlib
+from collections import Counter
+from typing import Any, Iterable, Optional, Union
+
+from .types import SessionChat, HenotaceError
+
+
+class TextCodec:
+    """Base class for message text codecs"""
+
+    #: Stored next to compressed data so a reader can tell codecs apart (0 means plain text)
+    tag = 0
+
+    def encode(self, text: str) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> str:
+        raise NotImplementedError
+
+
+class ZlibCodec(TextCodec):
+    """
+    Raw deflate, optionally primed with a shared dictionary
+
+    Short messages compress poorly on their own. A dictionary of common
+    phrasing (see ``build_dictionary``) gives each message a warm start.
+    Data written with a dictionary can only be read with the same one.
+
+    Args:
+        level: zlib compression level (1-9)
+        dictionary: Optional preset dictionary
+    """
+
+    tag = 1
+
+    def __init__(self, level: int = 6, dictionary: Optional[bytes] = None):
+        self.level = level
+        self.dictionary = dictionary
+
+    def encode(self, text: str) -> bytes:
+        if self.dictionary:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        return compressor.compress(text.encode('utf-8')) + compressor.flush()
+
+    def decode(self, data: bytes) -> str:
+        try:
+            if self.dictionary:
+                decompressor = zlib.decompressobj(-15, zdict=self.dictionary)
+            else:
+                decompressor = zlib.decompressobj(-15)
+            return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
+        except (zlib.error, UnicodeDecodeError) as e:
+            raise HenotaceError(f"Cannot decode compressed chat (wrong dictionary?): {e}") from e
+
+
+class ZstdCodec(TextCodec):
+    """
+    Zstandard compression; requires the optional ``zstandard`` package
+
+    Args:
+        level: Compression level
+        dictionary: Optional dictionary bytes, e.g. from ``build_dictionary(..., codec='zstd')``
+    """
+
+    tag = 2
+
+    def __init__(self, level: int = 3, dictionary: Optional[bytes] = None):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise HenotaceError('ZstdCodec needs the zstandard package: pip install zstandard') from e
+        self.level = level
+        self.dictionary = dictionary
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        self._compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data, write_content_size=True)
+        self._decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+        self._error = zstandard.ZstdError
+
+    def encode(self, text: str) -> bytes:
+        return self._compressor.compress(text.encode('utf-8'))
+
+    def decode(self, data: bytes) -> str:
+        try:
+            return self._decompressor.decompress(data).decode('utf-8')
+        except (self._error, UnicodeDecodeError) as e:
+            raise HenotaceError(f"Cannot decode compressed chat (wrong dictionary?): {e}") from e
+
+
+def get_codec(spec: Union[None, str, TextCodec]) -> Optional[TextCodec]:
+    """Resolve a connector's ``compression`` option ('zlib', 'zstd', a codec or None)"""
+    if spec is None or isinstance(spec, TextCodec):
+        return spec
+    if spec == 'zlib':
+        return ZlibCodec()
+    if spec == 'zstd':
+        return ZstdCodec()
+    raise ValueError(f"Unknown compression: {spec}")
+
+
+def build_dictionary(samples: Iterable[str], size: int = 16 * 1024, codec: str = 'zlib') -> bytes:
+    """
+    Build a shared dictionary from sample messages
+
+    For zstd this trains a dictionary with ``zstandard.train_dictionary``. For
+    zlib it packs the most common lines into ``size`` bytes, most common last,
+    because deflate reaches the end of the dictionary most cheaply.
+    """
+    samples = list(samples)
+    if codec == 'zstd':
+        try:
+            import zstandard
+        except ImportError as e:
+            raise HenotaceError('Training a zstd dictionary needs the zstandard package') from e
+        return zstandard.train_dictionary(size, [s.encode('utf-8') for s in samples]).as_bytes()
+    if codec != 'zlib':
+        raise ValueError(f"Unknown compression: {codec}")
+
+    counts = Counter(line.strip() for text in samples for line in text.splitlines() if line.strip())
+    picked = []
+    used = 0
+    for line, _ in counts.most_common():
+        data = line.encode('utf-8') + b'\n'
+        if used + len(data) > size:
+            continue
+        picked.append(data)
+        used += len(data)
+    return b''.join(reversed(picked))
+
+
+class CompressedChat(SessionChat):
+    """Chat whose message is kept compressed and decoded on every read"""
+
+    __slots__ = ('_data', '_codec')
+
+    def __init__(self, data: bytes, codec: TextCodec, is_reply: bool, timestamp: Optional[int] = None):
+        self._data = data
+        self._codec = codec
+        self.is_reply = is_reply
+        self.timestamp = timestamp
+
+    @classmethod
+    def pack(cls, chat: SessionChat, codec: TextCodec) -> SessionChat:
+        """Compress a chat, or return it unchanged when that would not save space"""
+        if isinstance(chat, CompressedChat):
+            return chat
+        data = codec.encode(chat.message)
+        if len(data) >= len(chat.message.encode('utf-8')):
+            return chat
+        return cls(data, codec, chat.is_reply, chat.timestamp)
+
+    @property
+    def message(self) -> str:
+        return self._codec.decode(self._data)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, SessionChat):
+            return NotImplemented
+        return (self.message, self.is_reply, self.timestamp) == (other.message, other.is_reply, other.timestamp)
+
+    def __repr__(self) -> str:
+        return f"CompressedChat(message={self.message!r}, is_reply={self.is_reply!r}, timestamp={self.timestamp!r})"
+
+    def __reduce__(self):
+        return (SessionChat, (self.message, self.is_reply, self.timestamp))
@@ -0,0 +1,188 @@
+"""
+Columnar chat storage for Henotace AI Python SDK
+"""
+
+from array import array
+from collections.abc import MutableSequence
+from typing import Any, Iterable, Iterator, List, Optional, Union
+
+from .types import SessionChat
+from .codec import TextCodec
+
+_NO_TIMESTAMP = -(2 ** 63)
+
+
+class ChatColumns(MutableSequence):
+    """
+    List of chats stored as columns
+
+    Timestamps live in an ``array('q')``, ``is_reply`` flags in a bitset and
+    the message text back to back in one UTF-8 buffer with an offset array.
+    A chat then costs its encoded text plus about 16 bytes, instead of a
+    ``SessionChat`` object and three field objects.
+
+    It behaves like ``List[SessionChat]``. Reading an item builds a new
+    ``SessionChat``, so changes to a returned chat are not stored; use the
+    list methods instead. Appending, reading and dropping chats from the end
+    are cheap. Inserting, replacing or deleting in the middle rewrites the
+    columns and costs O(n).
+
+    With a ``codec``, ``pack`` compresses the text of the oldest chats in
+    place; they are decoded again when read. A chat whose text the codec
+    does not shrink keeps its plain text, marked in a second bitset.
+    """
+
+    __slots__ = ('_ts', '_reply', '_plain', '_off', '_text', '_codec', '_packed')
+
+    def __init__(self, chats: Iterable[SessionChat] = (), codec: Optional[TextCodec] = None):
+        self._ts = array('q')
+        self._reply = bytearray()
+        self._plain = bytearray()
+        self._off = array('Q', [0])
+        self._text = bytearray()
+        self._codec = codec
+        self._packed = 0
+        self.extend(chats)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column buffers"""
+        return (len(self._ts) * self._ts.itemsize + len(self._off) * self._off.itemsize
+                + len(self._reply) + len(self._plain) + len(self._text))
+
+    @property
+    def codec(self) -> Optional[TextCodec]:
+        """Codec used by ``pack``"""
+        return self._codec
+
+    @property
+    def packed(self) -> int:
+        """Number of leading chats whose text is compressed"""
+        return self._packed
+
+    def pack(self, upto: int) -> None:
+        """Compress the text of every chat before position ``upto``"""
+        upto = min(upto, len(self._ts))
+        if self._codec is None or upto <= self._packed:
+            return
+        start = self._off[self._packed]
+        end = self._off[upto]
+        offsets = []
+        data = bytearray()
+        for i in range(self._packed, upto):
+            text = self._text[self._off[i]:self._off[i + 1]]
+            encoded = self._codec.encode(text.decode('utf-8'))
+            if len(encoded) < len(text):
+                data += encoded
+            else:
+                # Short messages often grow under the codec; keep them as they are
+                data += text
+                self._plain[i >> 3] |= 1 << (i & 7)
+            offsets.append(start + len(data))
+        shift = end - start - len(data)
+        self._text[start:end] = data
+        self._off[self._packed + 1:] = array('Q', offsets + [o - shift for o in self._off[upto + 1:]])
+        self._packed = upto
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def _chat(self, i: int) -> SessionChat:
+        ts = self._ts[i]
+        text = self._text[self._off[i]:self._off[i + 1]]
+        packed = i < self._packed and not self._plain[i >> 3] >> (i & 7) & 1
+        return SessionChat(
+            message=self._codec.decode(bytes(text)) if packed else text.decode('utf-8'),
+            is_reply=bool(self._reply[i >> 3] >> (i & 7) & 1),
+            timestamp=None if ts == _NO_TIMESTAMP else ts
+        )
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[SessionChat, List[SessionChat]]:
+        count = len(self._ts)
+        if isinstance(index, slice):
+            return [self._chat(i) for i in range(*index.indices(count))]
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError('chat index out of range')
+        return self._chat(index)
+
+    def __iter__(self) -> Iterator[SessionChat]:
+        for i in range(len(self._ts)):
+            yield self._chat(i)
+
+    def append(self, chat: SessionChat) -> None:
+        i = len(self._ts)
+        self._text += chat.message.encode('utf-8')
+        self._off.append(len(self._text))
+        self._ts.append(_NO_TIMESTAMP if chat.timestamp is None else chat.timestamp)
+        if i & 7 == 0:
+            self._reply.append(0)
+            self._plain.append(0)
+        if chat.is_reply:
+            self._reply[i >> 3] |= 1 << (i & 7)
+
+    def extend(self, chats: Iterable[SessionChat]) -> None:
+        if chats is self:
+            chats = list(chats)
+        for chat in chats:
+            self.append(chat)
+
+    def _truncate(self, count: int) -> None:
+        """Drop every chat from position ``count`` on"""
+        self._packed = min(self._packed, count)
+        del self._ts[count:]
+        del self._text[self._off[count]:]
+        del self._off[count + 1:]
+        del self._reply[(count + 7) >> 3:]
+        del self._plain[(count + 7) >> 3:]
+        if count & 7:
+            self._reply[-1] &= (1 << (count & 7)) - 1
+            self._plain[-1] &= (1 << (count & 7)) - 1
+
+    def _rewrite(self, chats: List[SessionChat]) -> None:
+        self._truncate(0)
+        self.extend(chats)
+
+    def __setitem__(self, index: Union[int, slice], value: Any) -> None:
+        chats = list(self)
+        chats[index] = value
+        self._rewrite(chats)
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        count = len(self._ts)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(count)
+            if step == 1 and stop >= count:
+                self._truncate(min(start, count))
+                return
+        else:
+            if index < 0:
+                index += count
+            if not 0 <= index < count:
+                raise IndexError('chat index out of range')
+            if index == count - 1:
+                self._truncate(index)
+                return
+        chats = list(self)
+        del chats[index]
+        self._rewrite(chats)
+
+    def insert(self, index: int, chat: SessionChat) -> None:
+        if index >= len(self._ts):
+            self.append(chat)
+            return
+        chats = list(self)
+        chats.insert(index, chat)
+        self._rewrite(chats)
+
+    def clear(self) -> None:
+        self._truncate(0)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, (ChatColumns, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"ChatColumns({list(self)!r})"
@@ -3,5 +3,20 @@ Storage connectors for Henotace AI Python SDK
 """
 
 from .inmemory import InMemoryConnector
+from .sqlite import SQLiteConnector
+from .logfile import LogConnector
+from .mmap_archive import MmapArchiveConnector, write_mmap_archive
+from .async_adapter import AsyncConnectorAdapter
+from .write_behind import WriteBehindConnector
+from .evicting import EvictingConnector, EvictionStats
+from .sharded import ShardedConnector, HashRing, ShardStats
+from .cached import CachedConnector, CacheStats
+from .locking import StripedLock
 
-__all__ = ['InMemoryConnector']
+__all__ = [
+    'InMemoryConnector', 'SQLiteConnector', 'LogConnector',
+    'MmapArchiveConnector', 'write_mmap_archive', 'AsyncConnectorAdapter',
+    'WriteBehindConnector', 'EvictingConnector', 'EvictionStats',
+    'ShardedConnector', 'HashRing', 'ShardStats', 'CachedConnector', 'CacheStats',
+    'StripedLock'
+]
@@ -0,0 +1,96 @@
+"""
+Async adapter for synchronous storage connectors
+"""
+
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..types import (
+    AsyncStorageConnector, StorageConnector, SessionStudent, SessionTutor, SessionChat, window_chats, _takes_window
+)
+
+
+class AsyncConnectorAdapter(AsyncStorageConnector):
+    """
+    Expose a synchronous StorageConnector through the async interface
+
+    Each call runs on an executor, so blocking storage I/O does not stall the
+    event loop and the I/O of concurrent sessions overlaps.
+
+    Args:
+        connector: The synchronous connector to wrap
+        executor: Executor to run calls on (default: the loop's default executor)
+    """
+
+    def __init__(self, connector: StorageConnector, executor: Optional[Executor] = None):
+        self.connector = connector
+        self.executor = executor
+        # Connectors written before list_chats took window arguments are windowed here
+        self._windowed = _takes_window(connector.list_chats)
+
+    async def _run(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        call = functools.partial(getattr(self.connector, method), *args, **kwargs)
+        return await loop.run_in_executor(self.executor, call)
+
+    async def get_all(self) -> Dict[str, List[SessionStudent]]:
+        return await self._run('get_all')
+
+    async def set_all(self, schema: Dict[str, List[SessionStudent]]) -> None:
+        return await self._run('set_all', schema)
+
+    async def list_students(self) -> List[SessionStudent]:
+        return await self._run('list_students')
+
+    async def list_student_headers(self) -> List[SessionStudent]:
+        return await self._run('list_student_headers')
+
+    async def upsert_student(self, student: SessionStudent) -> None:
+        return await self._run('upsert_student', student)
+
+    async def delete_student(self, student_id: str) -> None:
+        return await self._run('delete_student', student_id)
+
+    async def list_tutors(self, student_id: str) -> List[SessionTutor]:
+        return await self._run('list_tutors', student_id)
+
+    async def upsert_tutor(self, student_id: str, tutor: SessionTutor) -> None:
+        return await self._run('upsert_tutor', student_id, tutor)
+
+    async def delete_tutor(self, student_id: str, tutor_id: str) -> None:
+        return await self._run('delete_tutor', student_id, tutor_id)
+
+    async def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                         before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                         reverse: bool = False) -> List[SessionChat]:
+        window = {k: v for k, v in (('limit', limit), ('before_ts', before_ts),
+                                    ('after_ts', after_ts), ('reverse', reverse)) if v is not None and v is not False}
+        if window and not self._windowed:
+            return window_chats(await self._run('list_chats', student_id, tutor_id), **window)
+        return await self._run('list_chats', student_id, tutor_id, **window)
+
+    async def count_chats(self, student_id: str, tutor_id: str) -> int:
+        return await self._run('count_chats', student_id, tutor_id)
+
+    async def append_chat(self, student_id: str, tutor_id: str, chat: SessionChat) -> None:
+        return await self._run('append_chat', student_id, tutor_id, chat)
+
+    async def replace_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        return await self._run('replace_chats', student_id, tutor_id, chats)
+
+    async def append_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        return await self._run('append_chats', student_id, tutor_id, chats)
+
+    async def upsert_tutors(self, student_id: str, tutors: List[SessionTutor]) -> None:
+        return await self._run('upsert_tutors', student_id, tutors)
+
+    async def get_tutors_many(self, student_id: str, tutor_ids: List[str]) -> Dict[str, SessionTutor]:
+        return await self._run('get_tutors_many', student_id, tutor_ids)
+
+    async def get_tutor(self, student_id: str, tutor_id: str) -> Optional[SessionTutor]:
+        return await self._run('get_tutor', student_id, tutor_id)
+
+    async def list_chats_many(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[SessionChat]]:
+        return await self._run('list_chats_many', keys)
@@ -0,0 +1,402 @@
+"""
+Read-through caching wrapper for Henotace AI Python SDK storage connectors
+"""
+
+import dataclasses
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..types import StorageConnector, SessionStudent, SessionTutor, SessionChat, window_chats
+from .locking import StripedLock
+
+Key = Tuple[str, str]
+
+
+class _Entry:
+    """Cached state of one tutor; None fields are unknown"""
+
+    __slots__ = ('record', 'tail', 'complete', 'count')
+
+    def __init__(self):
+        # The tutor without its chats
+        self.record: Optional[SessionTutor] = None
+        # The most recent chats, oldest first; the whole history when complete
+        self.tail: Optional[List[SessionChat]] = None
+        self.complete = False
+        self.count: Optional[int] = None
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Hit and size counters of a ``CachedConnector``"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    tutors: int = 0
+    chats: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CachedConnector(StorageConnector):
+    """
+    Cache tutor records and recent chats of another connector in process
+
+    Keeps up to ``max_tutors`` tutors in LRU order. For each one it holds the
+    tutor's fields, its chat count and its last ``tail_size`` chats, so
+    memory stays under ``max_tutors * tail_size`` chats. Windowed
+    ``list_chats`` reads that fit in the tail, ``count_chats``, and tutor
+    lookups for tutors whose whole history fits in the tail are served from
+    memory.
+
+    Writes go straight through to the wrapped connector. Afterwards the
+    cache is updated (chat appends) or the affected entries are dropped
+    (everything else). Writes are serialized per student so the cached
+    tail keeps the stored order. A read that races a write to the same
+    student is not cached. The cache only sees writes made through this
+    wrapper, so other writers to the same store must go through it too.
+
+    Returned lists are copies. Do not modify nested values such as
+    ``user_profile`` in place; assign new values and call ``upsert_tutor``.
+
+    Args:
+        connector: The connector to cache
+        max_tutors: Most tutors kept in the cache
+        tail_size: Most recent chats cached per tutor
+        stripes: Number of per-student write locks
+    """
+
+    def __init__(self, connector: StorageConnector, max_tutors: int = 1024,
+                 tail_size: int = 64, stripes: int = 64):
+        self.connector = connector
+        self.max_tutors = max_tutors
+        self.tail_size = tail_size
+        self._entries: 'OrderedDict[Key, _Entry]' = OrderedDict()
+        # Student id -> tutor ids, when the student's full tutor list is known
+        self._rosters: 'OrderedDict[str, List[str]]' = OrderedDict()
+        self._by_student: Dict[str, Set[str]] = {}
+        # Bumped when a write to a student starts and when it ends; fills that
+        # raced a write are dropped
+        self._generation: Dict[str, int] = {}
+        # Students with a write in flight, which refuse fills until it ends
+        self._busy: Dict[str, int] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        self._stripes = StripedLock(stripes)
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits, misses=self._misses, evictions=self._evictions,
+                tutors=len(self._entries),
+                chats=sum(len(e.tail) for e in self._entries.values() if e.tail is not None)
+            )
+
+    def clear(self) -> None:
+        """Drop everything cached"""
+        with self._lock:
+            self._entries.clear()
+            self._rosters.clear()
+            self._by_student.clear()
+            self._generation.clear()
+
+    # Cache bookkeeping; the caller holds self._lock
+
+    def _hit(self, hit: bool) -> None:
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+
+    def _get(self, key: Key) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _slot(self, key: Key) -> _Entry:
+        entry = self._get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+            self._by_student.setdefault(key[0], set()).add(key[1])
+            while len(self._entries) > self.max_tutors:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+        return entry
+
+    def _drop(self, key: Key) -> None:
+        if self._entries.pop(key, None) is not None:
+            tutor_ids = self._by_student.get(key[0])
+            if tutor_ids is not None:
+                tutor_ids.discard(key[1])
+                if not tutor_ids:
+                    del self._by_student[key[0]]
+
+    def _drop_student(self, student_id: str) -> None:
+        for tutor_id in list(self._by_student.get(student_id, ())):
+            self._drop((student_id, tutor_id))
+        self._rosters.pop(student_id, None)
+
+    def _set_chats(self, entry: _Entry, chats: List[SessionChat], complete: bool,
+                   count: Optional[int] = None) -> None:
+        entry.tail = list(chats[-self.tail_size:]) if self.tail_size > 0 else []
+        entry.complete = complete and len(chats) <= self.tail_size
+        entry.count = len(chats) if complete else count
+
+    def _fill_tutor(self, student_id: str, tutor: SessionTutor) -> None:
+        entry = self._slot((student_id, tutor.id))
+        entry.record = dataclasses.replace(tutor, chats=[])
+        self._set_chats(entry, tutor.chats or [], True)
+
+    def _served(self, entry: Optional[_Entry]) -> Optional[SessionTutor]:
+        """A copy of the cached tutor, if its whole history is cached"""
+        if entry is None or entry.record is None or not entry.complete:
+            return None
+        return dataclasses.replace(entry.record, chats=list(entry.tail))
+
+    # Writes
+
+    @contextmanager
+    def _writing(self, student_id: str) -> Iterator[None]:
+        with self._stripes(student_id):
+            # Marked on entry, so a read that sees the new data cannot fill
+            # the cache before the write patches it
+            with self._lock:
+                self._bump(student_id)
+                self._busy[student_id] = self._busy.get(student_id, 0) + 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._bump(student_id)
+                    self._busy[student_id] -= 1
+                    if not self._busy[student_id]:
+                        del self._busy[student_id]
+
+    def _bump(self, student_id: str) -> None:
+        self._generation[student_id] = self._generation.get(student_id, 0) + 1
+
+    def _generation_of(self, student_id: str) -> int:
+        with self._lock:
+            return self._generation.get(student_id, 0)
+
+    def _fresh(self, student_id: str, generation: int) -> bool:
+        """Whether a read begun at ``generation`` may fill the cache; the caller holds self._lock"""
+        return student_id not in self._busy and self._generation.get(student_id, 0) == generation
+
+    @contextmanager
+    def lock_student(self, student_id: str) -> Iterator[None]:
+        # Both locks are taken on entry, so an unused or abandoned call holds nothing
+        with self._stripes(student_id), self.connector.lock_student(student_id):
+            yield
+
+    # StorageConnector interface
+
+    def get_all(self) -> Dict[str, List[SessionStudent]]:
+        return self.connector.get_all()
+
+    def set_all(self, schema: Dict[str, List[SessionStudent]]) -> None:
+        with self._stripes.all():
+            self.connector.set_all(schema)
+            self.clear()
+
+    def list_students(self) -> List[SessionStudent]:
+        return self.connector.list_students()
+
+    def list_student_headers(self) -> List[SessionStudent]:
+        return self.connector.list_student_headers()
+
+    def upsert_student(self, student: SessionStudent) -> None:
+        with self._writing(student.id):
+            self.connector.upsert_student(student)
+            with self._lock:
+                self._drop_student(student.id)
+
+    def delete_student(self, student_id: str) -> None:
+        with self._writing(student_id):
+            self.connector.delete_student(student_id)
+            with self._lock:
+                self._drop_student(student_id)
+
+    def list_tutors(self, student_id: str) -> List[SessionTutor]:
+        with self._lock:
+            roster = self._rosters.get(student_id)
+            if roster is not None:
+                tutors = [self._served(self._get((student_id, tid))) for tid in roster]
+                if all(t is not None for t in tutors):
+                    self._rosters.move_to_end(student_id)
+                    self._hit(True)
+                    return tutors
+            self._hit(False)
+
+        generation = self._generation_of(student_id)
+        tutors = self.connector.list_tutors(student_id)
+        with self._lock:
+            if self._fresh(student_id, generation):
+                for tutor in tutors:
+                    self._fill_tutor(student_id, tutor)
+                self._rosters[student_id] = [t.id for t in tutors]
+                while len(self._rosters) > self.max_tutors:
+                    self._rosters.popitem(last=False)
+        return tutors
+
+    def get_tutors_many(self, student_id: str, tutor_ids: List[str]) -> Dict[str, SessionTutor]:
+        found: Dict[str, SessionTutor] = {}
+        missing = []
+        with self._lock:
+            roster = self._rosters.get(student_id)
+            for tutor_id in dict.fromkeys(tutor_ids):
+                tutor = self._served(self._get((student_id, tutor_id)))
+                if tutor is not None:
+                    found[tutor_id] = tutor
+                elif roster is None or tutor_id in roster:
+                    missing.append(tutor_id)
+            self._hit(not missing)
+        if not missing:
+            return found
+
+        generation = self._generation_of(student_id)
+        fetched = self.connector.get_tutors_many(student_id, missing)
+        with self._lock:
+            if self._fresh(student_id, generation):
+                for tutor in fetched.values():
+                    self._fill_tutor(student_id, tutor)
+        found.update(fetched)
+        return found
+
+    def get_tutor(self, student_id: str, tutor_id: str) -> Optional[SessionTutor]:
+        with self._lock:
+            entry = self._get((student_id, tutor_id))
+            tutor = self._served(entry)
+            if tutor is None and entry is not None and entry.record is not None:
+                # Only the fields are cached, which is all get_tutor promises
+                tutor = dataclasses.replace(entry.record, chats=[])
+            self._hit(tutor is not None)
+        if tutor is not None:
+            return tutor
+
+        generation = self._generation_of(student_id)
+        tutor = self.connector.get_tutor(student_id, tutor_id)
+        if tutor is not None:
+            with self._lock:
+                if self._fresh(student_id, generation):
+                    self._slot((student_id, tutor_id)).record = dataclasses.replace(tutor, chats=[])
+        return tutor
+
+    def upsert_tutor(self, student_id: str, tutor: SessionTutor) -> None:
+        self.upsert_tutors(student_id, [tutor])
+
+    def upsert_tutors(self, student_id: str, tutors: List[SessionTutor]) -> None:
+        with self._writing(student_id):
+            self.connector.upsert_tutors(student_id, tutors)
+            with self._lock:
+                roster = self._rosters.get(student_id)
+                for tutor in tutors:
+                    # An existing tutor keeps its stored chats and a new one
+                    # takes tutor.chats; which it was is not known here, so
+                    # only the fields are kept
+                    entry = self._slot((student_id, tutor.id))
+                    entry.record = dataclasses.replace(tutor, chats=[])
+                    entry.tail, entry.complete, entry.count = None, False, None
+                    if roster is not None and tutor.id not in roster:
+                        roster.append(tutor.id)
+
+    def delete_tutor(self, student_id: str, tutor_id: str) -> None:
+        with self._writing(student_id):
+            self.connector.delete_tutor(student_id, tutor_id)
+            with self._lock:
+                self._drop((student_id, tutor_id))
+                roster = self._rosters.get(student_id)
+                if roster is not None and tutor_id in roster:
+                    roster.remove(tutor_id)
+
+    def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                   before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                   reverse: bool = False) -> List[SessionChat]:
+        bounded = before_ts is not None or after_ts is not None
+        with self._lock:
+            entry = self._get((student_id, tutor_id))
+            if entry is not None and entry.tail is not None:
+                if entry.complete:
+                    self._hit(True)
+                    return window_chats(entry.tail, limit, before_ts, after_ts, reverse)
+                if not bounded and limit is not None and limit <= len(entry.tail):
+                    self._hit(True)
+                    return window_chats(entry.tail, limit, reverse=reverse)
+            self._hit(False)
+
+        generation = self._generation_of(student_id)
+        if bounded:
+            # Only the newest chats are cached, so bounded windows pass through
+            window = {k: v for k, v in (('limit', limit), ('before_ts', before_ts),
+                                        ('after_ts', after_ts), ('reverse', reverse)) if v is not None and v is not False}
+            return self.connector.list_chats(student_id, tutor_id, **window)
+        fetch = None if limit is None else max(limit, self.tail_size)
+        chats = list(self.connector.list_chats(student_id, tutor_id, limit=fetch) if fetch is not None
+                     else self.connector.list_chats(student_id, tutor_id))
+        with self._lock:
+            if self._fresh(student_id, generation):
+                entry = self._slot((student_id, tutor_id))
+                complete = fetch is None or len(chats) < fetch
+                self._set_chats(entry, chats, complete, entry.count)
+        return window_chats(chats, limit, reverse=reverse)
+
+    def count_chats(self, student_id: str, tutor_id: str) -> int:
+        with self._lock:
+            entry = self._get((student_id, tutor_id))
+            if entry is not None and entry.count is not None:
+                self._hit(True)
+                return entry.count
+            self._hit(False)
+
+        generation = self._generation_of(student_id)
+        count = self.connector.count_chats(student_id, tutor_id)
+        with self._lock:
+            if self._fresh(student_id, generation):
+                self._slot((student_id, tutor_id)).count = count
+        return count
+
+    def append_chat(self, student_id: str, tutor_id: str, chat: SessionChat) -> None:
+        self.append_chats(student_id, tutor_id, [chat])
+
+    def append_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        if not chats:
+            return
+        with self._writing(student_id):
+            self.connector.append_chats(student_id, tutor_id, chats)
+            with self._lock:
+                entry = self._entries.get((student_id, tutor_id))
+                if entry is None:
+                    # Appending may have created the tutor
+                    roster = self._rosters.get(student_id)
+                    if roster is not None and tutor_id not in roster:
+                        self._rosters.pop(student_id)
+                    return
+                if entry.tail is not None:
+                    entry.tail.extend(chats)
+                    if len(entry.tail) > self.tail_size:
+                        del entry.tail[:len(entry.tail) - self.tail_size]
+                        entry.complete = False
+                if entry.count is not None:
+                    entry.count += len(chats)
+
+    def replace_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        with self._writing(student_id):
+            self.connector.replace_chats(student_id, tutor_id, chats)
+            with self._lock:
+                entry = self._entries.get((student_id, tutor_id))
+                if entry is not None:
+                    # A replace of a missing tutor is a no-op, so rather than
+                    # caching ``chats`` the next read refills
+                    entry.tail, entry.complete, entry.count = None, False, None
+
+    def list_chats_many(self, keys: List[Key]) -> Dict[Key, List[SessionChat]]:
+        return {key: self.list_chats(*key) for key in keys}
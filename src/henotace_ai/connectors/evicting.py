@@ -0,0 +1,292 @@
+"""
+Capacity-bounded in-memory connector for Henotace AI Python SDK
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..types import StorageConnector, SessionStudent, SessionTutor, SessionChat
+from .inmemory import InMemoryConnector
+
+
+@dataclass
+class EvictionStats:
+    """Eviction and reload counters of an ``EvictingConnector``"""
+    evictions: int = 0
+    reloads: int = 0
+    spill_writes: int = 0
+    resident_students: int = 0
+    resident_chats: int = 0
+    spilled_students: int = 0
+
+
+class EvictingConnector(InMemoryConnector):
+    """
+    In-memory connector that spills idle students to another connector
+
+    Students are kept in least-recently-used order. Once more than
+    ``max_students`` students or ``max_chats`` chats are resident, the least
+    recently used students are written to ``spill`` and dropped from memory
+    until the totals fall to ``low_watermark`` times the limits. Students idle
+    for longer than ``idle_ttl`` seconds are evicted as well, whenever the
+    connector is used or ``evict_idle()`` is called. Accessing an evicted
+    student reloads it from ``spill`` first, so callers never see the
+    difference except in latency.
+
+    A reloaded student keeps its copy in ``spill``; evicting it again only
+    writes to ``spill`` if it changed. Changes made to returned objects
+    count only when followed by a write call such as ``upsert_tutor``.
+
+    ``list_students`` and ``get_all`` load evicted students transiently
+    (resident students first) without making them resident again.
+
+    Args:
+        spill: Connector that holds evicted students (e.g. ``SQLiteConnector``)
+        max_students: Most students kept in memory (None for no limit)
+        max_chats: Most chats kept in memory across all students (None for no limit)
+        idle_ttl: Seconds after which an unused student is evicted (None to keep)
+        low_watermark: Fraction of the limits that eviction brings usage down to
+        **kwargs: ``InMemoryConnector`` options such as ``columnar``
+    """
+
+    def __init__(self, spill: StorageConnector, max_students: Optional[int] = None,
+                 max_chats: Optional[int] = None, idle_ttl: Optional[float] = None,
+                 low_watermark: float = 0.8, **kwargs: Any):
+        if kwargs.get('changes'):
+            # Evictions and reloads rewrite students, which the feed would report as changes
+            raise ValueError('EvictingConnector does not support changes; use the spill connector\'s feed')
+        super().__init__(**kwargs)
+        self.spill = spill
+        self.max_students = max_students
+        self.max_chats = max_chats
+        self.idle_ttl = idle_ttl
+        self.low_watermark = low_watermark
+        # Resident student id -> (last access, resident chat count), oldest first
+        self._lru: 'OrderedDict[str, Tuple[float, int]]' = OrderedDict()
+        self._resident_chats = 0
+        # Evicted student id -> name; their data lives in spill
+        self._spilled: Dict[str, Optional[str]] = {}
+        # Resident students whose spill copy is stale or missing
+        self._dirty = set()
+        self._evictions = 0
+        self._reloads = 0
+        self._spill_writes = 0
+        self._lru_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        # Nesting depth of _access per thread (InMemoryConnector methods call
+        # each other); only the outermost call evicts, after its stripe is released
+        self._local = threading.local()
+
+    @property
+    def stats(self) -> EvictionStats:
+        with self._lru_lock:
+            return EvictionStats(
+                evictions=self._evictions, reloads=self._reloads, spill_writes=self._spill_writes,
+                resident_students=len(self._lru), resident_chats=self._resident_chats,
+                spilled_students=len(self._spilled)
+            )
+
+    # Residency
+
+    def _load(self, student_id: str) -> None:
+        """Reload an evicted student; the caller holds its stripe"""
+        if student_id not in self._spilled:
+            return
+        student = SessionStudent(
+            id=student_id, name=self._spilled[student_id], tutors=self.spill.list_tutors(student_id)
+        )
+        super().upsert_student(student)
+        with self._lru_lock:
+            del self._spilled[student_id]
+            self._reloads += 1
+
+    def _touch(self, student_id: str, write: bool, delta: Optional[int] = None) -> None:
+        """
+        Record an access to a resident student; the caller holds its stripe
+
+        A write passes the change in its chat count as ``delta`` when it
+        knows it; otherwise, and on a student's first access, its tutors are
+        counted again.
+        """
+        student = self._students.get(student_id)
+        with self._lru_lock:
+            entry = self._lru.pop(student_id, None)
+            previous = entry[1] if entry is not None else 0
+            if student is None:
+                self._resident_chats -= previous
+                self._dirty.discard(student_id)
+                return
+            if entry is None or (write and delta is None):
+                size = sum(len(t.chats) for t in student.tutors)
+            else:
+                size = previous + (delta if write else 0)
+            self._lru[student_id] = (time.monotonic(), size)
+            self._resident_chats += size - previous
+            if write:
+                self._dirty.add(student_id)
+
+    def _chat_count(self, student_id: str, tutor_id: str) -> int:
+        tutor = self._find_tutor(student_id, tutor_id)
+        return len(tutor.chats) if tutor is not None else 0
+
+    def _access(self, student_id: str, write: bool, method: Callable[..., Any], *args: Any,
+                tutor_id: Optional[str] = None) -> Any:
+        """
+        Run ``method`` on a loaded student and record the access
+
+        A write confined to one tutor names it in ``tutor_id``, so only that
+        tutor's chats are counted before and after. Calls nested inside
+        another ``_access`` leave the recording to the outermost one.
+        """
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        try:
+            with self._stripes(student_id):
+                self._load(student_id)
+                measure = write and depth == 0 and tutor_id is not None
+                before = self._chat_count(student_id, tutor_id) if measure else 0
+                result = method(*args)
+                if depth == 0:
+                    delta = self._chat_count(student_id, tutor_id) - before if measure else None
+                    self._touch(student_id, write, delta)
+        finally:
+            self._local.depth = depth
+        if depth == 0:
+            self._maybe_evict()
+        return result
+
+    def _over(self, fraction: float) -> bool:
+        return ((self.max_students is not None and len(self._lru) > self.max_students * fraction)
+                or (self.max_chats is not None and self._resident_chats > self.max_chats * fraction))
+
+    def _next_victim(self, now: float, low: float) -> Optional[str]:
+        with self._lru_lock:
+            if not self._lru:
+                return None
+            student_id, (last, _) = next(iter(self._lru.items()))
+            if self._over(low) or (self.idle_ttl is not None and now - last > self.idle_ttl):
+                return student_id
+            return None
+
+    def _maybe_evict(self) -> None:
+        if not self._over(1.0) and self.idle_ttl is None:
+            return
+        # One thread evicts at a time; the others carry on
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            low = self.low_watermark if self._over(1.0) else 1.0
+            while True:
+                student_id = self._next_victim(now, low)
+                if student_id is None or not self.evict(student_id):
+                    return
+        finally:
+            self._evict_lock.release()
+
+    def evict(self, student_id: str) -> bool:
+        """Write a student to ``spill`` (if changed) and drop it from memory"""
+        with self._stripes(student_id):
+            student = self._students.get(student_id)
+            if student is None:
+                # Deleted under us; just forget it
+                with self._lru_lock:
+                    entry = self._lru.pop(student_id, None)
+                    if entry is not None:
+                        self._resident_chats -= entry[1]
+                return entry is not None
+            if student_id in self._dirty:
+                with self.spill.lock_student(student_id):
+                    self.spill.delete_student(student_id)
+                    self.spill.upsert_student(student)
+            super().delete_student(student_id)
+            with self._lru_lock:
+                if student_id in self._dirty:
+                    self._dirty.discard(student_id)
+                    self._spill_writes += 1
+                self._resident_chats -= self._lru.pop(student_id, (0.0, 0))[1]
+                self._spilled[student_id] = student.name
+                self._evictions += 1
+            return True
+
+    def evict_idle(self) -> None:
+        """Evict students idle for longer than ``idle_ttl`` and enforce the limits"""
+        self._maybe_evict()
+
+    # StorageConnector interface
+
+    def set_all(self, schema: Dict[str, List[SessionStudent]]) -> None:
+        self.spill.set_all({'students': []})
+        with self._lru_lock:
+            self._lru.clear()
+            self._spilled.clear()
+            self._dirty.clear()
+            self._resident_chats = 0
+        super().set_all(schema)
+        for student in schema.get('students', []):
+            with self._stripes(student.id):
+                self._touch(student.id, write=True)
+        self._maybe_evict()
+
+    def list_students(self) -> List[SessionStudent]:
+        with self._lru_lock:
+            spilled = list(self._spilled.items())
+        return list(super().list_students()) + [
+            SessionStudent(id=student_id, name=name, tutors=self.spill.list_tutors(student_id))
+            for student_id, name in spilled
+        ]
+
+    def list_student_headers(self) -> List[SessionStudent]:
+        with self._lru_lock:
+            spilled = list(self._spilled.items())
+        # The inherited default goes through list_students, which already adds the spilled ones
+        resident = [SessionStudent(id=s.id, name=s.name) for s in super().list_students()]
+        return resident + [SessionStudent(id=student_id, name=name) for student_id, name in spilled]
+
+    def upsert_student(self, student: SessionStudent) -> None:
+        # Reloads a spilled student first, since its other tutors are kept
+        self._access(student.id, True, super().upsert_student, student)
+
+    def delete_student(self, student_id: str) -> None:
+        with self._stripes(student_id):
+            self.spill.delete_student(student_id)
+            with self._lru_lock:
+                self._spilled.pop(student_id, None)
+            super().delete_student(student_id)
+            self._touch(student_id, write=True)
+
+    def list_tutors(self, student_id: str) -> List[SessionTutor]:
+        return self._access(student_id, False, super().list_tutors, student_id)
+
+    def upsert_tutor(self, student_id: str, tutor: SessionTutor) -> None:
+        # Recounted in full: the caller may have changed the stored tutor's chats in place
+        self._access(student_id, True, super().upsert_tutor, student_id, tutor)
+
+    def delete_tutor(self, student_id: str, tutor_id: str) -> None:
+        self._access(student_id, True, super().delete_tutor, student_id, tutor_id, tutor_id=tutor_id)
+
+    def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                   before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                   reverse: bool = False) -> List[SessionChat]:
+        return self._access(student_id, False, super().list_chats, student_id, tutor_id,
+                            limit, before_ts, after_ts, reverse)
+
+    def count_chats(self, student_id: str, tutor_id: str) -> int:
+        return self._access(student_id, False, super().count_chats, student_id, tutor_id)
+
+    def replace_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        self._access(student_id, True, super().replace_chats, student_id, tutor_id, chats, tutor_id=tutor_id)
+
+    def append_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        if chats:
+            self._access(student_id, True, super().append_chats, student_id, tutor_id, chats,
+                         tutor_id=tutor_id)
+
+    def get_tutors_many(self, student_id: str, tutor_ids: List[str]) -> Dict[str, SessionTutor]:
+        return self._access(student_id, False, super().get_tutors_many, student_id, tutor_ids)
+
+    def get_tutor(self, student_id: str, tutor_id: str) -> Optional[SessionTutor]:
+        return self._access(student_id, False, super().get_tutor, student_id, tutor_id)
@@ -2,113 +2,336 @@
 In-memory storage connector for Henotace AI Python SDK
 """
 
-from typing import Dict, List
-from ..types import StorageConnector, SessionStudent, SessionTutor, SessionChat
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+from ..types import StorageConnector, SessionStudent, SessionTutor, SessionChat, SessionSubject, window_chats
+from ..columnar import ChatColumns
+from ..codec import TextCodec, CompressedChat, get_codec
+from ..interning import BlobInterner
+from ..changes import (
+    ChangeFeed, RESET, STUDENT_UPSERTED, STUDENT_DELETED, TUTOR_UPSERTED, TUTOR_DELETED,
+    CHATS_APPENDED, CHATS_REPLACED
+)
+from .locking import StripedLock
+
+# Fields upsert_tutor copies onto an existing tutor; its id and chats stay
+_TUTOR_FIELDS = ('name', 'subject', 'context', 'persona', 'user_profile', 'metadata')
 
 
 class InMemoryConnector(StorageConnector):
     """
     In-memory storage connector for testing and simple use cases
+
+    Students are indexed by id and tutors by (student id, tutor id), so
+    lookups and chat appends cost the same no matter how many students
+    are stored. ``get_all``/``list_students`` still return plain lists.
+
+    The connector is thread-safe. Each student's data is guarded by one of
+    ``stripes`` locks, so different students proceed in parallel while every
+    operation on a tutor is atomic; ``lock_student`` holds a student's lock
+    across several operations. Lists handed out by ``list_tutors`` and
+    un-windowed ``list_chats`` are live views; copy them before iterating
+    while other threads write.
+
+    With ``columnar=True`` each tutor's chats are kept in a ``ChatColumns``
+    container. It behaves like a list but stores timestamps, flags and text
+    in flat buffers, which cuts memory use for large histories.
+
+    With ``compression`` set, each tutor's last ``active_window`` chats stay
+    plain and older ones are compressed as they fall out of the window.
+    They are decoded again whenever they are read.
+
+    With ``dedup=True`` equal ``context``, ``persona`` and ``user_profile``
+    values are stored once and shared by every tutor that has them (see
+    ``henotace_ai.interning``), so memory grows with the number of distinct
+    values rather than tutors. Shared values must not be edited in place.
+
+    With ``changes=N`` every write is also published to ``self.changes``, a
+    ``ChangeFeed`` that keeps the last N changes in memory (see
+    ``henotace_ai.changes``).
+
+    Args:
+        stripes: Number of per-student locks
+        columnar: Store chats in ``ChatColumns`` instead of lists
+        compression: None, 'zlib', 'zstd' or a ``TextCodec`` for older chats
+        active_window: Most recent chats per tutor kept uncompressed
+        dedup: Share equal persona/context/profile values between tutors
+        changes: Keep a feed of this many recent changes (None for no feed)
     """
-    
-    def __init__(self):
-        self.storage = {'students': []}
-    
+
+    # Columnar packing rewrites the text buffer tail, so it waits for a batch
+    _PACK_BATCH = 32
+
+    def __init__(self, stripes: int = 64, columnar: bool = False,
+                 compression: Union[None, str, TextCodec] = None, active_window: int = 64,
+                 dedup: bool = False, changes: Optional[int] = None):
+        self.columnar = columnar
+        self.codec = get_codec(compression)
+        self.active_window = active_window
+        self._students: Dict[str, SessionStudent] = {}
+        self._tutors: Dict[Tuple[str, str], SessionTutor] = {}
+        self._student_list: Optional[List[SessionStudent]] = None
+        self.interner = BlobInterner() if dedup else None
+        # (student id, tutor id) -> interner keys the tutor holds references to
+        self._blob_refs: Dict[Tuple[str, str], tuple] = {}
+        self.changes = ChangeFeed(changes) if changes else None
+        self._stripes = StripedLock(stripes)
+        # Guards membership of _students and the cached list
+        self._index_lock = threading.Lock()
+
+    @property
+    def storage(self) -> Dict[str, List[SessionStudent]]:
+        """Schema view of the stored data"""
+        return {'students': self.list_students()}
+
+    @storage.setter
+    def storage(self, schema: Dict[str, List[SessionStudent]]) -> None:
+        self.set_all(schema)
+
+    def lock_student(self, student_id: str) -> threading.RLock:
+        return self._stripes(student_id)
+
+    def _adopt(self, tutor: SessionTutor) -> SessionTutor:
+        """Move a stored tutor's chats into columns when columnar storage is on"""
+        if self.columnar and not isinstance(tutor.chats, ChatColumns):
+            tutor.chats = ChatColumns(tutor.chats, self.codec)
+        elif self.codec is not None and not isinstance(tutor.chats, ChatColumns):
+            # Tiered on a copy, so the caller's list keeps plain chats
+            tutor.chats = list(tutor.chats)
+        self._tier(tutor)
+        return tutor
+
+    def _intern(self, student_id: str, tutor: SessionTutor) -> None:
+        """Share the tutor's field values and drop the references it held before"""
+        if self.interner is None:
+            return
+        key = (student_id, tutor.id)
+        previous = self._blob_refs.get(key, ())
+        self._blob_refs[key] = self.interner.intern_tutor(tutor)
+        for blob in previous:
+            self.interner.release(blob)
+
+    def _emit(self, kind: str, student_id: Optional[str] = None, tutor_id: Optional[str] = None,
+              chats: Optional[List[SessionChat]] = None) -> None:
+        if self.changes is not None:
+            self.changes.publish(kind, student_id, tutor_id, chats)
+
+    def _emit_tutor(self, student_id: str, tutor: SessionTutor, is_new: bool) -> None:
+        self._emit(TUTOR_UPSERTED, student_id, tutor.id)
+        if is_new and tutor.chats:
+            self._emit(CHATS_APPENDED, student_id, tutor.id, tutor.chats)
+
+    def _unintern(self, student_id: str, tutor_id: str) -> None:
+        if self.interner is None:
+            return
+        for blob in self._blob_refs.pop((student_id, tutor_id), ()):
+            self.interner.release(blob)
+
+    @staticmethod
+    def _writable(tutor: SessionTutor) -> None:
+        """Copy read-only chat views (e.g. from a lazy snapshot) into a list before writing"""
+        if not isinstance(tutor.chats, (list, ChatColumns)):
+            tutor.chats = list(tutor.chats)
+
+    def _tier(self, tutor: SessionTutor, appended: Optional[int] = None) -> None:
+        """Compress chats that have left the active window
+
+        ``appended`` is the number of chats just added; only those can have
+        pushed older chats out. Without it every chat before the window is checked.
+        """
+        if self.codec is None:
+            return
+        chats = tutor.chats
+        cut = len(chats) - self.active_window
+        if cut <= 0:
+            return
+        if isinstance(chats, ChatColumns):
+            if chats.codec is self.codec and (appended is None or cut - chats.packed >= self._PACK_BATCH):
+                chats.pack(cut)
+            return
+        start = 0 if appended is None else max(cut - appended, 0)
+        for i in range(start, cut):
+            chats[i] = CompressedChat.pack(chats[i], self.codec)
+
+    def _find_tutor(self, student_id: str, tutor_id: str) -> Optional[SessionTutor]:
+        """Indexed tutor lookup, repairing the index if the lists were edited directly"""
+        key = (student_id, tutor_id)
+        tutor = self._tutors.get(key)
+        if tutor is not None:
+            return tutor
+
+        student = self._students.get(student_id)
+        if student is None:
+            return None
+        for t in student.tutors:
+            if t.id == tutor_id:
+                self._tutors[key] = t
+                return t
+        return None
+
     def get_all(self) -> Dict[str, List[SessionStudent]]:
         return self.storage
-    
+
     def set_all(self, schema: Dict[str, List[SessionStudent]]) -> None:
-        self.storage = schema
-    
+        with self._stripes.all(), self._index_lock:
+            self._students = {}
+            self._tutors = {}
+            self._student_list = None
+            self._blob_refs = {}
+            if self.interner is not None:
+                self.interner.clear()
+            for student in schema.get('students', []):
+                self._students[student.id] = student
+                for tutor in student.tutors:
+                    self._tutors[(student.id, tutor.id)] = self._adopt(tutor)
+                    self._intern(student.id, tutor)
+            self._emit(RESET)
+
     def list_students(self) -> List[SessionStudent]:
-        return self.storage.get('students', [])
-    
+        with self._index_lock:
+            if self._student_list is None:
+                self._student_list = list(self._students.values())
+            return self._student_list
+
     def upsert_student(self, student: SessionStudent) -> None:
-        students = self.storage.get('students', [])
-        existing_index = None
-        
-        for i, s in enumerate(students):
-            if s.id == student.id:
-                existing_index = i
-                break
-        
-        if existing_index is not None:
-            students[existing_index] = student
-        else:
-            students.append(student)
-        
-        self.storage['students'] = students
-    
+        with self._stripes(student.id):
+            previous = self._students.get(student.id)
+            if previous is not None:
+                # Like the SQLite and log connectors: update the name, upsert the
+                # given tutors and keep the others
+                previous.name = student.name
+                self._emit(STUDENT_UPSERTED, student.id)
+                for tutor in list(student.tutors):
+                    self.upsert_tutor(student.id, tutor)
+                return
+
+            with self._index_lock:
+                self._students[student.id] = student
+                self._student_list = None
+            self._emit(STUDENT_UPSERTED, student.id)
+            for tutor in student.tutors:
+                self._tutors[(student.id, tutor.id)] = self._adopt(tutor)
+                self._intern(student.id, tutor)
+                self._emit_tutor(student.id, tutor, True)
+
     def delete_student(self, student_id: str) -> None:
-        students = self.storage.get('students', [])
-        self.storage['students'] = [s for s in students if s.id != student_id]
-    
+        with self._stripes(student_id):
+            with self._index_lock:
+                student = self._students.pop(student_id, None)
+                if student is None:
+                    return
+                self._student_list = None
+            for tutor in student.tutors:
+                self._tutors.pop((student_id, tutor.id), None)
+                self._unintern(student_id, tutor.id)
+            self._emit(STUDENT_DELETED, student_id)
+
     def list_tutors(self, student_id: str) -> List[SessionTutor]:
-        students = self.storage.get('students', [])
-        for student in students:
-            if student.id == student_id:
-                return student.tutors
+        student = self._students.get(student_id)
+        if student is not None:
+            return student.tutors
         return []
-    
+
     def upsert_tutor(self, student_id: str, tutor: SessionTutor) -> None:
-        students = self.storage.get('students', [])
-        
-        for student in students:
-            if student.id == student_id:
-                # Update existing tutor or add new one
-                existing_index = None
-                for i, t in enumerate(student.tutors):
-                    if t.id == tutor.id:
-                        existing_index = i
-                        break
-                
-                if existing_index is not None:
-                    student.tutors[existing_index] = tutor
-                else:
-                    student.tutors.append(tutor)
+        with self._stripes(student_id):
+            student = self._students.get(student_id)
+
+            if student is None:
+                # Student doesn't exist, create it
+                self._adopt(tutor)
+                self._intern(student_id, tutor)
+                with self._index_lock:
+                    self._students[student_id] = SessionStudent(id=student_id, tutors=[tutor])
+                    self._student_list = None
+                self._tutors[(student_id, tutor.id)] = tutor
+                self._emit_tutor(student_id, tutor, True)
                 return
-        
-        # Student doesn't exist, create it
-        new_student = SessionStudent(id=student_id, tutors=[tutor])
-        students.append(new_student)
-        self.storage['students'] = students
-    
+
+            existing = self._find_tutor(student_id, tutor.id)
+            if existing is not None:
+                # The stored chats are kept: copy the fields onto the stored
+                # tutor (a no-op when the live object itself is passed back)
+                if existing is not tutor:
+                    for name in _TUTOR_FIELDS:
+                        setattr(existing, name, getattr(tutor, name))
+                self._intern(student_id, existing)
+                self._emit_tutor(student_id, existing, False)
+                return
+            self._adopt(tutor)
+            self._intern(student_id, tutor)
+            student.tutors.append(tutor)
+            self._tutors[(student_id, tutor.id)] = tutor
+            self._emit_tutor(student_id, tutor, True)
+
     def delete_tutor(self, student_id: str, tutor_id: str) -> None:
-        students = self.storage.get('students', [])
-        
-        for student in students:
-            if student.id == student_id:
-                student.tutors = [t for t in student.tutors if t.id != tutor_id]
+        with self._stripes(student_id):
+            student = self._students.get(student_id)
+            if student is None:
                 return
-    
-    def list_chats(self, student_id: str, tutor_id: str) -> List[SessionChat]:
-        tutors = self.list_tutors(student_id)
-        for tutor in tutors:
-            if tutor.id == tutor_id:
+            remaining = [t for t in student.tutors if t.id != tutor_id]
+            if len(remaining) == len(student.tutors):
+                return
+            student.tutors = remaining
+            self._tutors.pop((student_id, tutor_id), None)
+            self._unintern(student_id, tutor_id)
+            self._emit(TUTOR_DELETED, student_id, tutor_id)
+
+    def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                   before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                   reverse: bool = False) -> List[SessionChat]:
+        with self._stripes(student_id):
+            tutor = self._find_tutor(student_id, tutor_id)
+            if tutor is None:
+                return []
+            if limit is None and before_ts is None and after_ts is None and not reverse:
                 return tutor.chats
-        return []
-    
+            return window_chats(tutor.chats, limit, before_ts, after_ts, reverse)
+
+    def count_chats(self, student_id: str, tutor_id: str) -> int:
+        with self._stripes(student_id):
+            tutor = self._find_tutor(student_id, tutor_id)
+            return len(tutor.chats) if tutor is not None else 0
+
     def append_chat(self, student_id: str, tutor_id: str, chat: SessionChat) -> None:
-        tutors = self.list_tutors(student_id)
-        for tutor in tutors:
-            if tutor.id == tutor_id:
-                tutor.chats.append(chat)
-                self.upsert_tutor(student_id, tutor)
-                return
-        
-        # Tutor doesn't exist, create it
-        new_tutor = SessionTutor(
-            id=tutor_id,
-            name=tutor_id,
-            subject=SessionSubject(id='unknown', name='Unknown', topic=''),
-            chats=[chat]
-        )
-        self.upsert_tutor(student_id, new_tutor)
-    
+        self.append_chats(student_id, tutor_id, [chat])
+
     def replace_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
-        tutors = self.list_tutors(student_id)
-        for tutor in tutors:
-            if tutor.id == tutor_id:
-                tutor.chats = chats
-                self.upsert_tutor(student_id, tutor)
+        with self._stripes(student_id):
+            tutor = self._find_tutor(student_id, tutor_id)
+            if tutor is not None:
+                # Stored as a copy: tiering must not touch the caller's list
+                tutor.chats = ChatColumns(chats, self.codec) if self.columnar else list(chats)
+                self._tier(tutor)
+                self._emit(CHATS_REPLACED, student_id, tutor_id)
+
+    def append_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        if not chats:
+            return
+        with self._stripes(student_id):
+            tutor = self._find_tutor(student_id, tutor_id)
+            if tutor is not None:
+                self._writable(tutor)
+                tutor.chats.extend(chats)
+                self._tier(tutor, len(chats))
+                self._emit(CHATS_APPENDED, student_id, tutor_id, chats)
                 return
+
+            # Tutor doesn't exist, create it
+            self.upsert_tutor(student_id, SessionTutor(
+                id=tutor_id,
+                name=tutor_id,
+                subject=SessionSubject(id='unknown', name='Unknown', topic=''),
+                chats=list(chats)
+            ))
+
+    def get_tutors_many(self, student_id: str, tutor_ids: List[str]) -> Dict[str, SessionTutor]:
+        with self._stripes(student_id):
+            found = {}
+            for tutor_id in tutor_ids:
+                tutor = self._find_tutor(student_id, tutor_id)
+                if tutor is not None:
+                    found[tutor_id] = tutor
+            return found
+
+    def list_chats_many(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[SessionChat]]:
+        return {key: self.list_chats(*key) for key in keys}
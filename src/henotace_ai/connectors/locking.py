@@ -0,0 +1,44 @@
+"""
+Lock striping for Henotace AI Python SDK storage connectors
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterator
+
+
+class StripedLock:
+    """
+    Fixed pool of re-entrant locks, one picked per key
+
+    A key always maps to the same lock, so work on one student is serialized
+    while different students usually proceed in parallel. Two keys can share
+    a stripe; that only costs parallelism, never correctness.
+
+    Args:
+        stripes: Number of locks in the pool
+    """
+
+    def __init__(self, stripes: int = 64):
+        if stripes < 1:
+            raise ValueError('stripes must be at least 1')
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def __call__(self, key: Hashable) -> threading.RLock:
+        """The lock guarding ``key``"""
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def all(self) -> Iterator[None]:
+        """Hold every stripe, for operations that span all keys"""
+        # Always acquired in the same order, so two callers cannot deadlock
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
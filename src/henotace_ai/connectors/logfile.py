@@ -0,0 +1,667 @@
+"""
+Append-only log-structured storage connector for Henotace AI Python SDK
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..types import (
+    StorageConnector, SessionStudent, SessionTutor, SessionChat, SessionSubject, HenotaceError,
+    Logger, LogLevel, window_chats
+)
+from ..logger import create_logger
+from ..changes import (
+    FileChangeFeed, RESET, STUDENT_UPSERTED, STUDENT_DELETED, TUTOR_UPSERTED, TUTOR_DELETED,
+    CHATS_APPENDED, CHATS_REPLACED
+)
+
+# A record location: (segment id, byte offset, index inside a batch record or -1,
+# index inside a replace record or -1)
+Location = Tuple[int, int, int, int]
+
+_SEGMENT_PREFIX = 'segment-'
+_SEGMENT_SUFFIX = '.log'
+
+
+@dataclass
+class _TutorEntry:
+    record: Optional[Location] = None
+    chats: List[Location] = field(default_factory=list)
+
+
+@dataclass
+class _StudentEntry:
+    record: Optional[Location] = None
+    tutors: Dict[str, _TutorEntry] = field(default_factory=dict)
+
+
+def _tutor_record(student_id: str, tutor: SessionTutor) -> Dict[str, Any]:
+    subject = tutor.subject or SessionSubject(id='unknown', name='Unknown', topic='')
+    return {
+        'op': 'tutor', 's': student_id, 't': tutor.id, 'name': tutor.name,
+        'subject': [subject.id, subject.name, subject.topic],
+        'context': tutor.context, 'persona': tutor.persona,
+        'user_profile': tutor.user_profile, 'metadata': tutor.metadata
+    }
+
+
+def _chat_fields(chat: SessionChat) -> list:
+    return [chat.message, bool(chat.is_reply), chat.timestamp]
+
+
+class LogConnector(StorageConnector):
+    """
+    Durable connector whose write path is a sequential file append
+
+    Every write becomes one JSON line in the active segment file. An
+    in-memory index maps each student and tutor to record offsets, and
+    reads seek straight to them. On open, segments are replayed to rebuild
+    the index, and a torn record at the end of the last segment is cut off.
+
+    ``replace_chats`` and deletes leave dead records behind. Once enough have
+    piled up, a background thread rewrites the live data from sealed segments
+    into a new segment and then deletes them. ``compact()`` runs compaction
+    on demand.
+
+    Appends go to a single file, so writes are serialized behind one lock.
+    ``lock_student`` is a ``transaction()``: it holds that lock and writes
+    the enclosed operations as one record.
+
+    With ``changes=N`` every write is also published to ``self.changes``, a
+    ``FileChangeFeed`` kept in ``changes.log`` beside the segments. Changes
+    made in a transaction are published once its record is written, and
+    dropped if it rolls back.
+
+    Args:
+        directory: Directory holding the segment files
+        fsync: 'always' (fsync every write), 'interval' (at most every
+            fsync_interval seconds) or 'never' (leave it to the OS)
+        fsync_interval: Seconds between fsyncs in 'interval' mode
+        segment_bytes: Size at which the active segment is sealed
+        compact_garbage: Dead records that trigger background compaction
+            (None disables automatic compaction)
+        changes: Keep a feed of this many recent changes (None for no feed)
+        logger: Where background compaction failures are reported
+            (default: console, warnings and errors)
+    """
+
+    def __init__(self, directory: str, fsync: str = 'interval', fsync_interval: float = 1.0,
+                 segment_bytes: int = 64 * 1024 * 1024, compact_garbage: Optional[int] = 10000,
+                 changes: Optional[int] = None, logger: Optional[Logger] = None):
+        if fsync not in ('always', 'interval', 'never'):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+        self.compact_garbage = compact_garbage
+        self.logger = logger or create_logger(LogLevel.WARN)
+
+        self._lock = threading.RLock()
+        self._students: Dict[str, _StudentEntry] = {}
+        self._readers: Dict[int, Any] = {}
+        self._batch: Optional[List[Dict[str, Any]]] = None
+        self._batch_depth = 0
+        # Changes made inside the open transaction, published when it is written
+        self._pending: List[tuple] = []
+        self._garbage = 0
+        self._last_sync = time.monotonic()
+        self._compactor: Optional[threading.Thread] = None
+        self._compact_lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith('.tmp'):
+                os.remove(os.path.join(directory, name))
+        segments = self._segment_ids()
+        for i, segment in enumerate(segments):
+            self._replay(segment, last=i == len(segments) - 1)
+
+        self._active_id = segments[-1] if segments else 1
+        self._active = open(self._segment_path(self._active_id), 'ab')
+        self._active_size = self._active.tell()
+        self.changes = FileChangeFeed(directory, changes, fsync=fsync == 'always') if changes else None
+
+    # Segment files
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{segment:08d}{_SEGMENT_SUFFIX}")
+
+    def _segment_ids(self) -> List[int]:
+        ids = []
+        for name in os.listdir(self.directory):
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX):
+                ids.append(int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]))
+        return sorted(ids)
+
+    def _reader(self, segment: int):
+        reader = self._readers.get(segment)
+        if reader is None:
+            reader = open(self._segment_path(segment), 'rb')
+            self._readers[segment] = reader
+        return reader
+
+    def _read_record(self, segment: int, offset: int) -> Dict[str, Any]:
+        reader = self._reader(segment)
+        reader.seek(offset)
+        return json.loads(reader.readline())
+
+    def _roll_segment(self, skip: int = 0) -> None:
+        """Seal the active segment and start a new one, leaving ``skip`` ids free before it"""
+        self._sync(force=True)
+        self._active.close()
+        self._active_id += 1 + skip
+        self._active = open(self._segment_path(self._active_id), 'ab')
+        self._active_size = 0
+
+    def _sync(self, force: bool = False) -> None:
+        self._active.flush()
+        if self.fsync == 'never' and not force:
+            return
+        now = time.monotonic()
+        if force or self.fsync == 'always' or now - self._last_sync >= self.fsync_interval:
+            os.fsync(self._active.fileno())
+            self._last_sync = now
+
+    def _sync_directory(self) -> None:
+        if os.name == 'nt':
+            return
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # Replay
+
+    def _replay(self, segment: int, last: bool) -> None:
+        path = self._segment_path(segment)
+        offset = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('torn record')
+                    record = json.loads(line)
+                except ValueError:
+                    if not last:
+                        raise HenotaceError(f"Corrupt log segment {path} at offset {offset}")
+                    break
+                self._apply(record, (segment, offset, -1, -1))
+                offset += len(line)
+        if os.path.getsize(path) != offset:
+            # Crash mid-write: drop the torn tail so new records start cleanly
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+
+    def _apply(self, record: Dict[str, Any], location: Location) -> None:
+        """Update the index for a record that was just written or replayed"""
+        op = record['op']
+        if op == 'batch':
+            segment, offset = location[0], location[1]
+            for i, item in enumerate(record['ops']):
+                self._apply(item, (segment, offset, i, -1))
+            return
+
+        if op == 'student':
+            self._students.setdefault(record['s'], _StudentEntry()).record = location
+        elif op == 'del_student':
+            student = self._students.pop(record['s'], None)
+            if student is not None:
+                self._garbage += 1 + sum(1 + len(t.chats) for t in student.tutors.values())
+        elif op == 'del_tutor':
+            student = self._students.get(record['s'])
+            tutor = student.tutors.pop(record['t'], None) if student else None
+            if tutor is not None:
+                self._garbage += 1 + len(tutor.chats)
+        else:
+            student = self._students.setdefault(record['s'], _StudentEntry())
+            tutor = student.tutors.get(record['t'])
+            if tutor is None:
+                tutor = student.tutors[record['t']] = _TutorEntry()
+            if op == 'tutor':
+                self._garbage += tutor.record is not None
+                tutor.record = location
+            elif op == 'chat':
+                tutor.chats.append(location)
+            elif op == 'replace':
+                self._garbage += len(tutor.chats)
+                segment, offset, index = location[0], location[1], location[2]
+                tutor.chats = [(segment, offset, index, j) for j in range(len(record['chats']))]
+
+    # Writes
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._batch is not None:
+                self._batch.append(record)
+                return
+            self._append(record)
+        self._maybe_compact()
+
+    def _emit(self, kind: str, student_id: Optional[str] = None, tutor_id: Optional[str] = None,
+              chats: Optional[List[SessionChat]] = None) -> None:
+        """Publish a change after its record is written (or once the open transaction is)"""
+        if self.changes is None:
+            return
+        with self._lock:
+            if self._batch is not None:
+                self._pending.append((kind, student_id, tutor_id, chats))
+            else:
+                self.changes.publish(kind, student_id, tutor_id, chats)
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        if self._active_size and self._active_size + len(line) > self.segment_bytes:
+            self._roll_segment()
+        location = (self._active_id, self._active_size, -1, -1)
+        self._active.write(line)
+        self._active_size += len(line)
+        self._sync()
+        self._apply(record, location)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Write the enclosed operations as one record (one append, one fsync)"""
+        with self._lock:
+            if self._batch_depth == 0:
+                self._batch = []
+            self._batch_depth += 1
+            try:
+                yield
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    # Nothing was written yet, so dropping the batch rolls it back
+                    self._batch = None
+                    self._pending = []
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                batch, self._batch = self._batch, None
+                if len(batch) == 1:
+                    self._append(batch[0])
+                elif batch:
+                    self._append({'op': 'batch', 'ops': batch})
+                pending, self._pending = self._pending, []
+                for change in pending:
+                    self.changes.publish(*change)
+        self._maybe_compact()
+
+    def _tutor_exists(self, student_id: str, tutor_id: str) -> bool:
+        """Existence check that also sees records still buffered in a transaction"""
+        for record in reversed(self._batch or ()):
+            if record['s'] != student_id:
+                continue
+            if record['op'] == 'del_student':
+                return False
+            if record.get('t') == tutor_id:
+                return record['op'] != 'del_tutor'
+        student = self._students.get(student_id)
+        return student is not None and tutor_id in student.tutors
+
+    def _student_exists(self, student_id: str) -> bool:
+        """Existence check that also sees records still buffered in a transaction"""
+        for record in reversed(self._batch or ()):
+            if record['s'] == student_id:
+                return record['op'] != 'del_student'
+        return student_id in self._students
+
+    def flush(self) -> None:
+        """Force buffered records to disk"""
+        with self._lock:
+            self._sync(force=True)
+            if self.changes is not None:
+                self.changes.sync()
+
+    def close(self) -> None:
+        """Flush and close all segment files"""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            self._sync(force=True)
+            self._active.close()
+            for reader in self._readers.values():
+                reader.close()
+            self._readers.clear()
+            if self.changes is not None:
+                self.changes.close()
+
+    # Reads
+
+    def _load_chats(self, locations: List[Location]) -> List[SessionChat]:
+        chats = []
+        cache: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        for segment, offset, index, position in locations:
+            record = cache.get((segment, offset))
+            if record is None:
+                record = cache[(segment, offset)] = self._read_record(segment, offset)
+            if index >= 0:
+                record = record['ops'][index]
+            fields = record['chats'][position] if position >= 0 else record['c']
+            chats.append(SessionChat(message=fields[0], is_reply=fields[1], timestamp=fields[2]))
+        return chats
+
+    def _load_tutor(self, tutor_id: str, entry: _TutorEntry, with_chats: bool = True) -> SessionTutor:
+        chats = self._load_chats(entry.chats) if with_chats else []
+        if entry.record is None:
+            return SessionTutor(
+                id=tutor_id, name=tutor_id,
+                subject=SessionSubject(id='unknown', name='Unknown', topic=''), chats=chats
+            )
+        segment, offset, index, _ = entry.record
+        record = self._read_record(segment, offset)
+        if index >= 0:
+            record = record['ops'][index]
+        subject_id, subject_name, topic = record['subject']
+        return SessionTutor(
+            id=tutor_id, name=record['name'],
+            subject=SessionSubject(id=subject_id, name=subject_name, topic=topic),
+            chats=chats, context=record['context'], persona=record['persona'],
+            user_profile=record['user_profile'], metadata=record['metadata']
+        )
+
+    def _student_name(self, entry: _StudentEntry) -> Optional[str]:
+        if entry.record is None:
+            return None
+        segment, offset, index, _ = entry.record
+        record = self._read_record(segment, offset)
+        if index >= 0:
+            record = record['ops'][index]
+        return record.get('name')
+
+    # StorageConnector interface
+
+    def get_all(self) -> Dict[str, List[SessionStudent]]:
+        return {'students': self.list_students()}
+
+    def set_all(self, schema: Dict[str, List[SessionStudent]]) -> None:
+        with self.transaction():
+            for student_id in list(self._students):
+                self._write({'op': 'del_student', 's': student_id})
+            for student in schema.get('students', []):
+                self._write({'op': 'student', 's': student.id, 'name': student.name})
+                for tutor in student.tutors:
+                    self._write(_tutor_record(student.id, tutor))
+                    self._write({'op': 'replace', 's': student.id, 't': tutor.id,
+                                 'chats': [_chat_fields(c) for c in tutor.chats]})
+            self._emit(RESET)
+
+    def list_students(self) -> List[SessionStudent]:
+        with self._lock:
+            return [
+                SessionStudent(
+                    id=student_id, name=self._student_name(entry),
+                    tutors=[self._load_tutor(tid, t) for tid, t in entry.tutors.items()]
+                )
+                for student_id, entry in self._students.items()
+            ]
+
+    def list_student_headers(self) -> List[SessionStudent]:
+        with self._lock:
+            return [SessionStudent(id=student_id, name=self._student_name(entry))
+                    for student_id, entry in self._students.items()]
+
+    def upsert_student(self, student: SessionStudent) -> None:
+        with self.transaction():
+            self._write({'op': 'student', 's': student.id, 'name': student.name})
+            self._emit(STUDENT_UPSERTED, student.id)
+            for tutor in student.tutors:
+                self.upsert_tutor(student.id, tutor)
+
+    def delete_student(self, student_id: str) -> None:
+        with self.transaction():
+            if not self._student_exists(student_id):
+                return
+            self._write({'op': 'del_student', 's': student_id})
+            self._emit(STUDENT_DELETED, student_id)
+
+    def list_tutors(self, student_id: str) -> List[SessionTutor]:
+        with self._lock:
+            entry = self._students.get(student_id)
+            if entry is None:
+                return []
+            return [self._load_tutor(tid, t) for tid, t in entry.tutors.items()]
+
+    def upsert_tutor(self, student_id: str, tutor: SessionTutor) -> None:
+        """Store tutor fields; chats are only written when the tutor is new"""
+        with self.transaction():
+            is_new = not self._tutor_exists(student_id, tutor.id)
+            self._write(_tutor_record(student_id, tutor))
+            self._emit(TUTOR_UPSERTED, student_id, tutor.id)
+            if is_new and tutor.chats:
+                self._write({'op': 'replace', 's': student_id, 't': tutor.id,
+                             'chats': [_chat_fields(c) for c in tutor.chats]})
+                self._emit(CHATS_APPENDED, student_id, tutor.id, tutor.chats)
+
+    def delete_tutor(self, student_id: str, tutor_id: str) -> None:
+        with self._lock:
+            if not self._tutor_exists(student_id, tutor_id):
+                return
+            self._write({'op': 'del_tutor', 's': student_id, 't': tutor_id})
+            self._emit(TUTOR_DELETED, student_id, tutor_id)
+
+    def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                   before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                   reverse: bool = False) -> List[SessionChat]:
+        """
+        List chats for a tutor
+
+        With only ``limit`` set, just the last ``limit`` records are read.
+        Timestamp bounds need each chat's timestamp, so they read the history.
+        """
+        with self._lock:
+            student = self._students.get(student_id)
+            entry = student.tutors.get(tutor_id) if student else None
+            if entry is None:
+                return []
+            locations = entry.chats
+            if before_ts is None and after_ts is None and limit is not None:
+                locations = locations[-limit:] if limit > 0 else []
+            chats = self._load_chats(locations)
+        return window_chats(chats, limit, before_ts, after_ts, reverse)
+
+    def count_chats(self, student_id: str, tutor_id: str) -> int:
+        with self._lock:
+            student = self._students.get(student_id)
+            entry = student.tutors.get(tutor_id) if student else None
+            return len(entry.chats) if entry is not None else 0
+
+    def _append_chat(self, student_id: str, tutor_id: str, chat: SessionChat) -> None:
+        if not self._tutor_exists(student_id, tutor_id):
+            # Tutor doesn't exist, create it
+            self._write(_tutor_record(student_id, SessionTutor(
+                id=tutor_id, name=tutor_id,
+                subject=SessionSubject(id='unknown', name='Unknown', topic='')
+            )))
+            self._emit(TUTOR_UPSERTED, student_id, tutor_id)
+        self._write({'op': 'chat', 's': student_id, 't': tutor_id, 'c': _chat_fields(chat)})
+
+    def append_chat(self, student_id: str, tutor_id: str, chat: SessionChat) -> None:
+        with self.transaction():
+            self._append_chat(student_id, tutor_id, chat)
+            self._emit(CHATS_APPENDED, student_id, tutor_id, [chat])
+
+    def replace_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        with self._lock:
+            if not self._tutor_exists(student_id, tutor_id):
+                return
+            self._write({'op': 'replace', 's': student_id, 't': tutor_id,
+                         'chats': [_chat_fields(c) for c in chats]})
+            self._emit(CHATS_REPLACED, student_id, tutor_id)
+
+    def append_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        """Append several chats as one log record"""
+        if not chats:
+            return
+        with self.transaction():
+            for chat in chats:
+                self._append_chat(student_id, tutor_id, chat)
+            self._emit(CHATS_APPENDED, student_id, tutor_id, chats)
+
+    def upsert_tutors(self, student_id: str, tutors: List[SessionTutor]) -> None:
+        with self.transaction():
+            for tutor in tutors:
+                self.upsert_tutor(student_id, tutor)
+
+    def get_tutors_many(self, student_id: str, tutor_ids: List[str]) -> Dict[str, SessionTutor]:
+        with self._lock:
+            entry = self._students.get(student_id)
+            if entry is None:
+                return {}
+            return {
+                tid: self._load_tutor(tid, entry.tutors[tid])
+                for tid in tutor_ids if tid in entry.tutors
+            }
+
+    def get_tutor(self, student_id: str, tutor_id: str) -> Optional[SessionTutor]:
+        """Get one tutor's fields without reading its chats"""
+        with self._lock:
+            entry = self._students.get(student_id)
+            if entry is None or tutor_id not in entry.tutors:
+                return None
+            return self._load_tutor(tutor_id, entry.tutors[tutor_id], with_chats=False)
+
+    # Compaction
+
+    def _maybe_compact(self) -> None:
+        if self.compact_garbage is None or self._garbage < self.compact_garbage:
+            return
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self._background_compact, daemon=True)
+            self._compactor.start()
+
+    def _background_compact(self) -> None:
+        try:
+            self.compact()
+        except Exception as e:
+            # The log stays valid if compaction fails; it is retried on the next write
+            self.logger.error('Log compaction failed', {'directory': self.directory, 'error': repr(e)})
+
+    def compact(self) -> None:
+        """Rewrite live records from sealed segments into one compacted segment"""
+        with self._compact_lock:
+            self._compact()
+
+    def _compact_failed(self, tmp_path: str, garbage: int) -> None:
+        """Undo a failed compaction: the sealed segments stay live and their garbage counts again"""
+        with self._lock:
+            self._garbage += garbage
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    def _compact(self) -> None:
+        with self._lock:
+            if self._batch is not None or self._garbage == 0:
+                return
+            # The compacted segment takes the id skipped here: after every
+            # sealed segment and before the new active one
+            self._roll_segment(skip=1)
+            target = self._active_id - 1
+            sealed = [s for s in self._segment_ids() if s < target]
+            sealed_set = set(sealed)
+            # Garbage made from here on is counted afresh; this is added back
+            # if the compaction fails, so the next write retries it
+            garbage, self._garbage = self._garbage, 0
+            snapshot = []
+            for student_id, student in self._students.items():
+                student_record = student.record if student.record and student.record[0] in sealed_set else None
+                tutors = []
+                for tutor_id, tutor in student.tutors.items():
+                    record = tutor.record if tutor.record and tutor.record[0] in sealed_set else None
+                    # Sealed chats always form a prefix: newer writes go to the active segment
+                    prefix = []
+                    for location in tutor.chats:
+                        if location[0] not in sealed_set:
+                            break
+                        prefix.append(location)
+                    if record or prefix:
+                        tutors.append((tutor_id, record, prefix))
+                if student_record or tutors:
+                    snapshot.append((student_id, student_record, tutors))
+
+        # Copy live data without holding the lock; writers only touch the active segment
+        tmp_path = self._segment_path(target) + '.tmp'
+        remap: Dict[Location, Location] = {}
+        readers: Dict[int, Any] = {}
+
+        def read(location: Location) -> Dict[str, Any]:
+            segment, offset, index, position = location
+            reader = readers.get(segment)
+            if reader is None:
+                reader = readers[segment] = open(self._segment_path(segment), 'rb')
+            reader.seek(offset)
+            record = json.loads(reader.readline())
+            if index >= 0:
+                record = record['ops'][index]
+            return record
+
+        try:
+            offset = 0
+            with open(tmp_path, 'wb') as out:
+                def emit(record: Dict[str, Any]) -> int:
+                    nonlocal offset
+                    line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+                    start = offset
+                    out.write(line)
+                    offset += len(line)
+                    return start
+
+                for student_id, student_record, tutors in snapshot:
+                    if student_record:
+                        remap[student_record] = (target, emit(read(student_record)), -1, -1)
+                    for tutor_id, tutor_record, prefix in tutors:
+                        if tutor_record:
+                            remap[tutor_record] = (target, emit(read(tutor_record)), -1, -1)
+                        if prefix:
+                            chats = []
+                            for segment, off, index, position in prefix:
+                                record = read((segment, off, index, -1))
+                                chats.append(record['chats'][position] if position >= 0 else record['c'])
+                            start = emit({'op': 'replace', 's': student_id, 't': tutor_id, 'chats': chats})
+                            for j, location in enumerate(prefix):
+                                remap[location] = (target, start, -1, j)
+                out.flush()
+                os.fsync(out.fileno())
+        except BaseException:
+            self._compact_failed(tmp_path, garbage)
+            raise
+        finally:
+            for reader in readers.values():
+                reader.close()
+
+        with self._lock:
+            for segment in sealed:
+                reader = self._readers.pop(segment, None)
+                if reader is not None:
+                    reader.close()
+            # The rename makes the compacted segment live. It holds every live
+            # record of the sealed segments and replays after them, so the log
+            # stays correct with any suffix of them left behind by a crash
+            # while they are removed (oldest first)
+            try:
+                os.replace(tmp_path, self._segment_path(target))
+            except BaseException:
+                self._compact_failed(tmp_path, garbage)
+                raise
+            self._sync_directory()
+            for segment in sealed:
+                os.remove(self._segment_path(segment))
+
+            for student in self._students.values():
+                if student.record in remap:
+                    student.record = remap[student.record]
+                for tutor in student.tutors.values():
+                    if tutor.record in remap:
+                        tutor.record = remap[tutor.record]
+                    tutor.chats = [remap.get(location, location) for location in tutor.chats]
@@ -0,0 +1,323 @@
+"""
+Memory-mapped, read-only chat archive for Henotace AI Python SDK
+
+An archive is a directory of column files::
+
+    manifest.json   students, tutors and each tutor's [start, count] chat range
+    ts.bin          int64 timestamp per chat (INT64_MIN for None)
+    reply.bin       uint8 is_reply flag per chat
+    off.bin         uint64 text offsets, one more than the number of chats
+    text.bin        UTF-8 message bodies back to back
+
+Readers map the column files and slice them as memoryviews. Message text
+is decoded only when a chat's ``message`` is read.
+"""
+
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ..types import (
+    StorageConnector, SessionStudent, SessionTutor, SessionChat, SessionSubject, HenotaceError,
+    window_chats
+)
+
+ARCHIVE_VERSION = 1
+_NO_TIMESTAMP = -(2 ** 63)
+_FLUSH_EVERY = 65536
+
+
+class _Columns:
+    """Open, mapped column files of one archive"""
+
+    def __init__(self, path: str, count: int):
+        self._maps = []
+        self.ts = self._map(os.path.join(path, 'ts.bin'), 'q')
+        self.reply = self._map(os.path.join(path, 'reply.bin'), 'B')
+        self.off = self._map(os.path.join(path, 'off.bin'), 'Q')
+        self.text = self._map(os.path.join(path, 'text.bin'), 'B')
+        if len(self.ts) != count or len(self.off) != count + 1:
+            raise HenotaceError(f"Archive columns in {path} do not match the manifest")
+
+    def _map(self, path: str, fmt: str) -> memoryview:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b'').cast(fmt)
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped).cast(fmt)
+
+    def close(self) -> None:
+        for view in (self.ts, self.reply, self.off, self.text):
+            view.release()
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                # A caller still holds a column slice; the map is freed with it
+                pass
+        self._maps = []
+
+
+class ArchivedChat(SessionChat):
+    """Chat backed by archive columns; the message is decoded on first access"""
+
+    def __init__(self, columns: _Columns, index: int):
+        self._columns = columns
+        self._index = index
+        self._message: Optional[str] = None
+
+    @property
+    def message(self) -> str:
+        if self._message is None:
+            columns = self._columns
+            start, end = columns.off[self._index], columns.off[self._index + 1]
+            self._message = bytes(columns.text[start:end]).decode('utf-8')
+        return self._message
+
+    @property
+    def is_reply(self) -> bool:
+        return bool(self._columns.reply[self._index])
+
+    @property
+    def timestamp(self) -> Optional[int]:
+        value = self._columns.ts[self._index]
+        return None if value == _NO_TIMESTAMP else value
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, SessionChat):
+            return NotImplemented
+        return (self.message, self.is_reply, self.timestamp) == (other.message, other.is_reply, other.timestamp)
+
+    def __repr__(self) -> str:
+        return f"ArchivedChat(message={self.message!r}, is_reply={self.is_reply!r}, timestamp={self.timestamp!r})"
+
+
+class ChatView:
+    """
+    Read-only sequence of one tutor's archived chats
+
+    ``timestamps``, ``is_reply`` and ``text_offsets`` are zero-copy column
+    slices for scans that do not need the message text.
+    """
+
+    def __init__(self, columns: _Columns, start: int, count: int):
+        self._columns = columns
+        self._start = start
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[ArchivedChat, List[ArchivedChat]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('chat index out of range')
+        return ArchivedChat(self._columns, self._start + index)
+
+    def __iter__(self) -> Iterator[ArchivedChat]:
+        for i in range(self._count):
+            yield ArchivedChat(self._columns, self._start + i)
+
+    def __eq__(self, other: Any) -> bool:
+        try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    @property
+    def timestamps(self) -> memoryview:
+        return self._columns.ts[self._start:self._start + self._count]
+
+    @property
+    def is_reply(self) -> memoryview:
+        return self._columns.reply[self._start:self._start + self._count]
+
+    @property
+    def text_offsets(self) -> memoryview:
+        return self._columns.off[self._start:self._start + self._count + 1]
+
+    def text_bytes(self) -> memoryview:
+        """Raw UTF-8 of all messages in this view, back to back"""
+        offsets = self.text_offsets
+        return self._columns.text[offsets[0]:offsets[-1]]
+
+
+def write_mmap_archive(source: Union[StorageConnector, Dict[str, List[SessionStudent]]], path: str) -> int:
+    """
+    Write an archive from a connector (or a get_all() schema)
+
+    A connector is read one student at a time (``list_student_headers``,
+    then ``list_tutors`` per student) and columns are flushed in chunks, so
+    memory use does not grow with the archive size.
+
+    Returns:
+        Number of chats written
+    """
+    if isinstance(source, StorageConnector):
+        students: Iterable[SessionStudent] = (
+            SessionStudent(id=header.id, name=header.name, tutors=source.list_tutors(header.id))
+            for header in source.list_student_headers()
+        )
+    else:
+        students = source.get('students', [])
+
+    os.makedirs(path, exist_ok=True)
+    manifest: Dict[str, Any] = {
+        'version': ARCHIVE_VERSION, 'byteorder': sys.byteorder, 'count': 0, 'students': []
+    }
+    ts, reply, off = array('q'), array('B'), array('Q', [0])
+    count = 0
+    text_size = 0
+
+    with open(os.path.join(path, 'ts.bin'), 'wb') as ts_f, \
+            open(os.path.join(path, 'reply.bin'), 'wb') as reply_f, \
+            open(os.path.join(path, 'off.bin'), 'wb') as off_f, \
+            open(os.path.join(path, 'text.bin'), 'wb') as text_f:
+
+        def flush() -> None:
+            ts.tofile(ts_f)
+            reply.tofile(reply_f)
+            off.tofile(off_f)
+            del ts[:], reply[:], off[:]
+
+        for student in students:
+            entry = {'id': student.id, 'name': student.name, 'tutors': []}
+            for tutor in student.tutors:
+                start = count
+                for chat in tutor.chats or []:
+                    data = chat.message.encode('utf-8')
+                    text_f.write(data)
+                    text_size += len(data)
+                    ts.append(_NO_TIMESTAMP if chat.timestamp is None else chat.timestamp)
+                    reply.append(1 if chat.is_reply else 0)
+                    off.append(text_size)
+                    count += 1
+                    if len(ts) >= _FLUSH_EVERY:
+                        flush()
+                subject = tutor.subject or SessionSubject(id='unknown', name='Unknown', topic='')
+                entry['tutors'].append({
+                    'id': tutor.id, 'name': tutor.name,
+                    'subject': [subject.id, subject.name, subject.topic],
+                    'context': tutor.context, 'persona': tutor.persona,
+                    'user_profile': tutor.user_profile, 'metadata': tutor.metadata,
+                    'start': start, 'count': count - start
+                })
+            manifest['students'].append(entry)
+        flush()
+
+    manifest['count'] = count
+    # The manifest goes last, so a half-written archive is never opened
+    tmp = os.path.join(path, 'manifest.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(path, 'manifest.json'))
+    return count
+
+
+class MmapArchiveConnector(StorageConnector):
+    """
+    Read-only connector over an archive written by ``write_mmap_archive``
+
+    Tutors come back with a ``ChatView`` in place of a chat list. The view
+    indexes and iterates like a list, but it materializes nothing up front.
+    Write methods raise ``HenotaceError``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != ARCHIVE_VERSION:
+            raise HenotaceError(f"Unsupported archive version: {manifest.get('version')}")
+        if manifest.get('byteorder') != sys.byteorder:
+            raise HenotaceError(f"Archive byte order {manifest.get('byteorder')} does not match this machine")
+
+        self._columns = _Columns(path, manifest['count'])
+        self._students: Dict[str, Tuple[Optional[str], Dict[str, Dict[str, Any]]]] = {}
+        for student in manifest['students']:
+            tutors = {tutor['id']: tutor for tutor in student['tutors']}
+            self._students[student['id']] = (student.get('name'), tutors)
+
+    def close(self) -> None:
+        """Unmap the column files; views handed out earlier become invalid"""
+        self._columns.close()
+
+    def __len__(self) -> int:
+        return len(self._columns.ts)
+
+    def _view(self, entry: Dict[str, Any]) -> ChatView:
+        return ChatView(self._columns, entry['start'], entry['count'])
+
+    def _tutor(self, entry: Dict[str, Any]) -> SessionTutor:
+        subject_id, subject_name, topic = entry['subject']
+        return SessionTutor(
+            id=entry['id'], name=entry['name'],
+            subject=SessionSubject(id=subject_id, name=subject_name, topic=topic),
+            chats=self._view(entry), context=entry['context'], persona=entry['persona'],
+            user_profile=entry['user_profile'], metadata=entry['metadata']
+        )
+
+    def scan(self) -> Iterator[Tuple[str, str, ChatView]]:
+        """Yield (student id, tutor id, chats) for every tutor in archive order"""
+        for student_id, (_, tutors) in self._students.items():
+            for tutor_id, entry in tutors.items():
+                yield student_id, tutor_id, self._view(entry)
+
+    def get_all(self) -> Dict[str, List[SessionStudent]]:
+        return {'students': self.list_students()}
+
+    def list_students(self) -> List[SessionStudent]:
+        return [
+            SessionStudent(id=sid, name=name, tutors=[self._tutor(t) for t in tutors.values()])
+            for sid, (name, tutors) in self._students.items()
+        ]
+
+    def list_student_headers(self) -> List[SessionStudent]:
+        return [SessionStudent(id=sid, name=name) for sid, (name, _) in self._students.items()]
+
+    def list_tutors(self, student_id: str) -> List[SessionTutor]:
+        student = self._students.get(student_id)
+        if student is None:
+            return []
+        return [self._tutor(t) for t in student[1].values()]
+
+    def _entry(self, student_id: str, tutor_id: str) -> Optional[Dict[str, Any]]:
+        student = self._students.get(student_id)
+        return student[1].get(tutor_id) if student else None
+
+    def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                   before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                   reverse: bool = False) -> Union[ChatView, List[SessionChat]]:
+        """
+        List chats for a tutor
+
+        Without timestamp bounds or ``reverse`` the result is a ``ChatView``
+        (over the last ``limit`` chats when a limit is given).
+        """
+        entry = self._entry(student_id, tutor_id)
+        if entry is None:
+            return ChatView(self._columns, 0, 0)
+        view = self._view(entry)
+        if before_ts is not None or after_ts is not None or reverse:
+            return window_chats(view, limit, before_ts, after_ts, reverse)
+        if limit is not None:
+            limit = min(max(limit, 0), len(view))
+            return ChatView(self._columns, entry['start'] + len(view) - limit, limit)
+        return view
+
+    def count_chats(self, student_id: str, tutor_id: str) -> int:
+        entry = self._entry(student_id, tutor_id)
+        return entry['count'] if entry is not None else 0
+
+    def _read_only(self, *args, **kwargs) -> None:
+        raise HenotaceError('MmapArchiveConnector is read-only')
+
+    set_all = upsert_student = delete_student = _read_only
+    upsert_tutor = delete_tutor = append_chat = replace_chats = _read_only
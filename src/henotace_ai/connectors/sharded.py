@@ -0,0 +1,306 @@
+"""
+Sharded storage connector for Henotace AI Python SDK
+"""
+
+import bisect
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, ContextManager, Dict, List, Optional, Tuple, Union
+
+from ..types import StorageConnector, SessionStudent, SessionTutor, SessionChat, HenotaceError
+
+
+def _hash(key: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring
+
+    Each node is placed at ``vnodes`` points on the ring and a key belongs
+    to the first point at or after its hash. Adding or removing a node only
+    moves the keys next to that node's points, about 1/N of them.
+    """
+
+    def __init__(self, nodes: List[str] = (), vnodes: int = 64):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(set(self._owners))
+
+    def add(self, node: str) -> None:
+        if node in self._owners:
+            raise ValueError(f"Node already on the ring: {node}")
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            at = bisect.bisect(self._points, point)
+            self._points.insert(at, point)
+            self._owners.insert(at, node)
+
+    def remove(self, node: str) -> None:
+        keep = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        if len(keep) == len(self._points):
+            raise ValueError(f"Node not on the ring: {node}")
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise HenotaceError('Hash ring has no nodes')
+        at = bisect.bisect_left(self._points, _hash(key))
+        return self._owners[at % len(self._points)]
+
+
+@dataclass
+class ShardStats:
+    """Call count and latency of one shard"""
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_seconds / self.calls * 1000 if self.calls else 0.0
+
+
+class ShardedConnector(StorageConnector):
+    """
+    Spread students over several connectors by consistent hash of student id
+
+    Every per-student operation goes to the one shard that owns the
+    student. ``list_students``, ``list_student_headers``, ``get_all`` and
+    ``set_all`` fan out to all shards in parallel; their results are
+    ordered by student id. ``list_chats_many`` groups its keys by shard.
+
+    ``add_shard`` and ``remove_shard`` reshard: only students whose owner
+    changes are copied, about 1/N of them. Reads keep going to the old
+    owner until every moving student is copied; then routing switches
+    and the old copies are deleted. Pause writes while resharding, since a
+    write to the old owner during the copy is not carried over, and fan-out
+    reads may briefly see a moving student twice.
+
+    ``stats()`` reports call counts and latency per shard, so hot or slow
+    shards show up.
+
+    Args:
+        shards: Connectors by shard name (a list is named '0', '1', ...)
+        vnodes: Ring points per shard; more points spread students more evenly
+    """
+
+    def __init__(self, shards: Union[Dict[str, StorageConnector], List[StorageConnector]], vnodes: int = 64):
+        if not isinstance(shards, dict):
+            shards = {str(i): shard for i, shard in enumerate(shards)}
+        if not shards:
+            raise ValueError('ShardedConnector needs at least one shard')
+        self.shards: Dict[str, StorageConnector] = dict(shards)
+        self.ring = HashRing(list(self.shards), vnodes)
+        self._stats = {name: ShardStats() for name in self.shards}
+        self._stats_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Stop the fan-out threads (the shards themselves stay open)"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def stats(self) -> Dict[str, ShardStats]:
+        """Snapshot of per-shard call counts and latency"""
+        with self._stats_lock:
+            return {name: ShardStats(s.calls, s.errors, s.total_seconds, s.max_seconds)
+                    for name, s in self._stats.items()}
+
+    def shard_for(self, student_id: str) -> str:
+        """Name of the shard that owns a student"""
+        return self.ring.node_for(student_id)
+
+    # Dispatch
+
+    def _call(self, name: str, method: str, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        failed = False
+        try:
+            return getattr(self.shards[name], method)(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                stats = self._stats[name]
+                stats.calls += 1
+                stats.errors += failed
+                stats.total_seconds += elapsed
+                stats.max_seconds = max(stats.max_seconds, elapsed)
+
+    def _route(self, student_id: str, method: str, *args: Any, **kwargs: Any) -> Any:
+        return self._call(self.shard_for(student_id), method, *args, **kwargs)
+
+    def _fan_out(self, calls: List[Tuple[str, str, tuple]]) -> List[Any]:
+        """Run (shard, method, args) calls in parallel and return results in order"""
+        if len(calls) <= 1:
+            return [self._call(name, method, *args) for name, method, args in calls]
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=len(self.shards),
+                                                    thread_name_prefix='henotace-shard')
+            # Submitted under the lock, so _switch cannot shut the pool down in between
+            futures = [self._executor.submit(self._call, name, method, *args) for name, method, args in calls]
+        return [future.result() for future in futures]
+
+    def _partition(self, students: List[SessionStudent]) -> Dict[str, List[SessionStudent]]:
+        parts: Dict[str, List[SessionStudent]] = {name: [] for name in self.shards}
+        for student in students:
+            parts[self.shard_for(student.id)].append(student)
+        return parts
+
+    # Resharding
+
+    def _copy_moving(self, sources: List[str], ring: HashRing,
+                     connectors: Dict[str, StorageConnector]) -> List[Tuple[str, str]]:
+        """
+        Copy students on ``sources`` whose owner on ``ring`` differs onto the new owner
+
+        Routing is left alone, so reads keep going to the old owner while
+        the data is copied. Returns the (source, student id) pairs to delete
+        once routing has switched.
+        """
+        copied = []
+        for name in sources:
+            for header in self._call(name, 'list_student_headers'):
+                target = ring.node_for(header.id)
+                if target == name:
+                    continue
+                tutors = self._call(name, 'list_tutors', header.id)
+                student = SessionStudent(id=header.id, name=header.name, tutors=tutors)
+                with connectors[target].lock_student(header.id):
+                    connectors[target].delete_student(header.id)
+                    connectors[target].upsert_student(student)
+                copied.append((name, header.id))
+        return copied
+
+    def _switch(self, shards: Dict[str, StorageConnector], ring: HashRing) -> None:
+        """Route by the new ring; the shard map is swapped first, so no route ever names a missing shard"""
+        self.shards = shards
+        self.ring = ring
+        # Calls in flight finish on the old pool, whose threads then exit; the
+        # next fan-out starts one sized for the new shards
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def add_shard(self, name: str, connector: StorageConnector) -> int:
+        """Add a shard and move the students it now owns onto it; returns how many moved"""
+        if name in self.shards:
+            raise ValueError(f"Shard already exists: {name}")
+        ring = HashRing(self.ring.nodes + [name], self.ring.vnodes)
+        with self._stats_lock:
+            self._stats[name] = ShardStats()
+        copied = self._copy_moving(list(self.shards), ring, {**self.shards, name: connector})
+        self._switch({**self.shards, name: connector}, ring)
+        for source, student_id in copied:
+            self._call(source, 'delete_student', student_id)
+        return len(copied)
+
+    def remove_shard(self, name: str) -> int:
+        """Move a shard's students to the remaining shards and drop it; returns how many moved"""
+        if name not in self.shards:
+            raise ValueError(f"No such shard: {name}")
+        if len(self.shards) == 1:
+            raise ValueError('Cannot remove the last shard')
+        ring = HashRing([node for node in self.ring.nodes if node != name], self.ring.vnodes)
+        removed = self.shards[name]
+        copied = self._copy_moving([name], ring, self.shards)
+        self._switch({n: shard for n, shard in self.shards.items() if n != name}, ring)
+        for _, student_id in copied:
+            removed.delete_student(student_id)
+        with self._stats_lock:
+            del self._stats[name]
+        return len(copied)
+
+    # StorageConnector interface
+
+    def get_all(self) -> Dict[str, List[SessionStudent]]:
+        return {'students': self.list_students()}
+
+    def set_all(self, schema: Dict[str, List[SessionStudent]]) -> None:
+        parts = self._partition(schema.get('students', []))
+        self._fan_out([(name, 'set_all', ({'students': part},)) for name, part in parts.items()])
+
+    def list_students(self) -> List[SessionStudent]:
+        results = self._fan_out([(name, 'list_students', ()) for name in self.shards])
+        return sorted((s for part in results for s in part), key=lambda s: s.id)
+
+    def list_student_headers(self) -> List[SessionStudent]:
+        results = self._fan_out([(name, 'list_student_headers', ()) for name in self.shards])
+        return sorted((s for part in results for s in part), key=lambda s: s.id)
+
+    def upsert_student(self, student: SessionStudent) -> None:
+        self._route(student.id, 'upsert_student', student)
+
+    def delete_student(self, student_id: str) -> None:
+        self._route(student_id, 'delete_student', student_id)
+
+    def list_tutors(self, student_id: str) -> List[SessionTutor]:
+        return self._route(student_id, 'list_tutors', student_id)
+
+    def upsert_tutor(self, student_id: str, tutor: SessionTutor) -> None:
+        self._route(student_id, 'upsert_tutor', student_id, tutor)
+
+    def delete_tutor(self, student_id: str, tutor_id: str) -> None:
+        self._route(student_id, 'delete_tutor', student_id, tutor_id)
+
+    def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                   before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                   reverse: bool = False) -> List[SessionChat]:
+        # Forward only the window arguments in use, so shards without them still work
+        window = {k: v for k, v in (('limit', limit), ('before_ts', before_ts),
+                                    ('after_ts', after_ts), ('reverse', reverse)) if v is not None and v is not False}
+        return self._route(student_id, 'list_chats', student_id, tutor_id, **window)
+
+    def count_chats(self, student_id: str, tutor_id: str) -> int:
+        return self._route(student_id, 'count_chats', student_id, tutor_id)
+
+    def append_chat(self, student_id: str, tutor_id: str, chat: SessionChat) -> None:
+        self._route(student_id, 'append_chat', student_id, tutor_id, chat)
+
+    def replace_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        self._route(student_id, 'replace_chats', student_id, tutor_id, chats)
+
+    def append_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        self._route(student_id, 'append_chats', student_id, tutor_id, chats)
+
+    def upsert_tutors(self, student_id: str, tutors: List[SessionTutor]) -> None:
+        self._route(student_id, 'upsert_tutors', student_id, tutors)
+
+    def get_tutors_many(self, student_id: str, tutor_ids: List[str]) -> Dict[str, SessionTutor]:
+        return self._route(student_id, 'get_tutors_many', student_id, tutor_ids)
+
+    def get_tutor(self, student_id: str, tutor_id: str) -> Optional[SessionTutor]:
+        return self._route(student_id, 'get_tutor', student_id, tutor_id)
+
+    def list_chats_many(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[SessionChat]]:
+        groups: Dict[str, List[Tuple[str, str]]] = {}
+        for key in keys:
+            groups.setdefault(self.shard_for(key[0]), []).append(key)
+        found: Dict[Tuple[str, str], List[SessionChat]] = {}
+        for part in self._fan_out([(name, 'list_chats_many', (group,)) for name, group in groups.items()]):
+            found.update(part)
+        return {key: found[key] for key in keys}
+
+    def lock_student(self, student_id: str) -> ContextManager[Any]:
+        return self.shards[self.shard_for(student_id)].lock_student(student_id)
@@ -0,0 +1,519 @@
+"""
+SQLite storage connector for Henotace AI Python SDK
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from ..types import StorageConnector, SessionStudent, SessionTutor, SessionChat, SessionSubject, HenotaceError
+from ..codec import TextCodec, CompressedChat, get_codec
+from ..interning import blob_key
+from ..changes import (
+    SQLiteChangeFeed, RESET, STUDENT_UPSERTED, STUDENT_DELETED, TUTOR_UPSERTED, TUTOR_DELETED,
+    CHATS_APPENDED, CHATS_REPLACED
+)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id TEXT PRIMARY KEY,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS tutors (
+    student_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    subject_id TEXT,
+    subject_name TEXT,
+    subject_topic TEXT,
+    context TEXT,
+    persona TEXT,
+    user_profile TEXT,
+    metadata TEXT,
+    PRIMARY KEY (student_id, id)
+);
+CREATE TABLE IF NOT EXISTS chats (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id TEXT NOT NULL,
+    tutor_id TEXT NOT NULL,
+    message TEXT NOT NULL,
+    is_reply INTEGER NOT NULL,
+    timestamp INTEGER,
+    packed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS chats_by_tutor ON chats (student_id, tutor_id, timestamp);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    refs INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    student_id TEXT,
+    tutor_id TEXT,
+    chats TEXT,
+    ts INTEGER
+);
+"""
+
+# Columns added after the first release, with ALTER TABLE on older databases
+_ADDED_COLUMNS = {
+    'chats': [('packed', 'INTEGER NOT NULL DEFAULT 0')],
+    'tutors': [('context_ref', 'TEXT'), ('persona_ref', 'TEXT'), ('profile_ref', 'TEXT')],
+}
+
+# Created after the packed column is known to exist (older databases lack it)
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS chats_by_seq ON chats (student_id, tutor_id, seq);
+CREATE INDEX IF NOT EXISTS chats_unpacked ON chats (student_id, tutor_id, seq) WHERE packed = 0;
+"""
+
+# packed: 0 plain and not yet considered, -1 plain because compression did not
+# help, otherwise the tag of the codec the message is compressed with
+_PACK_CUTOFF = (
+    "SELECT seq FROM chats WHERE student_id = ? AND tutor_id = ? "
+    "ORDER BY seq DESC LIMIT 1 OFFSET ?"
+)
+_UNPACKED_BEFORE = (
+    "SELECT seq, message FROM chats WHERE student_id = ? AND tutor_id = ? "
+    "AND packed = 0 AND seq <= ?"
+)
+_SET_PACKED = "UPDATE chats SET message = ?, packed = ? WHERE seq = ?"
+
+# Statements are kept as module constants so sqlite3's statement cache reuses
+# the prepared form on every call
+_UPSERT_STUDENT = (
+    "INSERT INTO students (id, name) VALUES (?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET name = excluded.name"
+)
+_ENSURE_STUDENT = "INSERT OR IGNORE INTO students (id, name) VALUES (?, NULL)"
+_UPSERT_TUTOR = (
+    "INSERT INTO tutors (student_id, id, name, subject_id, subject_name, subject_topic, "
+    "context, persona, user_profile, metadata, context_ref, persona_ref, profile_ref) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (student_id, id) DO UPDATE SET name = excluded.name, "
+    "subject_id = excluded.subject_id, subject_name = excluded.subject_name, "
+    "subject_topic = excluded.subject_topic, context = excluded.context, "
+    "persona = excluded.persona, user_profile = excluded.user_profile, "
+    "metadata = excluded.metadata, context_ref = excluded.context_ref, "
+    "persona_ref = excluded.persona_ref, profile_ref = excluded.profile_ref"
+)
+_ENSURE_TUTOR = (
+    "INSERT OR IGNORE INTO tutors (student_id, id, name, subject_id, subject_name, subject_topic) "
+    "VALUES (?, ?, ?, 'unknown', 'Unknown', '')"
+)
+_TUTOR_EXISTS = "SELECT 1 FROM tutors WHERE student_id = ? AND id = ?"
+_TUTOR_REFS = "SELECT context_ref, persona_ref, profile_ref FROM tutors WHERE student_id = ? AND id = ?"
+_STUDENT_REFS = "SELECT context_ref, persona_ref, profile_ref FROM tutors WHERE student_id = ?"
+# Blobs are content-addressed: refs counts the tutor fields pointing at a row
+_ACQUIRE_BLOB = (
+    "INSERT INTO blobs (hash, data, refs) VALUES (?, ?, 1) "
+    "ON CONFLICT (hash) DO UPDATE SET refs = refs + 1"
+)
+_RELEASE_BLOB = "UPDATE blobs SET refs = refs - 1 WHERE hash = ?"
+_DROP_BLOB = "DELETE FROM blobs WHERE hash = ? AND refs <= 0"
+_INSERT_CHAT = (
+    "INSERT INTO chats (student_id, tutor_id, message, is_reply, timestamp) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+_COUNT_CHATS = "SELECT COUNT(*) FROM chats WHERE student_id = ? AND tutor_id = ?"
+_TUTOR_COLUMNS = (
+    "id, name, subject_id, subject_name, subject_topic, context, persona, user_profile, metadata, "
+    "context_ref, persona_ref, profile_ref"
+)
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value)
+
+
+def _loads(value: Optional[str]) -> Any:
+    return None if value is None else json.loads(value)
+
+
+class SQLiteConnector(StorageConnector):
+    """
+    SQLite-backed storage connector
+
+    Students, tutors and chats live in separate tables, so chat history can be
+    read a page at a time without loading the tutor tree. The database runs in
+    WAL mode, and ``transaction()`` groups several writes into one commit.
+
+    ``upsert_tutor`` stores tutor fields. Its chats are written only when the
+    tutor is first created; after that, history changes go through
+    ``append_chat``/``replace_chats``.
+
+    One connection is shared across threads behind a lock; SQLite allows a
+    single writer at a time anyway. ``lock_student`` is a ``transaction()``,
+    so it serializes all students, not just one.
+
+    With ``compression`` set, each tutor's last ``active_window`` chats stay
+    plain text. Older messages are stored compressed and come back as
+    ``CompressedChat`` objects that decode on read. A database holding
+    compressed chats must be opened with the same codec and dictionary.
+
+    With ``dedup=True`` each distinct ``context``, ``persona`` and
+    ``user_profile`` value is written once to a reference-counted ``blobs``
+    table keyed by content hash, and tutors point at it. Reads hand out one
+    shared object per value, so treat them as read-only. Databases written
+    either way can be opened either way.
+
+    With ``changes=N`` every write also inserts a row into a ``changes``
+    table in the same transaction, and ``self.changes`` (a
+    ``SQLiteChangeFeed``) reads the last N of them back, from this or any
+    other process.
+
+    Args:
+        path: Database file path (':memory:' for a private in-memory database)
+        synchronous: SQLite synchronous pragma ('NORMAL' is durable under WAL
+            except for the last transactions on power loss; use 'FULL' for strict)
+        compression: None, 'zlib', 'zstd' or a ``TextCodec`` for older chats
+        active_window: Most recent chats per tutor kept uncompressed
+        dedup: Store persona/context/profile values content-addressed
+        changes: Keep a feed of this many recent changes (None for no feed)
+    """
+
+    # Decoded blobs kept in memory; a hash always names the same value
+    _BLOB_CACHE = 4096
+
+    def __init__(self, path: str = 'henotace.db', synchronous: str = 'NORMAL',
+                 compression: Union[None, str, TextCodec] = None, active_window: int = 64,
+                 dedup: bool = False, changes: Optional[int] = None):
+        self.path = path
+        self.codec = get_codec(compression)
+        self.active_window = active_window
+        self.dedup = dedup
+        self._blobs: 'OrderedDict[str, Any]' = OrderedDict()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._depth = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA synchronous={synchronous}")
+            self._conn.executescript(_SCHEMA)
+            for table, added in _ADDED_COLUMNS.items():
+                columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+                for name, definition in added:
+                    if name not in columns:
+                        self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            self._conn.executescript(_INDEXES)
+        self.changes = SQLiteChangeFeed(self, changes) if changes else None
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group writes into a single transaction; nested calls join the outer one"""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("COMMIT")
+
+    def _emit(self, kind: str, student_id: Optional[str] = None, tutor_id: Optional[str] = None,
+              chats: Optional[List[SessionChat]] = None) -> None:
+        """Record a change; called inside the write's transaction"""
+        if self.changes is not None:
+            self.changes.publish(kind, student_id, tutor_id, chats)
+
+    # Row mapping
+
+    def _tutor_from_row(self, row: tuple, chats: Optional[List[SessionChat]] = None) -> SessionTutor:
+        return SessionTutor(
+            id=row[0],
+            name=row[1],
+            subject=SessionSubject(id=row[2], name=row[3], topic=row[4]),
+            chats=chats or [],
+            context=_loads(row[5]) if row[9] is None else self._blob(row[9]),
+            persona=row[6] if row[10] is None else self._blob(row[10]),
+            user_profile=_loads(row[7]) if row[11] is None else self._blob(row[11]),
+            metadata=_loads(row[8])
+        )
+
+    def _tutor_params(self, student_id: str, tutor: SessionTutor) -> tuple:
+        """Row values for _UPSERT_TUTOR; with dedup this takes blob references"""
+        subject = tutor.subject or SessionSubject(id='unknown', name='Unknown', topic='')
+        head = (student_id, tutor.id, tutor.name, subject.id, subject.name, subject.topic)
+        if not self.dedup:
+            return head + (_dumps(tutor.context), tutor.persona, _dumps(tutor.user_profile),
+                           _dumps(tutor.metadata), None, None, None)
+        inline = []
+        refs = []
+        for value in (tutor.context, tutor.persona, tutor.user_profile):
+            found = None if value is None else blob_key(value)
+            if found is None:
+                # None, or not JSON (which fails in the inline column as before)
+                inline.append(value)
+                refs.append(None)
+            else:
+                self._conn.execute(_ACQUIRE_BLOB, found)
+                inline.append(None)
+                refs.append(found[0])
+        return head + (_dumps(inline[0]), inline[1], _dumps(inline[2]), _dumps(tutor.metadata), *refs)
+
+    def _release(self, rows: List[tuple]) -> None:
+        """Drop the blob references held by deleted or overwritten tutor rows"""
+        refs = [(ref,) for row in rows for ref in row if ref is not None]
+        if refs:
+            self._conn.executemany(_RELEASE_BLOB, refs)
+            self._conn.executemany(_DROP_BLOB, refs)
+
+    def _blob(self, key: str) -> Any:
+        with self._lock:
+            if key in self._blobs:
+                self._blobs.move_to_end(key)
+                return self._blobs[key]
+            row = self._conn.execute("SELECT data FROM blobs WHERE hash = ?", (key,)).fetchone()
+            if row is None:
+                raise HenotaceError(f"Missing blob {key} in {self.path}")
+            value = self._blobs[key] = json.loads(row[0])
+            if len(self._blobs) > self._BLOB_CACHE:
+                self._blobs.popitem(last=False)
+            return value
+
+    def _chat_from_row(self, message: Any, is_reply: int, timestamp: Optional[int], packed: int) -> SessionChat:
+        if packed > 0:
+            if self.codec is None or packed != self.codec.tag:
+                raise HenotaceError(
+                    f"Chat is compressed with codec tag {packed}; open the database with that compression"
+                )
+            return CompressedChat(message, self.codec, bool(is_reply), timestamp)
+        return SessionChat(message=message, is_reply=bool(is_reply), timestamp=timestamp)
+
+    def _pack(self, student_id: str, tutor_id: str) -> None:
+        """Compress chats that have left the tutor's active window"""
+        if self.codec is None:
+            return
+        row = self._conn.execute(_PACK_CUTOFF, (student_id, tutor_id, self.active_window)).fetchone()
+        if row is None:
+            return
+        updates = []
+        for seq, message in self._conn.execute(_UNPACKED_BEFORE, (student_id, tutor_id, row[0])).fetchall():
+            data = self.codec.encode(message)
+            if len(data) < len(message.encode('utf-8')):
+                updates.append((data, self.codec.tag, seq))
+            else:
+                updates.append((message, -1, seq))
+        self._conn.executemany(_SET_PACKED, updates)
+
+    @staticmethod
+    def _chat_rows(student_id: str, tutor_id: str, chats: List[SessionChat]) -> List[tuple]:
+        return [
+            (student_id, tutor_id, chat.message, int(bool(chat.is_reply)), chat.timestamp)
+            for chat in chats
+        ]
+
+    def _ensure_tutor(self, student_id: str, tutor_id: str) -> None:
+        """Create a placeholder tutor (and student) for chats appended to an unknown tutor"""
+        self._conn.execute(_ENSURE_STUDENT, (student_id,))
+        if self._conn.execute(_ENSURE_TUTOR, (student_id, tutor_id, tutor_id)).rowcount:
+            self._emit(TUTOR_UPSERTED, student_id, tutor_id)
+
+    def _load_tutors(self, student_id: str) -> List[SessionTutor]:
+        chats_by_tutor: Dict[str, List[SessionChat]] = {}
+        for tutor_id, message, is_reply, timestamp, packed in self._conn.execute(
+            "SELECT tutor_id, message, is_reply, timestamp, packed FROM chats "
+            "WHERE student_id = ? ORDER BY seq", (student_id,)
+        ):
+            chats_by_tutor.setdefault(tutor_id, []).append(
+                self._chat_from_row(message, is_reply, timestamp, packed)
+            )
+        rows = self._conn.execute(
+            f"SELECT {_TUTOR_COLUMNS} FROM tutors WHERE student_id = ? ORDER BY rowid", (student_id,)
+        ).fetchall()
+        return [self._tutor_from_row(row, chats_by_tutor.get(row[0])) for row in rows]
+
+    # StorageConnector interface
+
+    def get_all(self) -> Dict[str, List[SessionStudent]]:
+        return {'students': self.list_students()}
+
+    def set_all(self, schema: Dict[str, List[SessionStudent]]) -> None:
+        with self.transaction():
+            self._conn.execute("DELETE FROM chats")
+            self._conn.execute("DELETE FROM tutors")
+            self._conn.execute("DELETE FROM students")
+            self._conn.execute("DELETE FROM blobs")
+            for student in schema.get('students', []):
+                self._conn.execute(_UPSERT_STUDENT, (student.id, student.name))
+                for tutor in student.tutors:
+                    self._conn.execute(_UPSERT_TUTOR, self._tutor_params(student.id, tutor))
+                    self._conn.executemany(_INSERT_CHAT, self._chat_rows(student.id, tutor.id, tutor.chats))
+                    self._pack(student.id, tutor.id)
+            self._emit(RESET)
+
+    def list_students(self) -> List[SessionStudent]:
+        """List all students with their tutors and chats, in three queries"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, name FROM students ORDER BY rowid").fetchall()
+            chats_by_tutor: Dict[Tuple[str, str], List[SessionChat]] = {}
+            for student_id, tutor_id, message, is_reply, timestamp, packed in self._conn.execute(
+                "SELECT student_id, tutor_id, message, is_reply, timestamp, packed FROM chats ORDER BY seq"
+            ):
+                chats_by_tutor.setdefault((student_id, tutor_id), []).append(
+                    self._chat_from_row(message, is_reply, timestamp, packed)
+                )
+            tutors_by_student: Dict[str, List[SessionTutor]] = {}
+            for row in self._conn.execute(
+                f"SELECT student_id, {_TUTOR_COLUMNS} FROM tutors ORDER BY rowid"
+            ).fetchall():
+                tutors_by_student.setdefault(row[0], []).append(
+                    self._tutor_from_row(row[1:], chats_by_tutor.get((row[0], row[1])))
+                )
+        return [SessionStudent(id=sid, name=name, tutors=tutors_by_student.get(sid, [])) for sid, name in rows]
+
+    def list_student_headers(self) -> List[SessionStudent]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, name FROM students ORDER BY rowid").fetchall()
+        return [SessionStudent(id=sid, name=name) for sid, name in rows]
+
+    def upsert_student(self, student: SessionStudent) -> None:
+        with self.transaction():
+            self._conn.execute(_UPSERT_STUDENT, (student.id, student.name))
+            self._emit(STUDENT_UPSERTED, student.id)
+            for tutor in student.tutors:
+                self.upsert_tutor(student.id, tutor)
+
+    def delete_student(self, student_id: str) -> None:
+        with self.transaction():
+            self._conn.execute("DELETE FROM chats WHERE student_id = ?", (student_id,))
+            self._release(self._conn.execute(_STUDENT_REFS, (student_id,)).fetchall())
+            self._conn.execute("DELETE FROM tutors WHERE student_id = ?", (student_id,))
+            if self._conn.execute("DELETE FROM students WHERE id = ?", (student_id,)).rowcount:
+                self._emit(STUDENT_DELETED, student_id)
+
+    def list_tutors(self, student_id: str) -> List[SessionTutor]:
+        with self._lock:
+            return self._load_tutors(student_id)
+
+    def upsert_tutor(self, student_id: str, tutor: SessionTutor) -> None:
+        with self.transaction():
+            self._conn.execute(_ENSURE_STUDENT, (student_id,))
+            previous = self._conn.execute(_TUTOR_REFS, (student_id, tutor.id)).fetchone()
+            is_new = previous is None
+            self._conn.execute(_UPSERT_TUTOR, self._tutor_params(student_id, tutor))
+            if previous is not None:
+                self._release([previous])
+            self._emit(TUTOR_UPSERTED, student_id, tutor.id)
+            if is_new and tutor.chats:
+                self._conn.executemany(_INSERT_CHAT, self._chat_rows(student_id, tutor.id, tutor.chats))
+                self._pack(student_id, tutor.id)
+                self._emit(CHATS_APPENDED, student_id, tutor.id, tutor.chats)
+
+    def delete_tutor(self, student_id: str, tutor_id: str) -> None:
+        with self.transaction():
+            self._conn.execute("DELETE FROM chats WHERE student_id = ? AND tutor_id = ?", (student_id, tutor_id))
+            self._release(self._conn.execute(_TUTOR_REFS, (student_id, tutor_id)).fetchall())
+            if self._conn.execute(
+                "DELETE FROM tutors WHERE student_id = ? AND id = ?", (student_id, tutor_id)
+            ).rowcount:
+                self._emit(TUTOR_DELETED, student_id, tutor_id)
+
+    def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                   before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                   reverse: bool = False) -> List[SessionChat]:
+        sql = "SELECT message, is_reply, timestamp, packed FROM chats WHERE student_id = ? AND tutor_id = ?"
+        params: List[Any] = [student_id, tutor_id]
+        if before_ts is not None:
+            sql += " AND timestamp < ?"
+            params.append(before_ts)
+        if after_ts is not None:
+            sql += " AND timestamp > ?"
+            params.append(after_ts)
+        sql += " ORDER BY seq DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(max(limit, 0))
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if not reverse:
+            rows.reverse()
+        return [self._chat_from_row(*row) for row in rows]
+
+    def count_chats(self, student_id: str, tutor_id: str) -> int:
+        with self._lock:
+            return self._conn.execute(_COUNT_CHATS, (student_id, tutor_id)).fetchone()[0]
+
+    def append_chat(self, student_id: str, tutor_id: str, chat: SessionChat) -> None:
+        with self.transaction():
+            self._ensure_tutor(student_id, tutor_id)
+            self._conn.execute(_INSERT_CHAT, self._chat_rows(student_id, tutor_id, [chat])[0])
+            self._pack(student_id, tutor_id)
+            self._emit(CHATS_APPENDED, student_id, tutor_id, [chat])
+
+    def replace_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        with self.transaction():
+            if self._conn.execute(_TUTOR_EXISTS, (student_id, tutor_id)).fetchone() is None:
+                return
+            self._conn.execute("DELETE FROM chats WHERE student_id = ? AND tutor_id = ?", (student_id, tutor_id))
+            self._conn.executemany(_INSERT_CHAT, self._chat_rows(student_id, tutor_id, chats))
+            self._pack(student_id, tutor_id)
+            self._emit(CHATS_REPLACED, student_id, tutor_id)
+
+    def append_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        if not chats:
+            return
+        with self.transaction():
+            self._ensure_tutor(student_id, tutor_id)
+            self._conn.executemany(_INSERT_CHAT, self._chat_rows(student_id, tutor_id, chats))
+            self._pack(student_id, tutor_id)
+            self._emit(CHATS_APPENDED, student_id, tutor_id, chats)
+
+    def upsert_tutors(self, student_id: str, tutors: List[SessionTutor]) -> None:
+        with self.transaction():
+            for tutor in tutors:
+                self.upsert_tutor(student_id, tutor)
+
+    def get_tutors_many(self, student_id: str, tutor_ids: List[str]) -> Dict[str, SessionTutor]:
+        """Get tutors by id with their chats, in two queries"""
+        ids = list(dict.fromkeys(tutor_ids))
+        if not ids:
+            return {}
+        marks = ', '.join('?' * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_TUTOR_COLUMNS} FROM tutors WHERE student_id = ? AND id IN ({marks})",
+                [student_id, *ids]
+            ).fetchall()
+            chats_by_tutor: Dict[str, List[SessionChat]] = {}
+            for tutor_id, message, is_reply, timestamp, packed in self._conn.execute(
+                "SELECT tutor_id, message, is_reply, timestamp, packed FROM chats "
+                f"WHERE student_id = ? AND tutor_id IN ({marks}) ORDER BY seq",
+                [student_id, *ids]
+            ):
+                chats_by_tutor.setdefault(tutor_id, []).append(
+                    self._chat_from_row(message, is_reply, timestamp, packed)
+                )
+        return {row[0]: self._tutor_from_row(row, chats_by_tutor.get(row[0])) for row in rows}
+
+    def get_tutor(self, student_id: str, tutor_id: str) -> Optional[SessionTutor]:
+        """Get one tutor's fields without reading its chats"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_TUTOR_COLUMNS} FROM tutors WHERE student_id = ? AND id = ?", (student_id, tutor_id)
+            ).fetchone()
+            return None if row is None else self._tutor_from_row(row)
+
+    def list_chats_many(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[SessionChat]]:
+        """List chats for several tutors under one read lock"""
+        with self._lock:
+            return {key: self.list_chats(*key) for key in keys}
@@ -0,0 +1,481 @@
+"""
+Write-behind buffering wrapper for Henotace AI Python SDK storage connectors
+"""
+
+import atexit
+import dataclasses
+import itertools
+import threading
+import weakref
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..types import (
+    StorageConnector, SessionStudent, SessionTutor, SessionChat, SessionSubject, HenotaceError,
+    window_chats
+)
+from .locking import StripedLock
+
+Key = Tuple[str, str]
+
+# Ops a read cannot merge over the wrapped connector; it writes them first
+_HARD = frozenset(('delete_tutor', 'replace_chats', 'upsert_student', 'delete_student', 'set_all'))
+
+# Wrappers still open, closed by an atexit hook; weak, so dropping one frees it
+_OPEN: 'weakref.WeakSet[WriteBehindConnector]' = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open() -> None:
+    for connector in list(_OPEN):
+        connector.close()
+
+
+class _Op:
+    """One buffered write; ``payload`` of the newest op per tutor is extended in place to coalesce"""
+
+    __slots__ = ('method', 'student_id', 'tutor_id', 'payload', 'seq', 'done')
+
+    def __init__(self, method: str, student_id: Optional[str], tutor_id: Optional[str], payload, seq: int):
+        self.method = method
+        self.student_id = student_id
+        self.tutor_id = tutor_id
+        self.payload = payload
+        self.seq = seq
+        self.done = False
+
+
+class _Pending:
+    """Buffered upserts and appends of one tutor"""
+
+    __slots__ = ('tutor', 'seed', 'chats')
+
+    def __init__(self):
+        self.tutor: Optional[SessionTutor] = None
+        # Chats of an upsert that came before any append; they seed a new tutor
+        self.seed: Optional[List[SessionChat]] = None
+        self.chats: List[SessionChat] = []
+
+
+class _Batch:
+    """Operations buffered since the last flush"""
+
+    def __init__(self):
+        self.ops: List[_Op] = []
+        # Newest op per tutor, while it may still be coalesced into
+        self.last: Dict[Key, _Op] = {}
+        # Ops per student id (None for set_all), oldest first
+        self.by_student: Dict[Optional[str], List[_Op]] = {}
+
+
+def _flush_loop(ref: 'weakref.ref[WriteBehindConnector]', wake: threading.Event, closed: threading.Event,
+                interval: Optional[float]) -> None:
+    # Holds the wrapper only while flushing, so an unreferenced wrapper can be collected
+    while not closed.is_set():
+        wake.wait(interval)
+        wake.clear()
+        connector = ref()
+        if connector is None:
+            return
+        try:
+            connector.flush()
+        except HenotaceError:
+            # Kept in the buffer; retried on the next round
+            pass
+        del connector
+
+
+class WriteBehindConnector(StorageConnector):
+    """
+    Buffer writes in memory and flush them to another connector in batches
+
+    Upserts of the same tutor coalesce into one write, and consecutive chat
+    appends into one ``append_chats``. Reads merge buffered upserts and
+    appends over the wrapped connector, so callers see their own writes.
+    Deletes, ``replace_chats`` and student-level writes are buffered too, but
+    reading a student with one of those pending writes that student first.
+
+    A background thread flushes every ``flush_interval`` seconds, or sooner
+    once ``max_pending`` operations are buffered. ``flush()`` writes
+    everything now and ``close()`` flushes and stops the thread; an atexit
+    hook calls ``close()`` for connectors still open at interpreter exit,
+    and a wrapper dropped without ``close()`` flushes when collected.
+
+    A flush writes one student at a time, in one ``transaction()`` per
+    student when the wrapped connector has one. Each operation is marked
+    written as soon as it is (or its transaction commits), so a failed
+    flush is retried from the first unwritten operation and chats are
+    never appended twice. Reads of a student wait only while that
+    student's writes are being applied, not for the whole flush.
+
+    Writes are serialized per student through striped locks, and
+    ``lock_student`` holds a student's stripe across a read and a write.
+
+    Args:
+        connector: The connector to write to
+        max_pending: Buffered operations that trigger an early flush
+        flush_interval: Seconds between background flushes (None flushes
+            only by size or explicitly)
+        stripes: Number of per-student locks
+    """
+
+    def __init__(self, connector: StorageConnector, max_pending: int = 1000,
+                 flush_interval: Optional[float] = 1.0, stripes: int = 64):
+        self.connector = connector
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.last_error: Optional[Exception] = None
+
+        # Lock order: stripe, then _flush_lock, then _applying, then _lock.
+        # _stripes serialize writers per student; _applying serializes
+        # applying a student's ops against reading it
+        self._stripes = StripedLock(stripes)
+        self._applying = StripedLock(stripes)
+        self._lock = threading.RLock()
+        self._flush_lock = threading.RLock()
+        self._current = _Batch()
+        self._inflight: Optional[_Batch] = None
+        self._seq = itertools.count()
+        self._undone = 0
+        # Unwritten hard ops per student, and unwritten set_all ops
+        self._hard: Dict[str, int] = {}
+        self._resets = 0
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=_flush_loop, args=(weakref.ref(self), self._wake, self._closed, flush_interval), daemon=True
+        )
+        self._thread.start()
+        _OPEN.add(self)
+
+    def __del__(self):
+        # Dropped without close(): write what is still buffered
+        closed = getattr(self, '_closed', None)
+        if closed is not None and not closed.is_set():
+            closed.set()
+            self._wake.set()
+            self.flush()
+
+    @property
+    def pending_ops(self) -> int:
+        """Number of buffered operations not yet written"""
+        with self._lock:
+            return self._undone
+
+    # Flushing
+
+    def flush(self) -> None:
+        """Write all buffered operations to the wrapped connector"""
+        with self._flush_lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        while True:
+            with self._lock:
+                if self._inflight is None:
+                    if not self._current.ops:
+                        return
+                    self._inflight, self._current = self._current, _Batch()
+                ops = self._inflight.ops
+            # set_all ops split the batch; between them, each student's ops
+            # are independent of other students' and applied on their own
+            segment: Dict[str, List[_Op]] = {}
+            for op in ops + [None]:
+                if op is not None and op.method != 'set_all':
+                    segment.setdefault(op.student_id, []).append(op)
+                    continue
+                for student_id, student_ops in segment.items():
+                    with self._applying(student_id):
+                        self._apply(student_ops)
+                segment = {}
+                if op is not None:
+                    with self._applying.all():
+                        self._apply([op])
+            # Dropped only once written, so reads never miss these writes
+            with self._lock:
+                self._inflight = None
+
+    def _claim(self, ops: List[_Op]) -> List[_Op]:
+        """Unwritten ops among ``ops``, no longer open to coalescing; the caller holds _lock"""
+        claimed = []
+        for op in ops:
+            if op.done:
+                continue
+            key = (op.student_id, op.tutor_id)
+            if self._current.last.get(key) is op:
+                del self._current.last[key]
+            claimed.append(op)
+        return claimed
+
+    def _mark_done(self, ops: List[_Op]) -> None:
+        with self._lock:
+            for op in ops:
+                op.done = True
+                self._undone -= 1
+                if op.method == 'set_all':
+                    self._resets -= 1
+                elif op.method in _HARD:
+                    self._hard[op.student_id] -= 1
+                    if not self._hard[op.student_id]:
+                        del self._hard[op.student_id]
+
+    def _apply(self, ops: List[_Op]) -> None:
+        """Write ops in order; the caller holds the ``_applying`` stripe of their student"""
+        with self._lock:
+            ops = self._claim(ops)
+        if not ops:
+            return
+        connector = self.connector
+        transaction = getattr(connector, 'transaction', None)
+        try:
+            with transaction() if transaction else nullcontext():
+                i = 0
+                while i < len(ops):
+                    op = ops[i]
+                    group = [op]
+                    i += 1
+                    if op.method == 'upsert_tutor':
+                        while i < len(ops) and ops[i].method == 'upsert_tutor':
+                            group.append(ops[i])
+                            i += 1
+                        connector.upsert_tutors(op.student_id, [o.payload for o in group])
+                    elif op.method == 'append_chats':
+                        connector.append_chats(op.student_id, op.tutor_id, op.payload)
+                    elif op.method == 'replace_chats':
+                        connector.replace_chats(op.student_id, op.tutor_id, op.payload)
+                    elif op.method == 'delete_tutor':
+                        connector.delete_tutor(op.student_id, op.tutor_id)
+                    elif op.method == 'upsert_student':
+                        connector.upsert_student(op.payload)
+                    elif op.method == 'delete_student':
+                        connector.delete_student(op.student_id)
+                    elif op.method == 'set_all':
+                        connector.set_all(op.payload)
+                    if transaction is None:
+                        self._mark_done(group)
+        except Exception as e:
+            self.last_error = e
+            raise HenotaceError(f"Write-behind flush failed: {e}") from e
+        if transaction is not None:
+            self._mark_done(ops)
+
+    def close(self) -> None:
+        """Flush buffered writes and stop the background thread"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        _OPEN.discard(self)
+        self.flush()
+
+    # Buffering
+
+    def lock_student(self, student_id: str) -> threading.RLock:
+        return self._stripes(student_id)
+
+    def _record(self, method: str, student_id: Optional[str], tutor_id: Optional[str], payload) -> _Op:
+        """Buffer an op; the caller holds ``_lock``"""
+        if self._closed.is_set():
+            raise HenotaceError('WriteBehindConnector is closed')
+        batch = self._current
+        op = _Op(method, student_id, tutor_id, payload, next(self._seq))
+        batch.ops.append(op)
+        batch.by_student.setdefault(student_id, []).append(op)
+        self._undone += 1
+        if method == 'set_all':
+            self._resets += 1
+            batch.last.clear()
+        else:
+            if method in _HARD:
+                self._hard[student_id] = self._hard.get(student_id, 0) + 1
+            if tutor_id is None:
+                # Student-level writes end coalescing for all of the student's tutors
+                for key in [k for k in batch.last if k[0] == student_id]:
+                    del batch.last[key]
+            else:
+                batch.last[(student_id, tutor_id)] = op
+        if len(batch.ops) >= self.max_pending:
+            self._wake.set()
+        return op
+
+    def set_all(self, schema: Dict[str, List[SessionStudent]]) -> None:
+        with self._stripes.all(), self._lock:
+            self._record('set_all', None, None, schema)
+
+    def upsert_student(self, student: SessionStudent) -> None:
+        with self._stripes(student.id), self._lock:
+            self._record('upsert_student', student.id, None, student)
+
+    def delete_student(self, student_id: str) -> None:
+        with self._stripes(student_id), self._lock:
+            self._record('delete_student', student_id, None, None)
+
+    def upsert_tutor(self, student_id: str, tutor: SessionTutor) -> None:
+        with self._stripes(student_id), self._lock:
+            last = self._current.last.get((student_id, tutor.id))
+            if last is not None and last.method == 'upsert_tutor':
+                # The first upsert's chats seed a new tutor; later ones only update fields
+                last.payload = dataclasses.replace(tutor, chats=last.payload.chats)
+            else:
+                self._record('upsert_tutor', student_id, tutor.id, tutor)
+
+    def upsert_tutors(self, student_id: str, tutors: List[SessionTutor]) -> None:
+        with self._stripes(student_id), self._lock:
+            for tutor in tutors:
+                self.upsert_tutor(student_id, tutor)
+
+    def delete_tutor(self, student_id: str, tutor_id: str) -> None:
+        with self._stripes(student_id), self._lock:
+            self._record('delete_tutor', student_id, tutor_id, None)
+
+    def append_chat(self, student_id: str, tutor_id: str, chat: SessionChat) -> None:
+        self.append_chats(student_id, tutor_id, [chat])
+
+    def append_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        if not chats:
+            return
+        with self._stripes(student_id), self._lock:
+            last = self._current.last.get((student_id, tutor_id))
+            if last is not None and last.method in ('append_chats', 'replace_chats'):
+                last.payload.extend(chats)
+            else:
+                self._record('append_chats', student_id, tutor_id, list(chats))
+
+    def replace_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        with self._stripes(student_id), self._lock:
+            last = self._current.last.get((student_id, tutor_id))
+            if last is not None and last.method == 'replace_chats':
+                last.payload = list(chats)
+            else:
+                self._record('replace_chats', student_id, tutor_id, list(chats))
+
+    # Reads
+
+    @contextmanager
+    def _reading(self, student_id: str) -> Iterator[None]:
+        """
+        Hold a student steady for a read
+
+        Pending writes the read cannot merge are applied first. While the
+        block runs, none of the student's ops are being applied, so the
+        wrapped connector plus the unwritten ops form one consistent view.
+        """
+        if self._resets:
+            # A pending set_all comes before this student's ops; write it in order
+            self.flush()
+        with self._applying(student_id):
+            if self._hard.get(student_id):
+                with self._lock:
+                    batches = [batch for batch in (self._inflight, self._current) if batch is not None]
+                    # Stop short of a set_all recorded since the flush above
+                    reset = min((op.seq for batch in batches for op in batch.by_student.get(None, ())
+                                 if not op.done), default=None)
+                    ops = [op for batch in batches for op in batch.by_student.get(student_id, ())
+                           if reset is None or op.seq < reset]
+                self._apply(ops)
+            yield
+
+    def _pending_for(self, student_id: str) -> Dict[str, _Pending]:
+        """Unwritten upserts and appends of a student's tutors, up to its first unwritten hard op"""
+        merged: Dict[str, _Pending] = {}
+        with self._lock:
+            ops = sorted(
+                (op for batch in (self._inflight, self._current) if batch is not None
+                 for sid in (student_id, None) for op in batch.by_student.get(sid, ()) if not op.done),
+                key=lambda op: op.seq
+            )
+            for op in ops:
+                if op.method in _HARD:
+                    # Recorded after this read began; it and what follows show up next time
+                    break
+                pending = merged.get(op.tutor_id)
+                if pending is None:
+                    pending = merged[op.tutor_id] = _Pending()
+                if op.method == 'upsert_tutor':
+                    if pending.tutor is None and not pending.chats:
+                        pending.seed = list(op.payload.chats)
+                    pending.tutor = op.payload
+                else:
+                    pending.chats = pending.chats + op.payload
+        return merged
+
+    @staticmethod
+    def _new_tutor(tutor_id: str, pending: _Pending) -> SessionTutor:
+        base = pending.tutor or SessionTutor(
+            id=tutor_id, name=tutor_id, subject=SessionSubject(id='unknown', name='Unknown', topic='')
+        )
+        return dataclasses.replace(base, chats=(pending.seed or []) + pending.chats)
+
+    def _merge_tutors(self, student_id: str, stored: List[SessionTutor],
+                      wanted: Optional[List[str]] = None) -> List[SessionTutor]:
+        pending = self._pending_for(student_id)
+        if not pending:
+            return stored
+        merged = []
+        for tutor in stored:
+            extra = pending.pop(tutor.id, None)
+            if extra is None:
+                merged.append(tutor)
+            else:
+                # Upserting an existing tutor keeps its stored chats (see
+                # StorageConnector.upsert_tutor), so the merge does as well
+                merged.append(dataclasses.replace(extra.tutor or tutor, chats=list(tutor.chats) + extra.chats))
+        for tutor_id, extra in pending.items():
+            if wanted is None or tutor_id in wanted:
+                merged.append(self._new_tutor(tutor_id, extra))
+        return merged
+
+    def get_all(self) -> Dict[str, List[SessionStudent]]:
+        return {'students': self.list_students()}
+
+    def list_students(self) -> List[SessionStudent]:
+        # Spans every student, so everything buffered is written first
+        self.flush()
+        return self.connector.list_students()
+
+    def list_student_headers(self) -> List[SessionStudent]:
+        self.flush()
+        return self.connector.list_student_headers()
+
+    def list_tutors(self, student_id: str) -> List[SessionTutor]:
+        with self._reading(student_id):
+            return self._merge_tutors(student_id, self.connector.list_tutors(student_id))
+
+    def get_tutors_many(self, student_id: str, tutor_ids: List[str]) -> Dict[str, SessionTutor]:
+        with self._reading(student_id):
+            stored = list(self.connector.get_tutors_many(student_id, tutor_ids).values())
+            return {t.id: t for t in self._merge_tutors(student_id, stored, tutor_ids)}
+
+    def get_tutor(self, student_id: str, tutor_id: str) -> Optional[SessionTutor]:
+        with self._reading(student_id):
+            stored = self.connector.get_tutor(student_id, tutor_id)
+            merged = self._merge_tutors(student_id, [stored] if stored else [], [tutor_id])
+            return merged[0] if merged else None
+
+    def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                   before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                   reverse: bool = False) -> List[SessionChat]:
+        with self._reading(student_id):
+            pending = self._pending_for(student_id).get(tutor_id)
+            if pending is None:
+                return self.connector.list_chats(student_id, tutor_id, limit=limit, before_ts=before_ts,
+                                                 after_ts=after_ts, reverse=reverse)
+            stored = self.connector.list_chats(student_id, tutor_id, limit=limit,
+                                               before_ts=before_ts, after_ts=after_ts)
+            seed = pending.seed if pending.seed and not self._stored(student_id, tutor_id) else []
+            return window_chats(seed + list(stored) + pending.chats, limit, before_ts, after_ts, reverse)
+
+    def count_chats(self, student_id: str, tutor_id: str) -> int:
+        with self._reading(student_id):
+            count = self.connector.count_chats(student_id, tutor_id)
+            pending = self._pending_for(student_id).get(tutor_id)
+            if pending is None:
+                return count
+            if pending.seed and not self._stored(student_id, tutor_id):
+                count += len(pending.seed)
+            return count + len(pending.chats)
+
+    def _stored(self, student_id: str, tutor_id: str) -> bool:
+        return self.connector.get_tutor(student_id, tutor_id) is not None
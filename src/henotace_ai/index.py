@@ -22,6 +22,9 @@ class HenotaceAI:
     Main client for interacting with the Henotace AI API
     """
     
+    # Attributes whose changes invalidate header blocks compiled by tutors
+    _VERSIONED_CONFIG = ('default_persona', 'default_preset', 'default_user_profile', 'default_metadata')
+    
     def __init__(self, api_key: str, base_url: str = "https://api.djtconcept.ng", 
                  timeout: int = 30, retries: int = 3, storage: Optional[StorageConnector] = None,
                  default_persona: Optional[str] = None, default_preset: str = "tutor_default",
@@ -76,6 +79,11 @@ class HenotaceAI:
             'User-Agent': 'henotace-python-sdk/1.2.0'
         })
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in self._VERSIONED_CONFIG:
+            super().__setattr__('config_version', getattr(self, 'config_version', 0) + 1)
+
     def _make_request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
         """
         Make an HTTP request with retry logic and error handling
@@ -550,11 +558,11 @@ class HenotaceAI:
             return
         return self.storage.delete_tutor(student_id, tutor_id)
     
-    def list_chats(self, student_id: str, tutor_id: str) -> List[SessionChat]:
-        """List chats for a tutor"""
+    def list_chats(self, student_id: str, tutor_id: str, **window: Any) -> List[SessionChat]:
+        """List chats for a tutor; accepts the connector's limit/before_ts/after_ts/reverse"""
         if not self.storage:
             return []
-        return self.storage.list_chats(student_id, tutor_id)
+        return self.storage.list_chats(student_id, tutor_id, **window)
 
     def set_base_url(self, url: str) -> None:
         """Set a custom base URL (useful for testing)"""
@@ -0,0 +1,119 @@
+"""
+Content-addressed sharing of tutor field values in Henotace AI Python SDK
+
+Many tutors carry the same persona, context list or user profile. A
+connector created with ``dedup=True`` stores each distinct value once,
+addressed by its content (on disk, a hash of its canonical JSON), with a
+reference count per value, and hands the same object to every tutor that
+uses it. Shared values must be treated as read-only: assign a
+new value and call ``upsert_tutor`` instead of editing one in place.
+"""
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .types import SessionTutor
+
+#: Tutor fields that are stored content-addressed
+INTERNED_FIELDS = ('context', 'persona', 'user_profile')
+
+# Built once; json.dumps with options constructs a new encoder per call
+_CANONICAL = json.JSONEncoder(sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def canonical_json(value: Any) -> Optional[str]:
+    """Key-sorted compact JSON of a value, or None if it is not JSON-serializable"""
+    try:
+        return _CANONICAL.encode(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def blob_key(value: Any) -> Optional[Tuple[str, str]]:
+    """(hash, canonical JSON) of a value, or None if it is not JSON-serializable"""
+    text = canonical_json(value)
+    if text is None:
+        return None
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest(), text
+
+
+@dataclass
+class InternStats:
+    """Size of a ``BlobInterner``"""
+    blobs: int = 0
+    references: int = 0
+    bytes: int = 0
+
+
+class BlobInterner:
+    """
+    Reference-counted pool of shared values, keyed by content
+
+    ``acquire`` returns the pooled copy of a value and takes a reference;
+    ``release`` drops one, and the value leaves the pool with its last
+    reference. In memory the content itself is the key (dict hashing does
+    the addressing): strings key as themselves and other values as their
+    canonical JSON bytes, so the two never collide.
+    """
+
+    def __init__(self):
+        # key -> [value, references, size, key]; callers hold the pooled key,
+        # not their own equal copy, so that copy can be freed
+        self._blobs: Dict[Any, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    @property
+    def stats(self) -> InternStats:
+        with self._lock:
+            return InternStats(
+                blobs=len(self._blobs),
+                references=sum(entry[1] for entry in self._blobs.values()),
+                bytes=sum(entry[2] for entry in self._blobs.values())
+            )
+
+    def acquire(self, value: Any) -> Tuple[Any, Any]:
+        """Pool a value; returns (key, shared value), or (None, value) for None and non-JSON values"""
+        if value is None:
+            return None, None
+        if isinstance(value, str):
+            key = value
+        else:
+            text = canonical_json(value)
+            if text is None:
+                return None, value
+            key = text.encode('utf-8')
+        with self._lock:
+            entry = self._blobs.get(key)
+            if entry is None:
+                entry = self._blobs[key] = [value, 0, len(key), key]
+            entry[1] += 1
+            return entry[3], entry[0]
+
+    def release(self, key: Any) -> None:
+        if key is None:
+            return
+        with self._lock:
+            entry = self._blobs.get(key)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._blobs[key]
+
+    def intern_tutor(self, tutor: SessionTutor) -> Tuple[Any, ...]:
+        """Swap a tutor's interned fields for pooled copies; returns the keys taken"""
+        keys = []
+        for name in INTERNED_FIELDS:
+            key, shared = self.acquire(getattr(tutor, name))
+            setattr(tutor, name, shared)
+            keys.append(key)
+        return tuple(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blobs.clear()
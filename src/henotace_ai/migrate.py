@@ -0,0 +1,223 @@
+"""
+Connector-to-connector migration for Henotace AI Python SDK
+
+``migrate`` copies every student, tutor and chat from one connector to
+another without ``get_all()``: worker threads each read one student at a
+time from the source as export records (see ``StorageConnector.iter_export``)
+and apply them to the target with ``bulk_import``, several students per
+target transaction. A checkpoint file lets an interrupted run skip the
+students it already copied, and a verification pass compares the two
+connectors student by student.
+"""
+
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .types import StorageConnector, SessionStudent, HenotaceError, _student_record, _tutor_records, _resume_after
+from .transfer import TransferStats, Progress, _read_checkpoint, _write_checkpoint, _finish
+
+
+@dataclass
+class MigrationStats(TransferStats):
+    """``TransferStats`` of a migration (timed without verification), plus the verification result"""
+    skipped: int = 0
+    verified: int = 0
+    mismatched: List[str] = field(default_factory=list)
+    verify_seconds: float = 0.0
+
+    def __str__(self) -> str:
+        text = (f"{self.records:,} records ({self.students:,} students, {self.tutors:,} tutors, "
+                f"{self.chats:,} chats) in {self.elapsed:.1f} s, {self.records_per_second:,.0f} records/s")
+        if self.skipped:
+            text += f", {self.skipped:,} students already copied"
+        if self.verified or self.mismatched:
+            text += (f", {self.verified:,} verified, {len(self.mismatched):,} mismatched "
+                     f"in {self.verify_seconds:.1f} s")
+        return text
+
+
+def _student_records(connector: StorageConnector, student: SessionStudent,
+                     chunk_size: int) -> List[Dict[str, Any]]:
+    """Export records of one student, tutors sorted by id so two connectors compare equal"""
+    tutors = sorted(connector.list_tutors(student.id), key=lambda t: t.id)
+    return [_student_record(student)] + list(_tutor_records(student.id, tutors, chunk_size))
+
+
+class _Checkpoint:
+    """
+    Which students are copied, for a run whose workers finish out of order
+
+    Saved as the last student id below which every student is done, plus
+    the ids done beyond it, so the file stays small however far the run got.
+    """
+
+    def __init__(self, path: Optional[str], order: List[str], after: Optional[str], done: List[str]):
+        self.path = path
+        self._order = order
+        self._after = after
+        self._low = 0
+        self._done = set()
+        self.mark(done)
+
+    def mark(self, student_ids: List[str]) -> None:
+        self._done.update(student_ids)
+        while self._low < len(self._order) and self._order[self._low] in self._done:
+            self._after = self._order[self._low]
+            self._done.discard(self._after)
+            self._low += 1
+
+    def save(self) -> None:
+        if self.path is not None:
+            _write_checkpoint(self.path, {'after': self._after, 'done': sorted(self._done)})
+
+
+def migrate(source: StorageConnector, target: StorageConnector, workers: int = 4,
+            batch_size: int = 1000, chunk_size: int = 500, checkpoint: Optional[str] = None,
+            verify: bool = True, progress: Optional[Progress] = None,
+            progress_every: int = 10000) -> MigrationStats:
+    """
+    Copy all students, tutors and chats from ``source`` to ``target``
+
+    Each worker takes the next student, reads it from the source and
+    queues its records. Once it holds ``batch_size`` records it applies
+    them to the target in one ``transaction()`` (when the target has one)
+    and marks those students done. Memory stays bounded by ``workers``
+    batches. Students already in the target are overwritten. Tutors and
+    chats the target has but the source lacks are left alone.
+
+    With ``checkpoint``, progress is saved after every batch, once the
+    target has been flushed. A run that finds the checkpoint skips the
+    students it lists. Replaying a student is safe, because its records
+    reset each tutor's chats. The checkpoint is removed on success. It
+    refers to the source's student order, so the source must not change
+    between runs.
+
+    Args:
+        source: Connector to read from
+        target: Connector to write to
+        workers: Threads reading and writing students in parallel
+        batch_size: Records per target transaction and checkpoint
+        chunk_size: Maximum chats per ``chats`` record
+        checkpoint: Optional checkpoint file for resuming
+        verify: Compare every student in both connectors afterwards; the
+            ids that differ go to ``stats.mismatched``
+        progress: Called with the running ``MigrationStats`` every
+            ``progress_every`` records and once at the end
+    """
+    if workers < 1:
+        raise ValueError('workers must be at least 1')
+    if chunk_size <= 0:
+        raise ValueError('chunk_size must be positive')
+    stats = MigrationStats()
+    state = _read_checkpoint(checkpoint) or {'after': None, 'done': []}
+    headers = source.list_student_headers()
+    try:
+        remaining = _resume_after(headers, state['after'])
+    except HenotaceError as e:
+        raise HenotaceError(f"Cannot resume migration from {checkpoint}: the source changed ({e})") from e
+    done = set(state['done'])
+    pending = [student for student in remaining if student.id not in done]
+    stats.skipped = len(headers) - len(pending)
+
+    progress_lock = threading.Lock()
+    tracker = _Checkpoint(checkpoint, [s.id for s in remaining], state['after'], state['done'])
+    transaction = getattr(target, 'transaction', None) or nullcontext
+    flush = getattr(target, 'flush', None)
+
+    def write(batch: List[Dict[str, Any]], student_ids: List[str]) -> None:
+        with transaction():
+            target.bulk_import(batch)
+        with progress_lock:
+            before = stats.records // progress_every
+            for record in batch:
+                stats.count(record, 0)
+            if progress is not None and stats.records // progress_every != before:
+                progress(stats)
+            tracker.mark(student_ids)
+            if checkpoint is not None:
+                if flush is not None:
+                    flush()
+                tracker.save()
+
+    def copy(students: Iterator[SessionStudent]) -> None:
+        batch: List[Dict[str, Any]] = []
+        student_ids: List[str] = []
+        for student in students:
+            batch.extend(_student_records(source, student, chunk_size))
+            student_ids.append(student.id)
+            if len(batch) >= batch_size:
+                write(batch, student_ids)
+                batch, student_ids = [], []
+        if batch:
+            write(batch, student_ids)
+
+    _run(copy, pending, workers)
+    if flush is not None:
+        flush()
+    if verify:
+        started = time.perf_counter()
+        stats.mismatched = verify_migration(source, target, workers=workers, chunk_size=chunk_size)
+        stats.verified = len(headers) - len(stats.mismatched)
+        stats.verify_seconds = time.perf_counter() - started
+        # Keep verification out of the copy rate
+        stats.started += stats.verify_seconds
+    return _finish(stats, checkpoint, progress)
+
+
+def verify_migration(source: StorageConnector, target: StorageConnector, workers: int = 4,
+                     chunk_size: int = 500) -> List[str]:
+    """
+    Ids of source students whose name, tutors or chats differ in ``target``
+
+    Students are compared one at a time, in parallel. Tutors are matched by
+    id, so their order may differ; students only the target has are ignored.
+    """
+    names = {student.id: student.name for student in target.list_student_headers()}
+    mismatched: List[str] = []
+    lock = threading.Lock()
+
+    def check(students: Iterator[SessionStudent]) -> None:
+        for student in students:
+            same = (student.id in names and names[student.id] == student.name and
+                    _student_records(source, student, chunk_size) ==
+                    _student_records(target, student, chunk_size))
+            if not same:
+                with lock:
+                    mismatched.append(student.id)
+
+    headers = source.list_student_headers()
+    _run(check, headers, workers)
+    order = {student.id: i for i, student in enumerate(headers)}
+    return sorted(mismatched, key=order.__getitem__)
+
+
+def _run(work: Callable[[Iterator[SessionStudent]], None], students: List[SessionStudent], workers: int) -> None:
+    """Run ``work(students_iterator)`` on several threads sharing one iterator; re-raise the first error"""
+    iterator = iter(students)
+    lock = threading.Lock()
+    errors: List[BaseException] = []
+
+    def shared() -> Iterator[SessionStudent]:
+        while not errors:
+            with lock:
+                student = next(iterator, None)
+            if student is None:
+                return
+            yield student
+
+    def run() -> None:
+        try:
+            work(shared())
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, daemon=True) for _ in range(min(workers, max(len(students), 1)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
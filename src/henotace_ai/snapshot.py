@@ -0,0 +1,252 @@
+"""
+Binary snapshots of session trees for Henotace AI Python SDK
+
+A snapshot is one file that ``save_snapshot`` writes from a connector or a
+``get_all()`` schema and ``load_snapshot`` reads back as a schema for
+``InMemoryConnector.set_all``. Layout, with every section 8-byte aligned::
+
+    header      magic, version, flags, counts and section offsets
+    text        chat messages, UTF-8, back to back
+    ts          int64 timestamp per chat (INT64_MIN for None)
+    reply       uint8 is_reply flag per chat
+    off         uint64 text offsets, one more than the number of chats
+    strings     uint64 offsets, then UTF-8 blob: every id, name, persona,
+                subject field and JSON-encoded context/profile/metadata,
+                each stored once
+    students    (id, name, first tutor, tutor count) as uint32 string/row refs
+    tutors      string refs for each field, then chat start and count
+
+Students and tutors are fixed-size rows, so loading them is a tight unpack
+loop over the string table. Chat columns are used in place: with
+``lazy=True`` the file is memory-mapped and each tutor gets a read-only
+``ChatView`` whose messages are decoded on access.
+"""
+
+import gc
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .types import StorageConnector, SessionStudent, SessionTutor, SessionChat, SessionSubject, HenotaceError
+from .connectors.mmap_archive import ChatView
+
+SNAPSHOT_VERSION = 1
+_MAGIC = b'HNTSNAP\x00'
+_BIG_ENDIAN = 1
+_NONE = 0xFFFFFFFF
+_NO_TIMESTAMP = -(2 ** 63)
+
+# magic, version, flags, then student/tutor/chat/string counts and the
+# offsets of the text, ts, reply, off, strings, students and tutors sections
+_HEADER = struct.Struct('<8sHH4x11Q')
+_STUDENT = struct.Struct('<4I')
+_TUTOR = struct.Struct('<9I4x2Q')
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def ref(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NONE
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return i
+
+    def ref_json(self, value: Any) -> int:
+        return _NONE if value is None else self.ref(json.dumps(value, separators=(',', ':')))
+
+
+class _SnapshotColumns:
+    """Chat columns of a loaded snapshot, in the shape ``ChatView`` reads"""
+
+    def __init__(self, buf: memoryview, count: int, text: int, ts: int, reply: int, off: int):
+        self.ts = buf[ts:ts + 8 * count].cast('q')
+        self.reply = buf[reply:reply + count].cast('B')
+        self.off = buf[off:off + 8 * (count + 1)].cast('Q')
+        self.text = buf[text:text + (self.off[count] if count else 0)]
+
+
+def _pad(f) -> int:
+    position = f.tell()
+    if position % 8:
+        f.write(b'\x00' * (8 - position % 8))
+    return f.tell()
+
+
+def save_snapshot(source: Union[StorageConnector, Dict[str, List[SessionStudent]]], path: str) -> int:
+    """
+    Write a snapshot from a connector (or a get_all() schema)
+
+    A connector is read one student at a time. Message text streams to the
+    file as it is read. Timestamps, flags, offsets and the string table are
+    buffered, at about 17 bytes per chat. The file is written under a
+    temporary name, synced and then renamed over ``path``.
+
+    Returns:
+        Size of the snapshot in bytes
+    """
+    if isinstance(source, StorageConnector):
+        students: Iterable[SessionStudent] = (
+            SessionStudent(id=header.id, name=header.name, tutors=source.list_tutors(header.id))
+            for header in source.list_student_headers()
+        )
+    else:
+        students = source.get('students', [])
+
+    strings = _StringTable()
+    student_rows = bytearray()
+    tutor_rows = bytearray()
+    ts, reply, off = array('q'), array('B'), array('Q', [0])
+    tutor_count = 0
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(b'\x00' * _HEADER.size)
+        text_offset = f.tell()
+        text_size = 0
+        for student in students:
+            student_rows += _STUDENT.pack(strings.ref(student.id), strings.ref(student.name),
+                                          tutor_count, len(student.tutors))
+            for tutor in student.tutors:
+                start = len(ts)
+                for chat in tutor.chats or []:
+                    data = chat.message.encode('utf-8')
+                    f.write(data)
+                    text_size += len(data)
+                    ts.append(_NO_TIMESTAMP if chat.timestamp is None else chat.timestamp)
+                    reply.append(1 if chat.is_reply else 0)
+                    off.append(text_size)
+                subject = tutor.subject or SessionSubject(id='unknown', name='Unknown', topic='')
+                tutor_rows += _TUTOR.pack(
+                    strings.ref(tutor.id), strings.ref(tutor.name),
+                    strings.ref(subject.id), strings.ref(subject.name), strings.ref(subject.topic),
+                    strings.ref(tutor.persona), strings.ref_json(tutor.context),
+                    strings.ref_json(tutor.user_profile), strings.ref_json(tutor.metadata),
+                    start, len(ts) - start
+                )
+                tutor_count += 1
+
+        offsets = {}
+        for name, column in (('ts', ts), ('reply', reply), ('off', off)):
+            offsets[name] = _pad(f)
+            column.tofile(f)
+
+        offsets['strings'] = _pad(f)
+        encoded = [s.encode('utf-8') for s in strings.strings]
+        string_off = array('Q', [0])
+        for data in encoded:
+            string_off.append(string_off[-1] + len(data))
+        string_off.tofile(f)
+        f.write(b''.join(encoded))
+
+        offsets['students'] = _pad(f)
+        f.write(student_rows)
+        offsets['tutors'] = _pad(f)
+        f.write(tutor_rows)
+        size = f.tell()
+
+        # The header goes last, so a half-written snapshot never loads
+        f.seek(0)
+        f.write(_HEADER.pack(
+            _MAGIC, SNAPSHOT_VERSION, _BIG_ENDIAN if sys.byteorder == 'big' else 0,
+            len(student_rows) // _STUDENT.size, tutor_count, len(ts), len(strings.strings),
+            text_offset, offsets['ts'], offsets['reply'], offsets['off'],
+            offsets['strings'], offsets['students'], offsets['tutors']
+        ))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, path)
+    return size
+
+
+def load_snapshot(path: str, lazy: bool = True) -> Dict[str, List[SessionStudent]]:
+    """
+    Load a snapshot as a ``get_all()`` schema
+
+    Args:
+        path: Snapshot file written by ``save_snapshot``
+        lazy: Memory-map the file and give each tutor a read-only ``ChatView``
+            (messages decoded on access). With ``False`` the file is read once
+            and chats are built as ``SessionChat`` lists.
+    """
+    with open(path, 'rb') as f:
+        if lazy:
+            try:
+                buf = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            except ValueError:
+                # Empty file; mmap cannot map zero bytes
+                buf = memoryview(b'')
+        else:
+            buf = memoryview(f.read())
+
+    if len(buf) < _HEADER.size or bytes(buf[:8]) != _MAGIC:
+        raise HenotaceError(f"{path} is not a Henotace snapshot")
+    (_, version, flags, student_count, tutor_count, chat_count, string_count,
+     text, ts, reply, off, strings_at, students_at, tutors_at) = _HEADER.unpack_from(buf)
+    if version != SNAPSHOT_VERSION:
+        raise HenotaceError(f"Unsupported snapshot version: {version}")
+    if bool(flags & _BIG_ENDIAN) != (sys.byteorder == 'big'):
+        raise HenotaceError('Snapshot byte order does not match this machine')
+
+    string_off = buf[strings_at:strings_at + 8 * (string_count + 1)].cast('Q')
+    blob = buf[strings_at + 8 * (string_count + 1):]
+    table = [str(blob[string_off[i]:string_off[i + 1]], 'utf-8') for i in range(string_count)]
+
+    def ref(i: int) -> Optional[str]:
+        return None if i == _NONE else table[i]
+
+    def ref_json(i: int) -> Any:
+        return None if i == _NONE else json.loads(table[i])
+
+    columns = _SnapshotColumns(buf, chat_count, text, ts, reply, off)
+    if lazy:
+        def chats_for(start: int, count: int) -> Any:
+            return ChatView(columns, start, count)
+    else:
+        all_ts = columns.ts.tolist()
+        all_reply = columns.reply.tolist()
+        all_off = columns.off.tolist()
+        text_bytes = bytes(columns.text)
+
+        def chats_for(start: int, count: int) -> Any:
+            end = start + count
+            offsets = all_off[start:end + 1]
+            return [
+                SessionChat(text_bytes[a:b].decode('utf-8'), bool(r), None if t == _NO_TIMESTAMP else t)
+                for a, b, r, t in zip(offsets, offsets[1:], all_reply[start:end], all_ts[start:end])
+            ]
+
+    # Every object built here survives, so cyclic GC passes over the growing
+    # tree are wasted work; they roughly double eager load time
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        tutors = [
+            SessionTutor(
+                id=table[tid], name=table[name],
+                subject=SessionSubject(id=table[subj_id], name=table[subj_name], topic=ref(topic)),
+                chats=chats_for(start, count), context=ref_json(context), persona=ref(persona),
+                user_profile=ref_json(profile), metadata=ref_json(metadata)
+            )
+            for tid, name, subj_id, subj_name, topic, persona, context, profile, metadata, start, count
+            in _TUTOR.iter_unpack(buf[tutors_at:tutors_at + _TUTOR.size * tutor_count])
+        ]
+        students = [
+            SessionStudent(id=table[sid], name=ref(name), tutors=tutors[first:first + count])
+            for sid, name, first, count
+            in _STUDENT.iter_unpack(buf[students_at:students_at + _STUDENT.size * student_count])
+        ]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {'students': students}
@@ -0,0 +1,190 @@
+"""
+Streaming NDJSON export and import for Henotace AI Python SDK
+
+``export_ndjson`` writes a connector's ``iter_export`` records one JSON
+object per line, and ``import_ndjson`` feeds such a file to ``bulk_import``.
+Memory stays bounded by one student (export) or one line (import). Both
+functions can resume from a checkpoint file after an interruption and
+report throughput through a progress callback.
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import ExitStack, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from .types import StorageConnector, HenotaceError
+
+
+@dataclass
+class TransferStats:
+    """Counters for an export or import run"""
+    records: int = 0
+    students: int = 0
+    tutors: int = 0
+    chats: int = 0
+    bytes: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the run started (or until it finished)"""
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def chats_per_second(self) -> float:
+        return self.chats / self.elapsed if self.elapsed > 0 else 0.0
+
+    def count(self, record: Dict[str, Any], size: int) -> None:
+        self.records += 1
+        self.bytes += size
+        kind = record.get('type')
+        if kind == 'student':
+            self.students += 1
+        elif kind == 'tutor':
+            self.tutors += 1
+        elif kind == 'chats':
+            self.chats += len(record['chats'])
+
+    def __str__(self) -> str:
+        return (f"{self.records:,} records ({self.students:,} students, {self.tutors:,} tutors, "
+                f"{self.chats:,} chats, {self.bytes / 2**20:.1f} MiB) in {self.elapsed:.1f} s, "
+                f"{self.records_per_second:,.0f} records/s")
+
+
+Progress = Callable[[TransferStats], None]
+
+
+def _read_checkpoint(path: Optional[str]) -> Optional[Dict[str, Any]]:
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    # Write then rename, so a crash never leaves a half-written checkpoint
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _finish(stats: TransferStats, checkpoint: Optional[str], progress: Optional[Progress]) -> TransferStats:
+    stats.finished = time.perf_counter()
+    if checkpoint is not None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    if progress is not None:
+        progress(stats)
+    return stats
+
+
+def export_ndjson(connector: StorageConnector, path: str, chunk_size: int = 500,
+                  checkpoint: Optional[str] = None, progress: Optional[Progress] = None,
+                  progress_every: int = 10000) -> TransferStats:
+    """
+    Write every student, tutor and chat to an NDJSON file
+
+    With ``checkpoint``, the file offset and id of the last fully written
+    student are saved after each student. If the checkpoint exists when the
+    export starts, the file is cut back to that offset and the export
+    continues with the next student. The checkpoint is removed on success.
+
+    Args:
+        connector: Source connector
+        path: Output file
+        chunk_size: Maximum chats per line
+        checkpoint: Optional checkpoint file for resuming
+        progress: Called with the running ``TransferStats`` every
+            ``progress_every`` records and once at the end
+    """
+    state = _read_checkpoint(checkpoint)
+    stats = TransferStats()
+    with open(path, 'r+b' if state else 'wb') as out:
+        if state:
+            out.truncate(state['offset'])
+            out.seek(state['offset'])
+        records = connector.iter_export(chunk_size=chunk_size, start_after=state and state['student_id'])
+        student_id = None
+        for record in records:
+            if record['type'] == 'student':
+                if checkpoint is not None and student_id is not None:
+                    out.flush()
+                    _write_checkpoint(checkpoint, {'offset': out.tell(), 'student_id': student_id})
+                student_id = record['id']
+            line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+            out.write(line)
+            stats.count(record, len(line))
+            if progress is not None and stats.records % progress_every == 0:
+                progress(stats)
+    return _finish(stats, checkpoint, progress)
+
+
+def import_ndjson(connector: StorageConnector, path: str, checkpoint: Optional[str] = None,
+                  batch_size: int = 1000, progress: Optional[Progress] = None,
+                  progress_every: int = 10000) -> TransferStats:
+    """
+    Load an NDJSON export into a connector, one line at a time
+
+    Records are applied in batches of about ``batch_size``, each inside the
+    connector's ``transaction()`` when it has one. Batches end at a
+    ``student`` or ``tutor`` record, which resets what follows it, so a
+    batch replayed after an interruption is not applied twice. With
+    ``checkpoint``, the file offset reached is saved after every batch and
+    the import resumes from it. The checkpoint is removed on success.
+
+    Args:
+        connector: Target connector
+        path: NDJSON file written by ``export_ndjson``
+        checkpoint: Optional checkpoint file for resuming
+        batch_size: Records per transaction and checkpoint
+        progress: Called with the running ``TransferStats`` every
+            ``progress_every`` records and once at the end
+    """
+    state = _read_checkpoint(checkpoint)
+    stats = TransferStats()
+    transaction = getattr(connector, 'transaction', None) or nullcontext
+    offset = state['offset'] if state else 0
+    in_batch = 0
+    with open(path, 'rb') as source:
+        source.seek(offset)
+        batch = ExitStack()
+        try:
+            batch.enter_context(transaction())
+            for line in iter(source.readline, b''):
+                if not line.strip():
+                    offset += len(line)
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise HenotaceError(f"Bad export record at byte {offset} of {path}: {e}") from e
+                if in_batch >= batch_size and record.get('type') in ('student', 'tutor'):
+                    batch.close()
+                    if checkpoint is not None:
+                        _write_checkpoint(checkpoint, {'offset': offset})
+                    batch = ExitStack()
+                    batch.enter_context(transaction())
+                    in_batch = 0
+                connector.bulk_import([record])
+                offset += len(line)
+                in_batch += 1
+                stats.count(record, len(line))
+                if progress is not None and stats.records % progress_every == 0:
+                    progress(stats)
+        except BaseException:
+            if not batch.__exit__(*sys.exc_info()):
+                raise
+        else:
+            batch.close()
+    return _finish(stats, checkpoint, progress)
@@ -2,15 +2,51 @@
 Tutor class for managing chat sessions in Henotace AI Python SDK
 """
 
+import asyncio
+import contextlib
+import hashlib
+import inspect
+import itertools
 import json
+import threading
 import time
-from typing import Dict, List, Optional, Any, Union
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Any, Union
 
 from .types import (
-    SessionStudent, SessionTutor, SessionChat, SessionSubject, 
-    StorageConnector, Logger, LogLevel
+    SessionTutor, SessionChat, SessionSubject, 
+    StorageConnector, AsyncStorageConnector, Logger, LogLevel, HenotaceError, window_chats, _takes_window
 )
 from .index import HenotaceAI
+from .windowing import HistoryStrategy
+from .archive import ChatArchive
+
+
+async def _resolve(result: Any) -> Any:
+    """Await connector results that are awaitable, pass others through"""
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
+def _run_inline(coro) -> Any:
+    """
+    Run a coroutine that only touches a synchronous connector to completion
+
+    Such coroutines never suspend, so no event loop is needed.
+    """
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    coro.close()
+    raise RuntimeError('Storage coroutine suspended on a synchronous connector')
+
+
+def is_async_connector(storage: Any) -> bool:
+    """True for AsyncStorageConnector instances or duck-typed async connectors"""
+    return isinstance(storage, AsyncStorageConnector) or inspect.iscoroutinefunction(
+        getattr(storage, 'list_chats', None)
+    )
 
 
 class Tutor:
@@ -19,7 +55,8 @@ class Tutor:
     """
     
     def __init__(self, sdk: HenotaceAI, student_id: str, tutor_id: str, 
-                 storage: Optional[StorageConnector] = None, subject: str = None, topic: str = None):
+                 storage: Optional[Union[StorageConnector, AsyncStorageConnector]] = None,
+                 subject: str = None, topic: str = None):
         self.sdk = sdk
         self.student_id = student_id
         self.tutor_id = tutor_id
@@ -37,9 +74,43 @@ class Tutor:
         self.compression = {
             'max_turns': 12,
             'max_summary_chars': 1200,
-            'checkpoint_every': 10
+            'checkpoint_every': 10,
+            # Hierarchical summary store: level 0 holds the newest chunks,
+            # each further level holds coarser merges of the one below it.
+            'summary_levels': 3,
+            'summary_level_chars': 2400,
+            # Optional callable(text, max_chars) -> str, or 'api' to ask the
+            # backend to summarize when chunks are merged into a coarser level
+            'summarizer': None,
+            # Run compression on a worker thread after the reply is returned
+            'background': False
         }
         
+        # Serializes chat appends against the final swap of a compaction
+        # (an asyncio.Lock is used instead when the connector is async)
+        self._chat_lock = threading.RLock()
+        self._async_chat_lock = None
+        self._compaction_lock = threading.Lock()
+        self._compaction_future = None
+        # Storage writes scheduled from sync setters on async connectors
+        self._pending = set()
+        # (storage, whether its list_chats takes window arguments), set on first use
+        self._windowed = None
+        
+        # Compiled [PERSONA]/[USER]/[META] block, rebuilt when a setter or the
+        # SDK defaults change (tracked through sdk.config_version)
+        self._header_cache = None
+        
+        # Optional HistoryStrategy choosing which stored chats are sent
+        self.history_strategy = None
+        
+        # Optional ChatArchive receiving chats that compression removes
+        self.archive = None
+        
+        # Request layout; see set_prompt_layout
+        self.prompt_layout = 'append'
+        self.last_prefix_hash = None
+        
         self.logger.debug('Tutor instance created', {
             'studentId': self.student_id,
             'tutorId': self.tutor_id
@@ -56,18 +127,21 @@ class Tutor:
     def set_persona(self, persona: str) -> None:
         """Set the tutor's persona"""
         self.persona = persona
+        self._header_cache = None
         if self.storage:
             self._persist_to_storage()
     
     def set_user_profile(self, profile: Dict[str, Any]) -> None:
         """Set user profile information"""
         self.user_profile = profile
+        self._header_cache = None
         if self.storage:
             self._persist_to_storage()
     
     def set_metadata(self, metadata: Dict[str, Any]) -> None:
         """Set metadata for the tutor"""
         self.metadata = metadata
+        self._header_cache = None
         if self.storage:
             self._persist_to_storage()
     
@@ -77,14 +151,11 @@ class Tutor:
     
     def _persist_to_storage(self) -> None:
         """Persist tutor data to storage"""
+        self._run_storage(self._apersist())
+    
+    async def _apersist(self) -> None:
         try:
-            tutors = self.storage.list_tutors(self.student_id)
-            existing = None
-            
-            for t in tutors:
-                if t.id == self.tutor_id:
-                    existing = t
-                    break
+            existing = await self._acall('get_tutor', self.student_id, self.tutor_id)
             
             if existing:
                 # Update existing tutor
@@ -92,7 +163,7 @@ class Tutor:
                 existing.persona = self.persona
                 existing.user_profile = self.user_profile
                 existing.metadata = self.metadata
-                self.storage.upsert_tutor(self.student_id, existing)
+                await self._acall('upsert_tutor', self.student_id, existing)
             else:
                 # Create new tutor
                 new_tutor = SessionTutor(
@@ -104,10 +175,150 @@ class Tutor:
                     user_profile=self.user_profile,
                     metadata=self.metadata
                 )
-                self.storage.upsert_tutor(self.student_id, new_tutor)
+                await self._acall('upsert_tutor', self.student_id, new_tutor)
         except Exception as e:
             self.logger.warn('Failed to persist tutor data', {'error': str(e)})
     
+    async def _acall(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Call a storage method, awaiting it if the connector is async"""
+        return await _resolve(getattr(self.storage, method)(*args, **kwargs))
+    
+    async def _alist_chats(self, **window: Any) -> List[SessionChat]:
+        """list_chats with window arguments, applied here for connectors that lack them"""
+        window = {k: v for k, v in window.items() if v is not None and v is not False}
+        if not window:
+            return await self._acall('list_chats', self.student_id, self.tutor_id)
+        if self._windowed is None or self._windowed[0] is not self.storage:
+            # Decided once per connector from its signature, so errors raised
+            # inside list_chats are never mistaken for a missing argument
+            self._windowed = (self.storage, _takes_window(self.storage.list_chats))
+        if self._windowed[1]:
+            return await self._acall('list_chats', self.student_id, self.tutor_id, **window)
+        chats = await self._acall('list_chats', self.student_id, self.tutor_id)
+        return window_chats(chats, **window)
+    
+    def _window_size(self) -> Optional[int]:
+        """Number of recent chats a request needs (None for the whole history)"""
+        if self.history_strategy:
+            return self.history_strategy.fetch_limit()
+        return self.compression['max_turns'] * 2
+    
+    def _run_storage(self, coro) -> Any:
+        """
+        Run storage work from synchronous code
+        
+        Sync connectors run inline. For async connectors, the work is scheduled
+        on the running loop (await flush() to wait for it), or run on a fresh
+        loop when none is running.
+        """
+        if not is_async_connector(self.storage):
+            return _run_inline(coro)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        task = loop.create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return None
+    
+    @contextlib.asynccontextmanager
+    async def _chat_guard(self):
+        """Hold the chat lock that suits the connector (thread or asyncio)"""
+        if is_async_connector(self.storage):
+            if self._async_chat_lock is None:
+                self._async_chat_lock = asyncio.Lock()
+            async with self._async_chat_lock:
+                yield
+        else:
+            with self._chat_lock, self._storage_transaction():
+                yield
+    
+    def set_history_strategy(self, strategy: Optional[HistoryStrategy]) -> None:
+        """Choose which stored chats are sent with each request (None sends all)"""
+        self.history_strategy = strategy
+    
+    def set_archive(self, archive: Optional[ChatArchive]) -> None:
+        """Keep chats removed by compress_history in an archive (None discards them)"""
+        self.archive = archive
+    
+    async def _aarchive(self, chats: List[SessionChat]) -> None:
+        """Append chats to the archive, off the event loop for async connectors"""
+        if is_async_connector(self.storage):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.archive.append, self.student_id, self.tutor_id, chats)
+        else:
+            self.archive.append(self.student_id, self.tutor_id, chats)
+    
+    def set_prompt_layout(self, layout: str) -> None:
+        """
+        Choose how the request history is laid out
+        
+        Args:
+            layout: 'append' (default) puts context and header after the turns;
+                'stable_prefix' puts persona, profile, metadata and persistent
+                context first so the request prefix stays byte-identical
+        """
+        if layout not in ('append', 'stable_prefix'):
+            raise ValueError(f"Unknown prompt layout: {layout}")
+        self.prompt_layout = layout
+    
+    def _layout_stable_prefix(self, turns: List[Dict[str, str]], header: Dict[str, Any],
+                              ephemeral: List[str]) -> List[Dict[str, str]]:
+        """Stable content first, then the dynamic turns, then ephemeral context"""
+        prefix = []
+        if header['content']:
+            prefix.append({'role': 'assistant', 'content': header['content']})
+        
+        persistent = self.persistent_context[:5]  # Same snippet budget as the default layout
+        if persistent:
+            prefix.append({'role': 'assistant', 'content': '\n'.join(['[CONTEXT]'] + [str(sn) for sn in persistent])})
+        
+        self.last_prefix_hash = hashlib.sha256(
+            json.dumps(prefix, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        self.logger.debug('Tutor prompt prefix', {
+            'studentId': self.student_id,
+            'tutorId': self.tutor_id,
+            'prefixHash': self.last_prefix_hash
+        })
+        
+        history = prefix + turns
+        extra = ephemeral[:max(5 - len(persistent), 0)]
+        if extra:
+            history.append({'role': 'assistant', 'content': '\n'.join(['[CONTEXT]'] + [str(sn) for sn in extra])})
+        return history
+    
+    def _get_header(self) -> Dict[str, Any]:
+        """Return the compiled header block and static request fields"""
+        cache = self._header_cache
+        version = getattr(self.sdk, 'config_version', None)
+        sources = (self.persona, self.user_profile, self.metadata)
+        if (cache is not None and cache['version'] == version
+                and all(a is b for a, b in zip(cache['sources'], sources))):
+            return cache
+        
+        sdk_config = self.sdk.get_config()
+        persona = self.persona or sdk_config.get('default_persona')
+        user_profile = self.user_profile or sdk_config.get('default_user_profile')
+        metadata = self.metadata or sdk_config.get('default_metadata')
+        
+        header_parts = []
+        if persona:
+            header_parts.append(f"[PERSONA] {persona}")
+        if user_profile:
+            header_parts.append(f"[USER] {json.dumps(user_profile)[:1000]}")
+        if metadata:
+            header_parts.append(f"[META] {self._render_meta(metadata, 1000)}")
+        
+        self._header_cache = {
+            'version': version,
+            'sources': sources,
+            'content': '\n'.join(header_parts),
+            'preset': sdk_config.get('default_preset') or 'tutor_default'
+        }
+        return self._header_cache
+    
     def _build_summary_from_chats(self, chats: List[SessionChat], max_chars: int) -> str:
         """Build a summary from chat history"""
         lines = []
@@ -121,61 +332,234 @@ class Tutor:
         
         return summary
     
+    def _summarize(self, text: str, max_chars: int) -> str:
+        """Shrink text to at most max_chars using the configured summarizer"""
+        if len(text) <= max_chars:
+            return text
+        
+        summarizer = self.compression.get('summarizer')
+        if summarizer == 'api':
+            summarizer = self._summarize_via_api
+        
+        if callable(summarizer):
+            try:
+                summary = summarizer(text, max_chars) or ''
+                if len(summary) <= max_chars:
+                    return summary
+                text = summary
+            except Exception as e:
+                self.logger.warn('Summarizer failed, falling back to clipping', {'error': str(e)})
+        
+        return text[:max_chars - 3] + '...'
+    
+    def _summarize_via_api(self, text: str, max_chars: int) -> str:
+        """Ask the API to condense a summary block"""
+        completion = self.sdk.complete_chat(
+            history=[],
+            input_text=(
+                f"Summarize the following tutoring notes in at most {max_chars} characters. "
+                f"Keep facts about the student and what was covered.\n\n{text}"
+            ),
+            subject=self.subject,
+            topic=self.topic,
+            verbosity='brief'
+        )
+        return completion.get('ai_response', '')
+    
+    def _merge_summary_chunks(self, chunks: List[str], max_chars: int) -> str:
+        """Merge several chunks into one, giving each an equal share of the budget"""
+        if not chunks:
+            return ''
+        separator = '\n'
+        share = max((max_chars - len(separator) * (len(chunks) - 1)) // len(chunks), 4)
+        merged = separator.join(self._summarize(chunk, share) for chunk in chunks)
+        return self._summarize(merged, max_chars)
+    
+    def _push_summary_chunk(self, levels: List[List[str]], chunk: str) -> List[List[str]]:
+        """Add a chunk to level 0 and roll overflowing levels up into coarser ones"""
+        depth = max(int(self.compression.get('summary_levels', 3)), 1)
+        cap = max(int(self.compression.get('summary_level_chars', 2400)), 16)
+        
+        levels = [list(level) for level in levels[:depth]]
+        while len(levels) < depth:
+            levels.append([])
+        levels[0].append(chunk)
+        
+        for i in range(depth):
+            level = levels[i]
+            if sum(len(c) for c in level) <= cap:
+                continue
+            if i + 1 < depth and len(level) > 1:
+                # Fold everything except the newest chunk into the next level
+                merged = self._merge_summary_chunks(level[:-1], cap // 2)
+                levels[i + 1].append(merged)
+                levels[i] = [self._summarize(level[-1], cap)]
+            else:
+                # Coarsest level (or a single oversized chunk): condense in place
+                levels[i] = [self._merge_summary_chunks(level, cap)]
+        
+        return levels
+    
+    @staticmethod
+    def _render_summary(levels: List[List[str]]) -> str:
+        """Render summary levels newest first, so clipping drops the oldest (coarsest) text"""
+        chunks = [chunk for level in levels for chunk in reversed(level) if chunk]
+        return '\n---\n'.join(chunks)
+    
+    @classmethod
+    def _render_meta(cls, metadata: Dict[str, Any], max_chars: int) -> str:
+        """JSON for the [META] block, with summary levels rendered and trimmed to fit ``max_chars``"""
+        levels = metadata.get('summary_levels')
+        metadata = {k: v for k, v in metadata.items() if k != 'summary_levels'}
+        if levels:
+            metadata['summary'] = cls._render_summary(levels)
+        text = json.dumps(metadata)
+        summary = metadata.get('summary')
+        if len(text) > max_chars and isinstance(summary, str):
+            # Each character cut shortens the JSON by at least one, so one cut fits
+            keep = len(summary) - (len(text) - max_chars) - 3
+            metadata['summary'] = summary[:keep] + '...' if keep > 0 else ''
+            text = json.dumps(metadata)
+        return text[:max_chars]
+    
     def _auto_compress_if_needed(self) -> None:
         """Auto-compress chat history if needed"""
+        self._run_storage(self._aauto_compress())
+    
+    async def _aauto_compress(self) -> None:
         if not self.storage:
             return
         
-        chats = self.storage.list_chats(self.student_id, self.tutor_id)
-        if not chats:
+        count = await self._acall('count_chats', self.student_id, self.tutor_id)
+        if not count:
             return
         
-        should_checkpoint = len(chats) % self.compression['checkpoint_every'] == 0
-        exceeds_window = len(chats) > self.compression['max_turns'] * 2
+        should_checkpoint = count % self.compression['checkpoint_every'] == 0
+        exceeds_window = count > self.compression['max_turns'] * 2
         
         if should_checkpoint or exceeds_window:
-            self.compress_history()
+            await self.acompress_history()
     
     def compress_history(self) -> None:
         """Compress chat history by summarizing older messages"""
+        if not self.storage:
+            return
+        self._run_storage(self.acompress_history())
+    
+    async def acompress_history(self) -> None:
+        """Awaitable compress_history, required for async connectors inside a running loop"""
         if not self.storage:
             return
         
-        chats = self.storage.list_chats(self.student_id, self.tutor_id)
+        # Only one compaction per tutor at a time; a concurrent request is a no-op
+        if not self._compaction_lock.acquire(blocking=False):
+            return
+        try:
+            await self._compress_history_locked()
+        finally:
+            self._compaction_lock.release()
+    
+    async def _compress_history_locked(self) -> None:
+        """Summarize older chats; chats appended meanwhile are carried over"""
+        # Snapshot, since connectors may hand out their live list
+        chats = list(await self._acall('list_chats', self.student_id, self.tutor_id))
         if not chats:
             return
         
         keep = self.compression['max_turns']
-        if len(chats) <= keep:
+        # Leading chats the history strategy needs verbatim (e.g. head+tail)
+        pinned = self.history_strategy.pinned() if self.history_strategy else 0
+        if len(chats) <= keep + pinned:
             return
         
         # Keep recent messages, summarize older ones
-        older_chats = chats[:-keep]
-        recent_chats = chats[-keep:]
+        older_chats = chats[pinned:-keep]
+        recent_chats = chats[:pinned] + chats[-keep:]
         
         summary_chunk = self._build_summary_from_chats(older_chats, self.compression['max_summary_chars'])
         
         # Update tutor metadata with summary
-        tutors = self.storage.list_tutors(self.student_id)
-        existing = None
-        for t in tutors:
-            if t.id == self.tutor_id:
-                existing = t
-                break
+        existing = await self._acall('get_tutor', self.student_id, self.tutor_id)
         
+        new_metadata = None
         if existing:
             existing_meta = existing.metadata or {}
-            accumulated = existing_meta.get('summary', '')
-            if accumulated:
-                accumulated += f"\n---\n{summary_chunk}"
-            else:
-                accumulated = summary_chunk
+            levels = existing_meta.get('summary_levels')
+            if levels is None:
+                # Seed from a flat summary written by older SDK versions
+                legacy = existing_meta.get('summary', '')
+                levels = [[legacy]] if legacy else []
             
-            existing.metadata = {**existing_meta, 'summary': accumulated}
-            self.storage.upsert_tutor(self.student_id, existing)
-        
-        # Replace chats with recent ones only
-        self.storage.replace_chats(self.student_id, self.tutor_id, recent_chats)
+            # Summarizing may call the API, so it happens outside the chat lock
+            levels = self._push_summary_chunk(levels, summary_chunk)
+            # Only the levels are stored; the summary is rendered per request
+            new_metadata = {k: v for k, v in existing_meta.items() if k != 'summary'}
+            new_metadata['summary_levels'] = levels
+        
+        async with self._chat_guard():
+            current = await self._acall('list_chats', self.student_id, self.tutor_id)
+            if len(current) < len(chats) or current[len(chats) - 1] != chats[-1]:
+                # History was rewritten underneath us; leave it alone
+                self.logger.debug('Skipping compression, history changed', {
+                    'studentId': self.student_id,
+                    'tutorId': self.tutor_id
+                })
+                return
+            appended = list(current[len(chats):])
+            
+            if existing and new_metadata is not None:
+                existing.metadata = new_metadata
+                # Keep the local copy in sync so the next persist does not drop the summary
+                self.metadata = existing.metadata
+                self._header_cache = None
+                await self._acall('upsert_tutor', self.student_id, existing)
+            
+            # Archive before dropping, so a failure can duplicate chats but never lose them
+            if self.archive is not None:
+                await self._aarchive(older_chats)
+            
+            # Replace chats with recent ones only
+            await self._acall('replace_chats', self.student_id, self.tutor_id, recent_chats + appended)
+    
+    def _storage_transaction(self):
+        """Make the guarded reads and writes atomic in storage (one commit where supported)"""
+        lock_student = getattr(self.storage, 'lock_student', None)
+        if lock_student:
+            return lock_student(self.student_id)
+        transaction = getattr(self.storage, 'transaction', None)
+        return transaction() if transaction else contextlib.nullcontext()
+    
+    def _schedule_compaction(self) -> None:
+        """Run the compression check in the background after a turn"""
+        if self._compaction_future is not None and not self._compaction_future.done():
+            return
+        if is_async_connector(self.storage):
+            # Async connectors do not block the loop, so a task is enough
+            self._compaction_future = asyncio.ensure_future(self._abackground_compaction())
+        else:
+            loop = asyncio.get_running_loop()
+            self._compaction_future = loop.run_in_executor(None, self._background_compaction)
+    
+    def _background_compaction(self) -> None:
+        """Worker-thread entry point; failures are logged, never raised"""
+        try:
+            self._auto_compress_if_needed()
+        except Exception as e:
+            self.logger.warn('Background compression failed', {'error': str(e)})
+    
+    async def _abackground_compaction(self) -> None:
+        try:
+            await self._aauto_compress()
+        except Exception as e:
+            self.logger.warn('Background compression failed', {'error': str(e)})
+    
+    async def flush(self) -> None:
+        """Wait for pending background compression and scheduled storage writes"""
+        future = self._compaction_future
+        if future is not None:
+            await future
+        if self._pending:
+            await asyncio.gather(*list(self._pending))
     
     async def send(self, message: str, context: Optional[Union[str, List[str]]] = None, 
                   preset: Optional[str] = None, author_name: Optional[str] = None,
@@ -208,8 +592,11 @@ class Tutor:
         # Build history from storage
         history = []
         if self.storage:
-            self._auto_compress_if_needed()
-            chats = self.storage.list_chats(self.student_id, self.tutor_id)
+            if not self.compression.get('background'):
+                await self._aauto_compress()
+            chats = await self._alist_chats(limit=self._window_size())
+            if self.history_strategy:
+                chats = self.history_strategy.select(chats)
             history = [
                 {'role': 'assistant' if chat.is_reply else 'user', 'content': chat.message}
                 for chat in chats
@@ -217,35 +604,27 @@ class Tutor:
         
         # Add ephemeral context
         ephemeral = [context] if isinstance(context, str) else (context or [])
-        merged_context = self.persistent_context + ephemeral
-        
-        if merged_context:
-            clipped = merged_context[:5]  # Simple budget: top 5 snippets
-            context_block = '\n'.join(['[CONTEXT]'] + [str(sn) for sn in clipped])
-            history.append({'role': 'assistant', 'content': context_block})
-        
-        # Add persona, user profile, and metadata as context
-        sdk_config = self.sdk.get_config()
-        persona = self.persona or sdk_config.get('default_persona')
-        user_profile = self.user_profile or sdk_config.get('default_user_profile')
-        metadata = self.metadata or sdk_config.get('default_metadata')
-        
-        header_parts = []
-        if persona:
-            header_parts.append(f"[PERSONA] {persona}")
-        if user_profile:
-            header_parts.append(f"[USER] {json.dumps(user_profile)[:1000]}")
-        if metadata:
-            header_parts.append(f"[META] {json.dumps(metadata)[:1000]}")
+        header = self._get_header()
         
-        if header_parts:
-            history.append({'role': 'assistant', 'content': '\n'.join(header_parts)})
+        if self.prompt_layout == 'stable_prefix':
+            history = self._layout_stable_prefix(history, header, ephemeral)
+        else:
+            merged_context = self.persistent_context + ephemeral
+            
+            if merged_context:
+                clipped = merged_context[:5]  # Simple budget: top 5 snippets
+                context_block = '\n'.join(['[CONTEXT]'] + [str(sn) for sn in clipped])
+                history.append({'role': 'assistant', 'content': context_block})
+            
+            # Add persona, user profile, and metadata as context
+            if header['content']:
+                history.append({'role': 'assistant', 'content': header['content']})
         
         # Get AI response
         completion = self.sdk.complete_chat(
             history=history,
             input_text=message,
-            preset=preset or sdk_config.get('default_preset', 'tutor_default'),
+            preset=preset or header['preset'],
             subject=self.subject,
             topic=self.topic,
             verbosity=None,  # Auto-detect from message
@@ -268,12 +647,15 @@ class Tutor:
         # Store in session history
         if self.storage:
             now = int(time.time() * 1000)
-            user_chat = SessionChat(message=message, is_reply=False, timestamp=now)
-            self.storage.append_chat(self.student_id, self.tutor_id, user_chat)
+            async with self._chat_guard():
+                turn = [SessionChat(message=message, is_reply=False, timestamp=now)]
+                if ai_response:
+                    turn.append(SessionChat(message=ai_response, is_reply=True, timestamp=now + 1))
+                # One write per turn
+                await self._acall('append_chats', self.student_id, self.tutor_id, turn)
             
-            if ai_response:
-                ai_chat = SessionChat(message=ai_response, is_reply=True, timestamp=now + 1)
-                self.storage.append_chat(self.student_id, self.tutor_id, ai_chat)
+            if self.compression.get('background'):
+                self._schedule_compaction()
         
         return ai_response
     
@@ -298,7 +680,7 @@ class Tutor:
         # Build history from storage
         history = []
         if self.storage:
-            chats = self.storage.list_chats(self.student_id, self.tutor_id)
+            chats = await self._alist_chats(limit=self.compression['max_turns'] * 2)
             history = [
                 {'role': 'assistant' if chat.is_reply else 'user', 'content': chat.message}
                 for chat in chats
@@ -322,11 +704,75 @@ class Tutor:
         
         return classwork
     
-    def history(self) -> List[SessionChat]:
-        """Get chat history for this tutor"""
+    def history(self, limit: Optional[int] = None, before_ts: Optional[int] = None,
+                after_ts: Optional[int] = None, reverse: bool = False) -> List[SessionChat]:
+        """
+        Get chat history for this tutor
+        
+        Args:
+            limit: Only return the most recent ``limit`` chats
+            before_ts: Only return chats with a timestamp before this value
+            after_ts: Only return chats with a timestamp after this value
+            reverse: Return newest first
+        """
+        if not self.storage:
+            return []
+        if is_async_connector(self.storage):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(self.ahistory(limit, before_ts, after_ts, reverse))
+            raise HenotaceError('Tutor uses an async connector; use await tutor.ahistory()')
+        return _run_inline(self.ahistory(limit, before_ts, after_ts, reverse))
+    
+    async def ahistory(self, limit: Optional[int] = None, before_ts: Optional[int] = None,
+                       after_ts: Optional[int] = None, reverse: bool = False) -> List[SessionChat]:
+        """Awaitable history(), works with sync and async connectors"""
         if not self.storage:
             return []
-        return self.storage.list_chats(self.student_id, self.tutor_id)
+        return await self._alist_chats(limit=limit, before_ts=before_ts, after_ts=after_ts, reverse=reverse)
+    
+    def full_history(self) -> Iterator[SessionChat]:
+        """
+        Iterate over every chat of this tutor, archived ones included, oldest first
+        
+        Chats pinned by the history strategy stay in storage ahead of the
+        archived ones, so they come first. Archived chats are read lazily,
+        one frame at a time.
+        """
+        if is_async_connector(self.storage):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                hot, archived = asyncio.run(self._ahistory_snapshot())
+            else:
+                raise HenotaceError('Tutor uses an async connector; use tutor.afull_history()')
+        else:
+            hot, archived = _run_inline(self._ahistory_snapshot())
+        return self._merge_history(hot, archived)
+    
+    async def afull_history(self) -> AsyncIterator[SessionChat]:
+        """Async full_history(), works with sync and async connectors"""
+        hot, archived = await self._ahistory_snapshot()
+        for chat in self._merge_history(hot, archived):
+            yield chat
+    
+    async def _ahistory_snapshot(self) -> tuple:
+        """Stored chats and archived chat count, read together so a compaction cannot split them"""
+        if not self.storage:
+            return [], 0
+        async with self._chat_guard():
+            hot = list(await self._alist_chats())
+            archived = self.archive.count(self.student_id, self.tutor_id) if self.archive is not None else 0
+        return hot, archived
+    
+    def _merge_history(self, hot: List[SessionChat], archived: int) -> Iterator[SessionChat]:
+        pinned = self.history_strategy.pinned() if self.history_strategy and archived else 0
+        yield from hot[:pinned]
+        if archived:
+            # The archive is append-only, so its first ``archived`` chats are the ones counted
+            yield from itertools.islice(self.archive.iter_chats(self.student_id, self.tutor_id), archived)
+        yield from hot[pinned:]
     
     @property
     def ids(self) -> Dict[str, str]:
@@ -336,10 +782,19 @@ class Tutor:
 
 async def create_tutor(sdk: HenotaceAI, student_id: str, tutor_name: str = None, 
                       subject: SessionSubject = None, grade_level: str = None,
-                      language: str = None, storage: Optional[StorageConnector] = None) -> Tutor:
+                      language: str = None,
+                      storage: Optional[Union[StorageConnector, AsyncStorageConnector]] = None) -> Tutor:
     """
     Factory function to create a new tutor
     
+    If the tutor already exists in storage it is reused: its chats, persona,
+    profile and metadata are kept, and so is its context unless
+    ``grade_level``, ``language`` or a subject topic set a new one. Only a
+    ``tutor_name`` or ``subject`` that differs from the stored one is
+    written back. The student record, including its name, is left as it
+    is. (Earlier versions upserted fresh student and tutor records, which
+    reset those fields.)
+    
     Args:
         sdk: HenotaceAI SDK instance
         student_id: Unique student identifier
@@ -347,7 +802,7 @@ async def create_tutor(sdk: HenotaceAI, student_id: str, tutor_name: str = None,
         subject: Optional subject information
         grade_level: Optional grade level
         language: Optional language preference
-        storage: Optional storage connector
+        storage: Optional storage connector (sync or async)
         
     Returns:
         Configured Tutor instance
@@ -366,15 +821,22 @@ async def create_tutor(sdk: HenotaceAI, student_id: str, tutor_name: str = None,
         'language': language
     })
     
-    # Ensure storage entries
+    # Ensure storage entries; an existing tutor keeps its history
+    existing = None
     try:
         if storage:
-            storage.upsert_student(SessionStudent(id=student_id))
-            storage.upsert_tutor(student_id, SessionTutor(
-                id=tutor_id,
-                name=tutor_name or tutor_id,
-                subject=subject or SessionSubject(id='general', name='General', topic='')
-            ))
+            existing = await _resolve(storage.get_tutor(student_id, tutor_id))
+            if existing is None:
+                # upsert_tutor creates the student record as well
+                await _resolve(storage.upsert_tutors(student_id, [SessionTutor(
+                    id=tutor_id,
+                    name=tutor_name or tutor_id,
+                    subject=subject or SessionSubject(id='general', name='General', topic='')
+                )]))
+            elif (tutor_name and existing.name != tutor_name) or (subject and existing.subject != subject):
+                existing.name = tutor_name or existing.name
+                existing.subject = subject or existing.subject
+                await _resolve(storage.upsert_tutors(student_id, [existing]))
     except Exception as e:
         logger.warn('Failed to initialize storage', {'error': str(e)})
     
@@ -388,18 +850,15 @@ async def create_tutor(sdk: HenotaceAI, student_id: str, tutor_name: str = None,
         topic=subject.topic if subject else 'general'
     )
     
-    # Load any previously saved context
+    # Load any previously saved state; the fields go in before set_context
+    # persists, so that write does not clear them
     try:
-        if storage:
-            tutors = storage.list_tutors(student_id)
-            existing = None
-            for t in tutors:
-                if t.id == tutor_id:
-                    existing = t
-                    break
-            
-            if existing and existing.context:
-                tutor.set_context(existing.context)
+        if existing:
+            tutor.persona = existing.persona
+            tutor.user_profile = existing.user_profile
+            tutor.metadata = existing.metadata
+        if existing and existing.context:
+            tutor.set_context(existing.context)
     except Exception as e:
         logger.warn('Failed to load tutor context', {'error': str(e)})
     
@@ -416,6 +875,9 @@ async def create_tutor(sdk: HenotaceAI, student_id: str, tutor_name: str = None,
         if meta:
             tutor.set_context(meta)
     
+    # Async connectors persist setters in the background; finish them first
+    await tutor.flush()
+    
     logger.info('Tutor created successfully', {
         'studentId': student_id,
         'tutorId': tutor_id
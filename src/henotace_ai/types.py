@@ -2,11 +2,38 @@
 Type definitions for Henotace AI Python SDK
 """
 
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Any, Union
+import inspect
+from dataclasses import dataclass, fields
+from contextlib import nullcontext
+from typing import (
+    Dict, List, Optional, Any, AsyncIterator, ContextManager, Iterable, Iterator, Sequence, Tuple, Union
+)
 from datetime import datetime
 
 
+def _add_slots(cls: type) -> type:
+    """
+    Rebuild a dataclass with ``__slots__`` for its fields
+    
+    Equivalent to ``@dataclass(slots=True)``, which needs Python 3.10. Slotted
+    instances carry no per-instance ``__dict__``, so attributes other than
+    the fields cannot be set on them; a subclass without ``__slots__``
+    accepts them again.
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = dict(cls.__dict__)
+    namespace['__slots__'] = names
+    # Class-level defaults would clash with the slot descriptors; the
+    # generated __init__ already holds them
+    for name in names:
+        namespace.pop(name, None)
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    slotted = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted.__qualname__ = cls.__qualname__
+    return slotted
+
+
 @dataclass
 class SessionSubject:
     """Subject information for tutoring sessions"""
@@ -15,6 +42,7 @@ class SessionSubject:
     topic: str
 
 
+@_add_slots
 @dataclass
 class SessionChat:
     """Individual chat message in a session"""
@@ -23,6 +51,7 @@ class SessionChat:
     timestamp: Optional[int] = None
 
 
+@_add_slots
 @dataclass
 class SessionTutor:
     """Tutor information and chat history"""
@@ -42,6 +71,7 @@ class SessionTutor:
             self.context = []
 
 
+@_add_slots
 @dataclass
 class SessionStudent:
     """Student information with associated tutors"""
@@ -135,9 +165,120 @@ class Logger:
 
 
 # Storage connector interface
+def window_chats(chats: Sequence[SessionChat], limit: Optional[int] = None,
+                 before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                 reverse: bool = False) -> List[SessionChat]:
+    """
+    Apply ``list_chats`` window arguments to a chronological chat sequence
+    
+    Chats without a timestamp are left out when a timestamp bound is given.
+    Only the last ``limit`` chats are touched when there are no bounds.
+    """
+    if limit is not None and limit <= 0:
+        return []
+    if before_ts is None and after_ts is None:
+        selected = list(chats[-limit:] if limit is not None else chats)
+    else:
+        selected = []
+        for chat in reversed(chats):
+            ts = chat.timestamp
+            if ts is None or (before_ts is not None and ts >= before_ts):
+                continue
+            if after_ts is not None and ts <= after_ts:
+                continue
+            selected.append(chat)
+            if limit is not None and len(selected) >= limit:
+                break
+        selected.reverse()
+    if reverse:
+        selected.reverse()
+    return selected
+
+
+_WINDOW_ARGS = ('limit', 'before_ts', 'after_ts', 'reverse')
+
+
+def _takes_window(list_chats: Any) -> bool:
+    """Whether a ``list_chats`` callable accepts the window arguments (older connectors lack them)"""
+    try:
+        parameters = inspect.signature(list_chats).parameters
+    except (TypeError, ValueError):
+        # Nothing to inspect (e.g. a builtin); assume the current interface
+        return True
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters.values()):
+        return True
+    return all(name in parameters for name in _WINDOW_ARGS)
+
+
+# Export records. ``iter_export`` yields a stream of flat, JSON-ready dicts:
+# each student, then each of its tutors followed by its chats in chunks.
+
+def _student_record(student: SessionStudent) -> Dict[str, Any]:
+    return {'type': 'student', 'id': student.id, 'name': student.name}
+
+
+def _tutor_record(student_id: str, tutor: SessionTutor) -> Dict[str, Any]:
+    subject = tutor.subject or SessionSubject(id='unknown', name='Unknown', topic='')
+    return {
+        'type': 'tutor', 'student_id': student_id, 'id': tutor.id, 'name': tutor.name,
+        'subject': [subject.id, subject.name, subject.topic],
+        'context': tutor.context, 'persona': tutor.persona,
+        'user_profile': tutor.user_profile, 'metadata': tutor.metadata
+    }
+
+
+def _chats_record(student_id: str, tutor_id: str, chats: Sequence[SessionChat]) -> Dict[str, Any]:
+    return {
+        'type': 'chats', 'student_id': student_id, 'tutor_id': tutor_id,
+        'chats': [[c.message, bool(c.is_reply), c.timestamp] for c in chats]
+    }
+
+
+def _tutor_records(student_id: str, tutors: List[SessionTutor], chunk_size: int) -> Iterator[Dict[str, Any]]:
+    for tutor in tutors:
+        yield _tutor_record(student_id, tutor)
+        chats = tutor.chats or []
+        for start in range(0, len(chats), chunk_size):
+            yield _chats_record(student_id, tutor.id, chats[start:start + chunk_size])
+
+
+def _resume_after(headers: List[SessionStudent], start_after: Optional[str]) -> List[SessionStudent]:
+    if start_after is None:
+        return headers
+    for i, student in enumerate(headers):
+        if student.id == start_after:
+            return headers[i + 1:]
+    raise HenotaceError(f"Cannot resume export after student {start_after!r}: it no longer exists")
+
+
+def _import_ops(record: Dict[str, Any]) -> List[Tuple[str, tuple]]:
+    """Connector calls that apply one export record"""
+    kind = record.get('type')
+    if kind == 'student':
+        return [('upsert_student', (SessionStudent(id=record['id'], name=record.get('name')),))]
+    if kind == 'tutor':
+        subject_id, subject_name, topic = record['subject']
+        tutor = SessionTutor(
+            id=record['id'], name=record['name'],
+            subject=SessionSubject(id=subject_id, name=subject_name, topic=topic),
+            context=record.get('context'), persona=record.get('persona'),
+            user_profile=record.get('user_profile'), metadata=record.get('metadata')
+        )
+        # The chats records that follow rebuild the history from scratch
+        return [('upsert_tutor', (record['student_id'], tutor)),
+                ('replace_chats', (record['student_id'], tutor.id, []))]
+    if kind == 'chats':
+        chats = [SessionChat(message=m, is_reply=r, timestamp=ts) for m, r, ts in record['chats']]
+        return [('append_chats', (record['student_id'], record['tutor_id'], chats))]
+    raise HenotaceError(f"Unknown export record type: {kind!r}")
+
+
 class StorageConnector:
     """Abstract base class for storage connectors"""
     
+    #: ``ChangeFeed`` of writes for connectors created with ``changes=N``, else None
+    changes = None
+    
     def get_all(self) -> Dict[str, List[SessionStudent]]:
         """Get all stored data"""
         raise NotImplementedError
@@ -151,7 +292,12 @@ class StorageConnector:
         raise NotImplementedError
     
     def upsert_student(self, student: SessionStudent) -> None:
-        """Create or update a student"""
+        """
+        Create or update a student
+        
+        An existing student gets the new name, and the tutors in
+        ``student.tutors`` are upserted; tutors not listed are kept.
+        """
         raise NotImplementedError
     
     def delete_student(self, student_id: str) -> None:
@@ -163,17 +309,40 @@ class StorageConnector:
         raise NotImplementedError
     
     def upsert_tutor(self, student_id: str, tutor: SessionTutor) -> None:
-        """Create or update a tutor"""
+        """
+        Create or update a tutor
+        
+        A new tutor is stored with ``tutor.chats``. For an existing tutor
+        only the fields are updated: its stored chats are kept and
+        ``tutor.chats`` is ignored (use ``replace_chats`` to change them).
+        The student is created if it does not exist.
+        """
         raise NotImplementedError
     
     def delete_tutor(self, student_id: str, tutor_id: str) -> None:
         """Delete a tutor"""
         raise NotImplementedError
     
-    def list_chats(self, student_id: str, tutor_id: str) -> List[SessionChat]:
-        """List chats for a tutor"""
+    def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                   before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                   reverse: bool = False) -> List[SessionChat]:
+        """
+        List chats for a tutor in chronological order
+        
+        Args:
+            limit: Only return the most recent ``limit`` matching chats
+            before_ts: Only return chats with a timestamp before this value
+            after_ts: Only return chats with a timestamp after this value
+            reverse: Return newest first
+        
+        ``window_chats`` applies these arguments to a plain chat list.
+        """
         raise NotImplementedError
     
+    def count_chats(self, student_id: str, tutor_id: str) -> int:
+        """Number of chats stored for a tutor"""
+        return len(self.list_chats(student_id, tutor_id))
+    
     def append_chat(self, student_id: str, tutor_id: str, chat: SessionChat) -> None:
         """Add a chat message"""
         raise NotImplementedError
@@ -181,6 +350,188 @@ class StorageConnector:
     def replace_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
         """Replace all chats for a tutor"""
         raise NotImplementedError
+    
+    # Bulk operations. The defaults loop over the single-item methods;
+    # connectors override them to save round trips.
+    
+    def append_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        """Add several chat messages in order"""
+        for chat in chats:
+            self.append_chat(student_id, tutor_id, chat)
+    
+    def upsert_tutors(self, student_id: str, tutors: List[SessionTutor]) -> None:
+        """Create or update several tutors"""
+        for tutor in tutors:
+            self.upsert_tutor(student_id, tutor)
+    
+    def get_tutors_many(self, student_id: str, tutor_ids: List[str]) -> Dict[str, SessionTutor]:
+        """Get tutors by id; missing ids are left out"""
+        wanted = set(tutor_ids)
+        return {t.id: t for t in self.list_tutors(student_id) if t.id in wanted}
+    
+    def get_tutor(self, student_id: str, tutor_id: str) -> Optional[SessionTutor]:
+        """
+        Get one tutor's fields, or None if it does not exist
+        
+        For reading or updating the tutor without its history: connectors
+        that store chats separately leave ``chats`` empty. Passing the result
+        back to ``upsert_tutor`` keeps the stored chats.
+        """
+        return self.get_tutors_many(student_id, [tutor_id]).get(tutor_id)
+    
+    def list_chats_many(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[SessionChat]]:
+        """List chats for several (student_id, tutor_id) pairs"""
+        return {key: self.list_chats(*key) for key in keys}
+    
+    def lock_student(self, student_id: str) -> ContextManager[Any]:
+        """
+        Context manager that makes the enclosed operations on one student atomic
+        
+        Other threads cannot change the student's data in between, so a
+        read followed by ``replace_chats`` does not lose concurrent appends.
+        The default uses ``transaction()`` when the connector has one.
+        """
+        transaction = getattr(self, 'transaction', None)
+        return transaction() if transaction else nullcontext()
+    
+    # Streaming export and import
+    
+    def list_student_headers(self) -> List[SessionStudent]:
+        """List students with ids and names only (``tutors`` left empty)"""
+        return [SessionStudent(id=s.id, name=s.name) for s in self.list_students()]
+    
+    def iter_export(self, chunk_size: int = 500, start_after: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream all data as export records, one student at a time
+        
+        Yields a ``student`` record, then a ``tutor`` record for each of its
+        tutors followed by ``chats`` records of up to ``chunk_size`` chats.
+        Only one student's data is held at a time, unlike ``get_all``.
+        
+        Args:
+            chunk_size: Maximum chats per ``chats`` record
+            start_after: Resume after this student id (see ``list_student_headers`` order)
+        """
+        if chunk_size <= 0:
+            raise ValueError('chunk_size must be positive')
+        for student in _resume_after(self.list_student_headers(), start_after):
+            yield _student_record(student)
+            yield from _tutor_records(student.id, self.list_tutors(student.id), chunk_size)
+    
+    def bulk_import(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Apply export records in order and return how many were applied
+        
+        A ``tutor`` record clears that tutor's chats, so replaying a stream
+        from any ``student`` or ``tutor`` record is safe.
+        """
+        count = 0
+        for record in records:
+            for method, args in _import_ops(record):
+                getattr(self, method)(*args)
+            count += 1
+        return count
+
+
+# Async storage connector interface
+class AsyncStorageConnector:
+    """Abstract base class for storage connectors with awaitable methods"""
+    
+    async def get_all(self) -> Dict[str, List[SessionStudent]]:
+        """Get all stored data"""
+        raise NotImplementedError
+    
+    async def set_all(self, schema: Dict[str, List[SessionStudent]]) -> None:
+        """Set all data"""
+        raise NotImplementedError
+    
+    async def list_students(self) -> List[SessionStudent]:
+        """List all students"""
+        raise NotImplementedError
+    
+    async def upsert_student(self, student: SessionStudent) -> None:
+        """Create or update a student"""
+        raise NotImplementedError
+    
+    async def delete_student(self, student_id: str) -> None:
+        """Delete a student"""
+        raise NotImplementedError
+    
+    async def list_tutors(self, student_id: str) -> List[SessionTutor]:
+        """List tutors for a student"""
+        raise NotImplementedError
+    
+    async def upsert_tutor(self, student_id: str, tutor: SessionTutor) -> None:
+        """Create or update a tutor; an existing tutor keeps its stored chats"""
+        raise NotImplementedError
+    
+    async def delete_tutor(self, student_id: str, tutor_id: str) -> None:
+        """Delete a tutor"""
+        raise NotImplementedError
+    
+    async def list_chats(self, student_id: str, tutor_id: str, limit: Optional[int] = None,
+                         before_ts: Optional[int] = None, after_ts: Optional[int] = None,
+                         reverse: bool = False) -> List[SessionChat]:
+        """List chats for a tutor; see StorageConnector.list_chats"""
+        raise NotImplementedError
+    
+    async def count_chats(self, student_id: str, tutor_id: str) -> int:
+        """Number of chats stored for a tutor"""
+        return len(await self.list_chats(student_id, tutor_id))
+    
+    async def append_chat(self, student_id: str, tutor_id: str, chat: SessionChat) -> None:
+        """Add a chat message"""
+        raise NotImplementedError
+    
+    async def replace_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        """Replace all chats for a tutor"""
+        raise NotImplementedError
+    
+    async def append_chats(self, student_id: str, tutor_id: str, chats: List[SessionChat]) -> None:
+        """Add several chat messages in order"""
+        for chat in chats:
+            await self.append_chat(student_id, tutor_id, chat)
+    
+    async def upsert_tutors(self, student_id: str, tutors: List[SessionTutor]) -> None:
+        """Create or update several tutors"""
+        for tutor in tutors:
+            await self.upsert_tutor(student_id, tutor)
+    
+    async def get_tutors_many(self, student_id: str, tutor_ids: List[str]) -> Dict[str, SessionTutor]:
+        """Get tutors by id; missing ids are left out"""
+        wanted = set(tutor_ids)
+        return {t.id: t for t in await self.list_tutors(student_id) if t.id in wanted}
+    
+    async def get_tutor(self, student_id: str, tutor_id: str) -> Optional[SessionTutor]:
+        """Get one tutor's fields, or None if it does not exist (``chats`` may be left empty)"""
+        return (await self.get_tutors_many(student_id, [tutor_id])).get(tutor_id)
+    
+    async def list_chats_many(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[SessionChat]]:
+        """List chats for several (student_id, tutor_id) pairs"""
+        return {key: await self.list_chats(*key) for key in keys}
+    
+    async def list_student_headers(self) -> List[SessionStudent]:
+        """List students with ids and names only (``tutors`` left empty)"""
+        return [SessionStudent(id=s.id, name=s.name) for s in await self.list_students()]
+    
+    async def iter_export(self, chunk_size: int = 500,
+                          start_after: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all data as export records, one student at a time"""
+        if chunk_size <= 0:
+            raise ValueError('chunk_size must be positive')
+        for student in _resume_after(await self.list_student_headers(), start_after):
+            yield _student_record(student)
+            for record in _tutor_records(student.id, await self.list_tutors(student.id), chunk_size):
+                yield record
+    
+    async def bulk_import(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Apply export records in order and return how many were applied"""
+        count = 0
+        for record in records:
+            for method, args in _import_ops(record):
+                await getattr(self, method)(*args)
+            count += 1
+        return count
 
 
 # SDK Configuration
@@ -191,7 +542,7 @@ class SDKConfig:
     base_url: str = "https://api.djtconcept.ng"
     timeout: int = 30
     retries: int = 3
-    storage: Optional[StorageConnector] = None
+    storage: Optional[Union[StorageConnector, AsyncStorageConnector]] = None
     default_persona: Optional[str] = None
     default_preset: str = "tutor_default"
     default_user_profile: Optional[Dict[str, Any]] = None
@@ -0,0 +1,159 @@
+"""
+History windowing strategies for Henotace AI Python SDK
+
+A strategy decides which stored chats are sent with each request. Tutors
+use one through ``Tutor.set_history_strategy``.
+"""
+
+import re
+from typing import Callable, List, Optional
+
+from .types import SessionChat
+
+
+class HistoryStrategy:
+    """Base class for history windowing strategies"""
+
+    def select(self, chats: List[SessionChat]) -> List[SessionChat]:
+        """Return the chats to send, in chronological order"""
+        raise NotImplementedError
+
+    def pinned(self) -> int:
+        """Number of leading chats that compression must keep verbatim"""
+        return 0
+
+    def fetch_limit(self) -> Optional[int]:
+        """Most recent chats ``select`` can use, or None if it needs the whole history"""
+        return None
+
+
+class SlidingWindowStrategy(HistoryStrategy):
+    """Keep the last ``max_chats`` chats"""
+
+    def __init__(self, max_chats: int = 24):
+        self.max_chats = max_chats
+
+    def fetch_limit(self) -> Optional[int]:
+        return max(self.max_chats, 0)
+
+    def select(self, chats: List[SessionChat]) -> List[SessionChat]:
+        if self.max_chats <= 0:
+            return []
+        return list(chats[-self.max_chats:])
+
+
+class HeadTailStrategy(HistoryStrategy):
+    """Keep the first ``head`` chats (opening instructions) and the last ``tail``"""
+
+    def __init__(self, head: int = 4, tail: int = 20):
+        self.head = head
+        self.tail = tail
+
+    def select(self, chats: List[SessionChat]) -> List[SessionChat]:
+        if len(chats) <= self.head + self.tail:
+            return list(chats)
+        tail = chats[-self.tail:] if self.tail > 0 else []
+        return list(chats[:self.head]) + list(tail)
+
+    def pinned(self) -> int:
+        return self.head
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return (len(text) + 3) // 4
+
+
+class SizeWeightedStrategy(HistoryStrategy):
+    """
+    Keep the newest chats that fit in a size budget
+
+    Args:
+        max_size: Budget in characters, or in tokens when measure='tokens'
+        measure: 'chars' or 'tokens'
+        tokenizer: Optional callable(text) -> int used when measure='tokens'
+    """
+
+    def __init__(self, max_size: int = 8000, measure: str = 'chars',
+                 tokenizer: Optional[Callable[[str], int]] = None):
+        if measure not in ('chars', 'tokens'):
+            raise ValueError(f"Unknown size measure: {measure}")
+        self.max_size = max_size
+        self.measure = measure
+        self.tokenizer = tokenizer or estimate_tokens
+
+    def size(self, chat: SessionChat) -> int:
+        if self.measure == 'tokens':
+            return self.tokenizer(chat.message)
+        return len(chat.message)
+
+    def select(self, chats: List[SessionChat]) -> List[SessionChat]:
+        selected = []
+        used = 0
+        for chat in reversed(chats):
+            cost = self.size(chat)
+            if used + cost > self.max_size:
+                break
+            selected.append(chat)
+            used += cost
+        selected.reverse()
+        return selected
+
+
+_IMPORTANT_WORDS = re.compile(
+    r"\b(remember|important|always|never|my name|i am|i'm|goal|exam|deadline|prefer)\b",
+    re.IGNORECASE
+)
+
+
+def default_importance(chat: SessionChat, position: int, total: int) -> float:
+    """Heuristic score: student questions and stated facts/preferences rank higher"""
+    score = 0.0
+    if not chat.is_reply:
+        score += 1.0
+        if '?' in chat.message:
+            score += 1.0
+    score += 2.0 * len(_IMPORTANT_WORDS.findall(chat.message))
+    if position == 0:
+        score += 3.0
+    # Mild recency bias so ties favour newer turns
+    score += position / max(total, 1)
+    return score
+
+
+class ImportanceScoredStrategy(HistoryStrategy):
+    """
+    Keep the last ``recent`` chats, then fill the remaining character budget
+    with the highest-scoring older chats (sent in chronological order)
+
+    Args:
+        max_chars: Total character budget
+        recent: Number of newest chats that are always kept
+        scorer: Optional callable(chat, position, total) -> float
+    """
+
+    def __init__(self, max_chars: int = 8000, recent: int = 6,
+                 scorer: Optional[Callable[[SessionChat, int, int], float]] = None):
+        self.max_chars = max_chars
+        self.recent = recent
+        self.scorer = scorer or default_importance
+
+    def select(self, chats: List[SessionChat]) -> List[SessionChat]:
+        total = len(chats)
+        split = max(total - self.recent, 0)
+        recent = list(chats[split:])
+        budget = self.max_chars - sum(len(c.message) for c in recent)
+
+        ranked = sorted(
+            range(split),
+            key=lambda i: self.scorer(chats[i], i, total),
+            reverse=True
+        )
+        keep = []
+        for i in ranked:
+            cost = len(chats[i].message)
+            if cost <= budget:
+                keep.append(i)
+                budget -= cost
+        keep.sort()
+        return [chats[i] for i in keep] + recent
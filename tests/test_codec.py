@@ -0,0 +1,57 @@
+import pickle
+import sys
+sys.path.append('..')
+import pytest
+from src.henotace_ai import (
+    ZlibCodec, ZstdCodec, CompressedChat, build_dictionary, get_codec, HenotaceError, SessionChat
+)
+
+
+SAMPLES = [
+    "Let's solve this step by step.\nFirst, subtract 3 from both sides.",
+    "Let's solve this step by step.\nNext, divide both sides by 2.",
+    "Great job! Let's solve this step by step.",
+]
+
+
+def test_zlib_round_trip_with_dictionary():
+    dictionary = build_dictionary(SAMPLES, size=64)
+    assert len(dictionary) <= 64 and dictionary.endswith(b"Let's solve this step by step.\n")
+    plain, primed = ZlibCodec(), ZlibCodec(dictionary=dictionary)
+    text = "Let's solve this step by step.\nFirst, subtract 5 from both sides. ✓"
+    assert plain.decode(plain.encode(text)) == text
+    assert primed.decode(primed.encode(text)) == text
+    assert len(primed.encode(text)) < len(plain.encode(text))
+    with pytest.raises(HenotaceError):
+        plain.decode(primed.encode(text))
+
+
+def test_get_codec():
+    assert get_codec(None) is None
+    assert isinstance(get_codec('zlib'), ZlibCodec)
+    codec = ZlibCodec(level=1)
+    assert get_codec(codec) is codec
+    with pytest.raises(ValueError):
+        get_codec('lz4')
+
+
+def test_compressed_chat():
+    codec = ZlibCodec()
+    chat = SessionChat(message='repeat ' * 20, is_reply=True, timestamp=7)
+    packed = CompressedChat.pack(chat, codec)
+    assert isinstance(packed, CompressedChat) and not hasattr(packed, '__dict__')
+    assert packed == chat and chat == packed
+    assert packed.message == chat.message
+    restored = pickle.loads(pickle.dumps(packed))
+    assert type(restored) is SessionChat and restored == chat
+
+    short = SessionChat(message='hi', is_reply=False)
+    assert CompressedChat.pack(short, codec) is short
+
+
+def test_zstd_round_trip():
+    pytest.importorskip('zstandard')
+    codec = ZstdCodec()
+    text = 'Divide both sides by two. ' * 4
+    assert codec.decode(codec.encode(text)) == text
+    assert get_codec('zstd').tag == 2
@@ -0,0 +1,77 @@
+import pickle
+import sys
+sys.path.append('..')
+import pytest
+from src.henotace_ai import ChatColumns, ZlibCodec, SessionChat, SessionStudent, SessionTutor, SessionSubject
+
+
+def chats(count):
+    return [SessionChat(message=f"msg é{i}", is_reply=bool(i % 3 == 0), timestamp=i if i % 5 else None)
+            for i in range(count)]
+
+
+def test_session_types_are_slotted():
+    for obj in (SessionChat(message='hi', is_reply=False),
+                SessionTutor(id='t', name='T', subject=SessionSubject(id='s', name='S', topic='')),
+                SessionStudent(id='s')):
+        assert not hasattr(obj, '__dict__')
+    chat = SessionChat(message='hi', is_reply=True, timestamp=3)
+    assert pickle.loads(pickle.dumps(chat)) == chat
+    with pytest.raises(AttributeError):
+        chat.extra = 1
+
+    # The documented way to keep extra attributes: a subclass gets a __dict__ back
+    class TaggedChat(SessionChat):
+        pass
+
+    tagged = TaggedChat(message='hi', is_reply=True, timestamp=3)
+    tagged.extra = 1
+    assert tagged == TaggedChat(message='hi', is_reply=True, timestamp=3) and tagged.extra == 1
+
+
+def test_chat_columns_behaves_like_a_list():
+    expected = chats(21)
+    columns = ChatColumns(expected)
+    assert len(columns) == 21
+    assert columns == expected
+    assert columns[-1] == expected[-1] and columns[5].timestamp is None
+    assert columns[3:7] == expected[3:7]
+    assert list(reversed(columns)) == expected[::-1]
+    with pytest.raises(IndexError):
+        columns[21]
+
+    columns.append(SessionChat(message='new', is_reply=True, timestamp=99))
+    expected.append(SessionChat(message='new', is_reply=True, timestamp=99))
+    del columns[2]
+    del expected[2]
+    columns[0] = SessionChat(message='first', is_reply=False, timestamp=0)
+    expected[0] = SessionChat(message='first', is_reply=False, timestamp=0)
+    columns.insert(1, SessionChat(message='ins', is_reply=True))
+    expected.insert(1, SessionChat(message='ins', is_reply=True))
+    assert columns == expected
+
+    # Dropping a suffix truncates in place and keeps the bitset consistent
+    del columns[10:]
+    columns.append(SessionChat(message='tail', is_reply=False, timestamp=100))
+    assert columns == expected[:10] + [SessionChat(message='tail', is_reply=False, timestamp=100)]
+    assert pickle.loads(pickle.dumps(columns)) == columns
+    columns.clear()
+    assert len(columns) == 0 and columns.nbytes == 8
+
+
+def test_chat_columns_pack_keeps_text_the_codec_does_not_shrink():
+    long = 'Remember to isolate the variable first, then divide both sides. ' * 4
+    expected = [SessionChat(message=long if i % 2 else f"ok {i}", is_reply=bool(i % 2), timestamp=i)
+                for i in range(12)]
+    columns = ChatColumns(expected, ZlibCodec())
+    plain = columns.nbytes
+    columns.pack(10)
+    assert columns.packed == 10 and columns == expected
+    # Short messages stay as they were; only the long ones shrink
+    assert columns.nbytes < plain
+    assert bytes(columns._text).count(b'ok ') == 6
+
+    del columns[5:]
+    columns.extend(expected[5:])
+    assert columns == expected
+    assert pickle.loads(pickle.dumps(columns)) == expected
@@ -0,0 +1,998 @@
+import os
+import sys
+import threading
+import time
+sys.path.append('..')
+import pytest
+from src.henotace_ai import (
+    InMemoryConnector, SQLiteConnector, LogConnector, MmapArchiveConnector, write_mmap_archive,
+    WriteBehindConnector, EvictingConnector, ShardedConnector, HashRing, CachedConnector, ZlibCodec,
+    CompressedChat, ChangeFeedGapError, NoOpLogger,
+    HenotaceError, window_chats,
+    SessionStudent, SessionTutor, SessionSubject, SessionChat
+)
+
+
+SUBJECT = SessionSubject(id='math', name='Math', topic='algebra')
+
+
+def exercise_connector(connector):
+    connector.upsert_student(SessionStudent(id='s1', name='Ada'))
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='Tutor', subject=SUBJECT, persona='Kind'))
+    connector.upsert_tutor('s2', SessionTutor(id='t1', name='Other', subject=SUBJECT))
+    for i in range(5):
+        connector.append_chat('s1', 't1', SessionChat(message=f"m{i}", is_reply=bool(i % 2), timestamp=i))
+    connector.append_chat('s1', 't2', SessionChat(message='auto', is_reply=False, timestamp=9))
+
+    assert [s.id for s in connector.list_students()] == ['s1', 's2']
+    assert [t.id for t in connector.list_tutors('s1')] == ['t1', 't2']
+    assert [c.message for c in connector.list_chats('s1', 't1')] == ['m0', 'm1', 'm2', 'm3', 'm4']
+    assert connector.list_tutors('s1')[0].persona == 'Kind'
+
+    connector.replace_chats('s1', 't1', [SessionChat(message='kept', is_reply=True, timestamp=4)])
+    assert [c.message for c in connector.list_chats('s1', 't1')] == ['kept']
+
+    connector.delete_tutor('s1', 't2')
+    assert connector.list_chats('s1', 't2') == []
+    assert [t.id for t in connector.list_tutors('s1')] == ['t1']
+
+    connector.delete_student('s2')
+    assert [s.id for s in connector.list_students()] == ['s1']
+    assert connector.list_tutors('s2') == []
+
+
+def exercise_bulk(connector):
+    connector.upsert_tutors('s1', [
+        SessionTutor(id='t3', name='Three', subject=SUBJECT),
+        SessionTutor(id='t4', name='Four', subject=SUBJECT)
+    ])
+    connector.append_chats('s1', 't3', [
+        SessionChat(message='q', is_reply=False, timestamp=10),
+        SessionChat(message='a', is_reply=True, timestamp=11)
+    ])
+    connector.append_chats('s1', 't5', [SessionChat(message='new', is_reply=False, timestamp=12)])
+    found = connector.get_tutors_many('s1', ['t3', 't4', 'missing'])
+    assert sorted(found) == ['t3', 't4']
+    assert found['t4'].name == 'Four'
+    tutor = connector.get_tutor('s1', 't3')
+    assert tutor.name == 'Three' and connector.get_tutor('s1', 'missing') is None
+    # Updating the fields of the looked-up tutor keeps its stored chats
+    tutor.persona = 'Patient'
+    connector.upsert_tutor('s1', tutor)
+    assert connector.get_tutor('s1', 't3').persona == 'Patient'
+    assert [c.message for c in connector.list_chats('s1', 't3')] == ['q', 'a']
+    many = connector.list_chats_many([('s1', 't3'), ('s1', 't5'), ('s9', 't1')])
+    assert [c.message for c in many[('s1', 't3')]] == ['q', 'a']
+    assert [c.message for c in many[('s1', 't5')]] == ['new']
+    assert many[('s9', 't1')] == []
+
+
+@pytest.mark.parametrize('factory', [
+    lambda tmp: InMemoryConnector(),
+    lambda tmp: SQLiteConnector(str(tmp / 'store.db')),
+    lambda tmp: LogConnector(str(tmp / 'log'), fsync='never'),
+    lambda tmp: WriteBehindConnector(SQLiteConnector(str(tmp / 'store.db')), flush_interval=None),
+    lambda tmp: EvictingConnector(SQLiteConnector(str(tmp / 'spill.db')), max_students=1, low_watermark=0),
+    lambda tmp: CachedConnector(InMemoryConnector(), max_tutors=2, tail_size=2),
+], ids=['inmemory', 'sqlite', 'log', 'write_behind', 'evicting', 'cached'])
+def test_upsert_student_keeps_unlisted_tutors(tmp_path, factory):
+    connector = factory(tmp_path)
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='One', subject=SUBJECT))
+    connector.append_chat('s1', 't1', SessionChat(message='kept', is_reply=False, timestamp=1))
+    # With max_students=1 this spills s1 out of memory on the evicting connector
+    connector.upsert_student(SessionStudent(id='s2', name='Bo'))
+
+    connector.upsert_student(SessionStudent(id='s1', name='Ada', tutors=[
+        SessionTutor(id='t2', name='Two', subject=SUBJECT)
+    ]))
+    # Export records replay the same way
+    connector.bulk_import([{'type': 'student', 'id': 's1', 'name': 'Ada'}])
+
+    assert sorted((s.id, s.name) for s in connector.list_student_headers()) == [('s1', 'Ada'), ('s2', 'Bo')]
+    assert [t.id for t in connector.list_tutors('s1')] == ['t1', 't2']
+    assert [c.message for c in connector.list_chats('s1', 't1')] == ['kept']
+
+
+@pytest.mark.parametrize('factory', [
+    lambda tmp: InMemoryConnector(),
+    lambda tmp: SQLiteConnector(str(tmp / 'store.db')),
+    lambda tmp: LogConnector(str(tmp / 'log'), fsync='never'),
+    lambda tmp: WriteBehindConnector(InMemoryConnector(), flush_interval=None),
+    lambda tmp: EvictingConnector(SQLiteConnector(str(tmp / 'spill.db')), max_students=1, low_watermark=0),
+    lambda tmp: ShardedConnector([InMemoryConnector(), SQLiteConnector(str(tmp / 'shard.db'))]),
+    lambda tmp: CachedConnector(InMemoryConnector(), max_tutors=2, tail_size=2),
+], ids=['inmemory', 'sqlite', 'log', 'write_behind', 'evicting', 'sharded', 'cached'])
+def test_upsert_tutor_keeps_stored_chats(tmp_path, factory):
+    connector = factory(tmp_path)
+    # A new tutor is stored with its chats, also when upserted again before any write
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='One', subject=SUBJECT, chats=[
+        SessionChat(message='a', is_reply=False, timestamp=1)
+    ]))
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='Uno', subject=SUBJECT))
+    connector.upsert_student(SessionStudent(id='s2', name='Bo'))
+    # An existing tutor keeps its stored chats, whatever the upserted tutor holds
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='Eins', subject=SUBJECT, chats=[
+        SessionChat(message='b', is_reply=False, timestamp=2)
+    ]))
+
+    assert connector.get_tutor('s1', 't1').name == 'Eins'
+    assert [c.message for c in connector.list_chats('s1', 't1')] == ['a']
+    assert connector.count_chats('s1', 't1') == 1
+
+
+def test_inmemory_connector():
+    exercise_connector(InMemoryConnector())
+
+
+def test_inmemory_set_all_rebuilds_index():
+    source = InMemoryConnector()
+    exercise_connector(source)
+
+    copy = InMemoryConnector()
+    copy.set_all(source.get_all())
+    assert [c.message for c in copy.list_chats('s1', 't1')] == ['kept']
+    copy.append_chat('s1', 't1', SessionChat(message='new', is_reply=False, timestamp=5))
+    assert len(copy.list_chats('s1', 't1')) == 2
+
+
+@pytest.mark.parametrize('factory', [
+    lambda tmp: InMemoryConnector(),
+    lambda tmp: InMemoryConnector(columnar=True),
+    lambda tmp: SQLiteConnector(str(tmp / 'store.db')),
+    lambda tmp: LogConnector(str(tmp / 'log'), fsync='never'),
+    lambda tmp: WriteBehindConnector(SQLiteConnector(str(tmp / 'store.db')), flush_interval=None),
+    lambda tmp: EvictingConnector(SQLiteConnector(str(tmp / 'spill.db')), max_students=1, low_watermark=0),
+    lambda tmp: ShardedConnector([InMemoryConnector(), SQLiteConnector(str(tmp / 'shard.db')), InMemoryConnector()]),
+    lambda tmp: CachedConnector(SQLiteConnector(str(tmp / 'store.db')), max_tutors=2, tail_size=2),
+    lambda tmp: InMemoryConnector(dedup=True),
+    lambda tmp: SQLiteConnector(str(tmp / 'store.db'), dedup=True),
+], ids=['inmemory', 'columnar', 'sqlite', 'log', 'write_behind', 'evicting', 'sharded', 'cached',
+        'inmemory_dedup', 'sqlite_dedup'])
+def test_bulk_operations(tmp_path, factory):
+    connector = factory(tmp_path)
+    exercise_connector(connector)
+    exercise_bulk(connector)
+
+
+@pytest.mark.parametrize('factory', [
+    lambda tmp: InMemoryConnector(),
+    lambda tmp: InMemoryConnector(columnar=True),
+    lambda tmp: SQLiteConnector(str(tmp / 'store.db')),
+    lambda tmp: LogConnector(str(tmp / 'log'), fsync='never'),
+    lambda tmp: WriteBehindConnector(SQLiteConnector(str(tmp / 'store.db')), flush_interval=None),
+    lambda tmp: InMemoryConnector(compression='zlib', active_window=2),
+    lambda tmp: InMemoryConnector(columnar=True, compression='zlib', active_window=2),
+    lambda tmp: SQLiteConnector(str(tmp / 'store.db'), compression='zlib', active_window=2),
+    lambda tmp: EvictingConnector(SQLiteConnector(str(tmp / 'spill.db')), idle_ttl=0),
+    lambda tmp: ShardedConnector([SQLiteConnector(str(tmp / 'shard.db')), InMemoryConnector()]),
+    lambda tmp: CachedConnector(InMemoryConnector(), tail_size=4),
+], ids=['inmemory', 'columnar', 'sqlite', 'log', 'write_behind', 'inmemory_zlib', 'columnar_zlib', 'sqlite_zlib',
+        'evicting', 'sharded', 'cached'])
+def test_windowed_list_chats(tmp_path, factory):
+    connector = factory(tmp_path)
+    connector.append_chats('s1', 't1', [
+        SessionChat(message=f"m{i}", is_reply=bool(i % 2), timestamp=i) for i in range(10)
+    ])
+
+    def messages(**window):
+        return [c.message for c in connector.list_chats('s1', 't1', **window)]
+
+    assert connector.count_chats('s1', 't1') == 10
+    assert connector.count_chats('s1', 'missing') == 0
+    assert messages(limit=3) == ['m7', 'm8', 'm9']
+    assert messages(limit=3, reverse=True) == ['m9', 'm8', 'm7']
+    assert messages(limit=2, before_ts=5) == ['m3', 'm4']
+    assert messages(after_ts=6) == ['m7', 'm8', 'm9']
+    assert messages(after_ts=2, before_ts=5) == ['m3', 'm4']
+    assert messages(limit=0) == []
+    assert len(messages()) == 10
+
+
+def test_window_chats_skips_untimed_chats_when_bounded():
+    chats = [SessionChat(message='a', is_reply=False), SessionChat(message='b', is_reply=True, timestamp=3)]
+    assert [c.message for c in window_chats(chats, limit=5)] == ['a', 'b']
+    assert [c.message for c in window_chats(chats, before_ts=10)] == ['b']
+
+
+class CountingSQLite(SQLiteConnector):
+    """SQLiteConnector that counts write calls"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writes = []
+
+    def upsert_tutors(self, student_id, tutors):
+        self.writes.append(('upsert_tutors', len(tutors)))
+        super().upsert_tutors(student_id, tutors)
+
+    def append_chats(self, student_id, tutor_id, chats):
+        self.writes.append(('append_chats', len(chats)))
+        super().append_chats(student_id, tutor_id, chats)
+
+
+def test_write_behind_contract():
+    connector = WriteBehindConnector(InMemoryConnector(), flush_interval=None)
+    exercise_connector(connector)
+    connector.close()
+
+
+def test_write_behind_buffers_and_coalesces(tmp_path):
+    inner = CountingSQLite(str(tmp_path / 'store.db'))
+    connector = WriteBehindConnector(inner, flush_interval=None)
+    for persona in ('a', 'b', 'c'):
+        connector.upsert_tutor('s1', SessionTutor(id='t1', name='T', subject=SUBJECT, persona=persona))
+    for i in range(4):
+        connector.append_chat('s1', 't1', SessionChat(message=f"m{i}", is_reply=False, timestamp=i))
+
+    # Nothing written yet, but reads see the buffered writes
+    assert inner.list_tutors('s1') == []
+    assert connector.list_tutors('s1')[0].persona == 'c'
+    assert [c.message for c in connector.list_chats('s1', 't1', limit=2)] == ['m2', 'm3']
+    assert connector.count_chats('s1', 't1') == 4
+    assert connector.pending_ops == 2
+
+    connector.flush()
+    assert inner.writes == [('upsert_tutors', 1), ('append_chats', 4)]
+    assert [c.message for c in inner.list_chats('s1', 't1')] == ['m0', 'm1', 'm2', 'm3']
+    assert connector.pending_ops == 0
+
+    connector.append_chat('s1', 't1', SessionChat(message='m4', is_reply=False, timestamp=4))
+    connector.replace_chats('s1', 't1', [SessionChat(message='kept', is_reply=True, timestamp=5)])
+    assert [c.message for c in connector.list_chats('s1', 't1')] == ['kept']
+    connector.close()
+    with pytest.raises(HenotaceError):
+        connector.append_chat('s1', 't1', SessionChat(message='late', is_reply=False))
+
+
+def test_write_behind_upsert_over_inmemory_keeps_chats():
+    inner = InMemoryConnector()
+    inner.upsert_tutor('s1', SessionTutor(id='t1', name='T', subject=SUBJECT, chats=[
+        SessionChat(message='a', is_reply=False, timestamp=1)
+    ]))
+    connector = WriteBehindConnector(inner, flush_interval=None)
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='Renamed', subject=SUBJECT, chats=[]))
+    connector.append_chat('s1', 't1', SessionChat(message='b', is_reply=False, timestamp=2))
+
+    # Reads agree before and after the flush
+    for _ in range(2):
+        assert [c.message for c in connector.list_chats('s1', 't1')] == ['a', 'b']
+        assert [c.message for c in connector.get_tutor('s1', 't1').chats] == ['a', 'b']
+        assert connector.list_tutors('s1')[0].name == 'Renamed'
+        assert connector.count_chats('s1', 't1') == 2
+        connector.flush()
+    connector.close()
+
+
+def test_write_behind_flushes_in_background():
+    inner = InMemoryConnector()
+    connector = WriteBehindConnector(inner, max_pending=3, flush_interval=None)
+    for i in range(3):
+        connector.upsert_tutor(f"s{i}", SessionTutor(id='t1', name='T', subject=SUBJECT))
+    deadline = time.monotonic() + 5
+    while connector.pending_ops and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(inner.list_students()) == 3
+    connector.close()
+
+
+def test_write_behind_retries_only_unwritten_ops():
+    class Flaky(InMemoryConnector):
+        fail = True
+
+        def append_chats(self, student_id, tutor_id, chats):
+            if student_id == 's2' and self.fail:
+                self.fail = False
+                raise RuntimeError('store went away')
+            super().append_chats(student_id, tutor_id, chats)
+
+    inner = Flaky()
+    connector = WriteBehindConnector(inner, flush_interval=None)
+    for s in ('s1', 's2'):
+        connector.upsert_tutor(s, SessionTutor(id='t1', name='T', subject=SUBJECT))
+        connector.append_chats(s, 't1', [SessionChat(message='a', is_reply=False),
+                                         SessionChat(message='b', is_reply=False)])
+    with pytest.raises(HenotaceError):
+        connector.flush()
+    assert connector.pending_ops == 1 and inner.count_chats('s1', 't1') == 2
+    assert connector.count_chats('s2', 't1') == 2
+    connector.flush()
+    assert [inner.count_chats(s, 't1') for s in ('s1', 's2')] == [2, 2]
+    connector.close()
+
+
+def test_write_behind_reads_do_not_wait_for_other_students():
+    started, release = threading.Event(), threading.Event()
+
+    class Slow(InMemoryConnector):
+        def append_chats(self, student_id, tutor_id, chats):
+            if student_id == 'slow':
+                started.set()
+                release.wait(5)
+            super().append_chats(student_id, tutor_id, chats)
+
+    connector = WriteBehindConnector(Slow(), flush_interval=None)
+    # String hashes vary per run; pick an id that does not share a lock stripe with 'slow'
+    fast = next(f"fast{i}" for i in range(1000)
+                if connector._applying(f"fast{i}") is not connector._applying('slow')
+                and connector._stripes(f"fast{i}") is not connector._stripes('slow'))
+    connector.append_chat('slow', 't1', SessionChat(message='a', is_reply=False))
+    connector.append_chat(fast, 't1', SessionChat(message='b', is_reply=False))
+    flusher = threading.Thread(target=connector.flush)
+    flusher.start()
+    assert started.wait(5)
+    begin = time.monotonic()
+    assert [c.message for c in connector.list_chats(fast, 't1')] == ['b']
+    assert time.monotonic() - begin < 1
+    release.set()
+    flusher.join()
+    connector.close()
+
+
+def test_write_behind_is_not_kept_alive_and_flushes_when_dropped():
+    import gc
+    import weakref
+    inner = InMemoryConnector()
+    connector = WriteBehindConnector(inner, flush_interval=None)
+    connector.append_chat('s1', 't1', SessionChat(message='a', is_reply=False))
+    ref = weakref.ref(connector)
+    del connector
+    gc.collect()
+    assert ref() is None and inner.count_chats('s1', 't1') == 1
+
+
+@pytest.mark.parametrize('factory', [
+    lambda tmp: InMemoryConnector(),
+    lambda tmp: InMemoryConnector(columnar=True),
+    lambda tmp: SQLiteConnector(str(tmp / 'store.db')),
+    lambda tmp: LogConnector(str(tmp / 'log'), fsync='never'),
+    lambda tmp: WriteBehindConnector(InMemoryConnector(), max_pending=50, flush_interval=0.01),
+    lambda tmp: EvictingConnector(SQLiteConnector(str(tmp / 'spill.db')), max_students=4),
+    lambda tmp: ShardedConnector([InMemoryConnector(), InMemoryConnector()]),
+    lambda tmp: CachedConnector(InMemoryConnector(), tail_size=8),
+], ids=['inmemory', 'columnar', 'sqlite', 'log', 'write_behind', 'evicting', 'sharded', 'cached'])
+def test_concurrent_writes_are_not_lost(tmp_path, factory):
+    connector = factory(tmp_path)
+    writers, per_writer = 8, 200
+    dropped = []
+    done = threading.Event()
+
+    def write(n):
+        for i in range(per_writer):
+            connector.append_chat('shared', 't1', SessionChat(message=f"{n}:{i}", is_reply=False, timestamp=i))
+            connector.append_chat(f"s{n}", 't1', SessionChat(message=str(i), is_reply=False, timestamp=i))
+
+    def compact():
+        # Read-then-replace, as Tutor compression does
+        while not done.is_set():
+            with connector.lock_student('shared'):
+                chats = list(connector.list_chats('shared', 't1'))
+                # Summarizing takes a while; writers get scheduled meanwhile
+                time.sleep(0.001)
+                if len(chats) > 10:
+                    connector.replace_chats('shared', 't1', chats[-10:])
+                    dropped.append(len(chats) - 10)
+
+    compactor = threading.Thread(target=compact)
+    compactor.start()
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    compactor.join()
+
+    assert connector.count_chats('shared', 't1') + sum(dropped) == writers * per_writer
+    assert all(connector.count_chats(f"s{n}", 't1') == per_writer for n in range(writers))
+
+
+def test_sqlite_connector(tmp_path):
+    exercise_connector(SQLiteConnector(str(tmp_path / 'store.db')))
+
+
+def test_sqlite_persists_and_pages(tmp_path):
+    path = str(tmp_path / 'store.db')
+    connector = SQLiteConnector(path)
+    connector.upsert_tutor('s1', SessionTutor(
+        id='t1', name='Tutor', subject=SUBJECT, context=['Unit 3'], user_profile={'grade': 5}
+    ))
+    with connector.transaction():
+        for i in range(10):
+            connector.append_chat('s1', 't1', SessionChat(message=f"m{i}", is_reply=False, timestamp=i))
+    connector.close()
+
+    reopened = SQLiteConnector(path)
+    tutor = reopened.list_tutors('s1')[0]
+    assert tutor.context == ['Unit 3'] and tutor.user_profile == {'grade': 5}
+    assert [c.timestamp for c in reopened.list_chats('s1', 't1', limit=3)] == [7, 8, 9]
+    assert [c.timestamp for c in reopened.list_chats('s1', 't1', limit=2, before_ts=5)] == [3, 4]
+
+
+def test_evicting_connector_spills_and_reloads(tmp_path):
+    spill = SQLiteConnector(str(tmp_path / 'spill.db'))
+    connector = EvictingConnector(spill, max_students=3, max_chats=100, low_watermark=0.5)
+    for s in range(5):
+        connector.append_chats(f"s{s}", 't1', [
+            SessionChat(message=f"m{s}-{i}", is_reply=bool(i % 2), timestamp=i) for i in range(4)
+        ])
+    stats = connector.stats
+    assert stats.resident_students <= 3 and stats.spilled_students == 5 - stats.resident_students
+    assert [s.id for s in spill.list_students()][:2] == ['s0', 's1']
+
+    # Evicted students reload transparently and become most recently used
+    assert [c.message for c in connector.list_chats('s0', 't1')] == [f"m0-{i}" for i in range(4)]
+    assert connector.stats.reloads == 1
+    assert sorted(s.id for s in connector.list_students()) == ['s0', 's1', 's2', 's3', 's4']
+    assert sorted(s.id for s in connector.list_student_headers()) == ['s0', 's1', 's2', 's3', 's4']
+
+    # An unchanged student is dropped without writing it again
+    writes = connector.stats.spill_writes
+    assert connector.evict('s0')
+    assert connector.stats.spill_writes == writes
+
+    connector.append_chat('s0', 't1', SessionChat(message='new', is_reply=False, timestamp=9))
+    assert connector.evict('s0')
+    assert connector.stats.spill_writes == writes + 1
+    assert spill.count_chats('s0', 't1') == 5
+
+    connector.delete_student('s1')
+    assert 's1' not in [s.id for s in connector.list_student_headers()]
+    assert spill.list_tutors('s1') == []
+
+    # The chat high watermark applies on its own too
+    by_chats = EvictingConnector(SQLiteConnector(str(tmp_path / 'chats.db')), max_chats=10)
+    for s in range(4):
+        by_chats.append_chats(f"s{s}", 't1', [SessionChat(message='x', is_reply=False)] * 4)
+    assert by_chats.stats.resident_chats <= 10
+
+
+def test_evicting_connector_counts_chats_by_delta(tmp_path):
+    connector = EvictingConnector(SQLiteConnector(str(tmp_path / 'spill.db')), max_chats=1000)
+
+    def resident():
+        return sum(len(t.chats) for s in connector._students.values() for t in s.tutors)
+
+    connector.append_chats('s1', 't1', [SessionChat(message='a', is_reply=False)] * 3)
+    connector.append_chat('s1', 't2', SessionChat(message='b', is_reply=False))
+
+    class Counted(list):
+        iterations = 0
+
+        def __iter__(self):
+            Counted.iterations += 1
+            return super().__iter__()
+
+    student = connector._students['s1']
+    student.tutors = Counted(student.tutors)
+    for _ in range(5):
+        connector.append_chat('s1', 't1', SessionChat(message='c', is_reply=True))
+    connector.replace_chats('s1', 't1', [SessionChat(message='d', is_reply=False)] * 2)
+    assert Counted.iterations == 0
+    assert connector.stats.resident_chats == resident() == 3
+
+    connector.delete_tutor('s1', 't2')
+    connector.append_chat('s1', 't3', SessionChat(message='e', is_reply=False))
+    connector.upsert_student(SessionStudent(id='s1', name='Ada', tutors=[
+        SessionTutor(id='t4', name='Four', subject=SUBJECT, chats=[SessionChat(message='f', is_reply=False)] * 4)
+    ]))
+    assert connector.stats.resident_chats == resident() == 7
+
+
+def test_evicting_connector_idle_ttl(tmp_path):
+    connector = EvictingConnector(SQLiteConnector(str(tmp_path / 'spill.db')), idle_ttl=0.05)
+    connector.append_chat('idle', 't1', SessionChat(message='old', is_reply=False, timestamp=1))
+    time.sleep(0.1)
+    connector.append_chat('busy', 't1', SessionChat(message='hot', is_reply=False, timestamp=2))
+    stats = connector.stats
+    assert stats.evictions == 1 and stats.resident_students == 1
+    assert [c.message for c in connector.list_chats('idle', 't1')] == ['old']
+
+
+def test_hash_ring_moves_few_keys():
+    keys = [f"student_{i}" for i in range(2000)]
+    ring = HashRing(['a', 'b', 'c'])
+    before = {k: ring.node_for(k) for k in keys}
+    assert set(before.values()) == {'a', 'b', 'c'}
+    ring.add('d')
+    moved = [k for k in keys if ring.node_for(k) != before[k]]
+    assert all(ring.node_for(k) == 'd' for k in moved)
+    assert 0.1 < len(moved) / len(keys) < 0.4
+    ring.remove('d')
+    assert {k: ring.node_for(k) for k in keys} == before
+
+
+def test_sharded_connector_reshards(tmp_path):
+    shards = {'a': InMemoryConnector(), 'b': SQLiteConnector(str(tmp_path / 'b.db'))}
+    connector = ShardedConnector(shards)
+    for s in range(40):
+        connector.upsert_student(SessionStudent(id=f"s{s}", name=f"Student {s}"))
+        connector.append_chats(f"s{s}", 't1', [SessionChat(message=f"m{s}", is_reply=False, timestamp=s)])
+    assert all(shards[connector.shard_for(f"s{s}")].count_chats(f"s{s}", 't1') == 1 for s in range(40))
+    assert [s.id for s in connector.list_student_headers()] == sorted(f"s{s}" for s in range(40))
+
+    before = {f"s{s}": connector.shard_for(f"s{s}") for s in range(40)}
+    moved = connector.add_shard('c', InMemoryConnector())
+    assert moved == sum(connector.shard_for(sid) != owner for sid, owner in before.items()) > 0
+    assert sum(len(shard.list_student_headers()) for shard in connector.shards.values()) == 40
+    assert connector.list_chats('s7', 't1')[0].message == 'm7'
+
+    connector.remove_shard('a')
+    assert sorted(connector.shards) == ['b', 'c']
+    assert [c.message for s in connector.list_students() for t in s.tutors for c in t.chats] == \
+        [f"m{s}" for s in sorted(range(40), key=lambda s: f"s{s}")]
+
+    stats = connector.stats()
+    assert stats['b'].calls > 0 and stats['b'].mean_ms > 0 and stats['b'].errors == 0
+    connector.close()
+
+
+def test_sharded_connector_switches_routing_after_copying():
+    shards = {'a': InMemoryConnector(), 'b': InMemoryConnector()}
+    connector = ShardedConnector(shards)
+    for s in range(40):
+        connector.append_chat(f"s{s}", 't1', SessionChat(message=f"m{s}", is_reply=False, timestamp=s))
+    connector.list_student_headers()
+    pool = connector._executor
+    seen = []
+
+    class Watched(InMemoryConnector):
+        def upsert_student(self, student):
+            # Mid-copy, the student is still routed to and readable on its old shard
+            seen.append((connector.shard_for(student.id),
+                         [c.message for c in connector.list_chats(student.id, 't1')]))
+            super().upsert_student(student)
+
+    added = Watched()
+    moved = connector.add_shard('c', added)
+    assert moved == len(seen) > 0
+    assert all(owner != 'c' and len(messages) == 1 for owner, messages in seen)
+    assert all(connector.list_chats(f"s{s}", 't1')[0].message == f"m{s}" for s in range(40))
+    # The old fan-out pool was replaced and shut down, so its threads exit
+    assert connector._executor is not pool
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: 1)
+    assert connector.list_student_headers()
+    connector.close()
+
+    assert connector.remove_shard('c') == moved
+    assert added.list_student_headers() == []
+    assert len(connector.list_student_headers()) == 40
+
+
+def test_cached_connector_serves_reads_and_invalidates_on_write(tmp_path):
+    store = SQLiteConnector(str(tmp_path / 'store.db'))
+    connector = CachedConnector(store, max_tutors=2, tail_size=4)
+    connector.upsert_student(SessionStudent(id='s1', name='Ada'))
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='Tutor', subject=SUBJECT, persona='Kind'))
+    connector.append_chats('s1', 't1', [SessionChat(message=f"m{i}", is_reply=False, timestamp=i) for i in range(3)])
+
+    assert [c.message for c in connector.list_chats('s1', 't1', limit=2)] == ['m1', 'm2']
+    store.append_chat('s1', 't1', SessionChat(message='behind', is_reply=False, timestamp=9))
+    # Served from the cache, which does not see writes that bypass it
+    assert [c.message for c in connector.list_chats('s1', 't1', limit=2)] == ['m1', 'm2']
+    store.replace_chats('s1', 't1', store.list_chats('s1', 't1')[:3])
+
+    connector.append_chat('s1', 't1', SessionChat(message='m3', is_reply=True, timestamp=3))
+    assert connector.count_chats('s1', 't1') == 4
+    tutor = connector.get_tutors_many('s1', ['t1'])['t1']
+    assert tutor.persona == 'Kind' and [c.message for c in tutor.chats] == ['m0', 'm1', 'm2', 'm3']
+    tutor.persona = 'Strict'
+    assert connector.list_tutors('s1')[0].persona == 'Kind'
+    connector.upsert_tutor('s1', tutor)
+    assert connector.list_tutors('s1')[0].persona == 'Strict'
+
+    connector.append_chat('s1', 't1', SessionChat(message='m4', is_reply=False, timestamp=4))
+    assert [c.message for c in connector.list_chats('s1', 't1', limit=3, reverse=True)] == ['m4', 'm3', 'm2']
+    assert len(connector.list_chats('s1', 't1')) == 5
+    connector.replace_chats('s1', 't1', [])
+    assert connector.list_chats('s1', 't1', limit=2) == []
+
+    for t in range(3):
+        connector.count_chats('s1', f"x{t}")
+    stats = connector.stats
+    assert stats.tutors == 2 and stats.evictions >= 1 and stats.chats <= 2 * 4
+    assert stats.hits > 0 and 0 < stats.hit_rate < 1
+    connector.delete_student('s1')
+    assert connector.list_tutors('s1') == [] and connector.count_chats('s1', 't1') == 0
+
+
+def test_cached_lock_student_locks_only_when_entered():
+    connector = CachedConnector(InMemoryConnector())
+    pending = connector.lock_student('s1')
+
+    def write():
+        connector.append_chat('s1', 't1', SessionChat(message='other', is_reply=False))
+
+    # Created but not entered: other threads are not blocked
+    writer = threading.Thread(target=write, daemon=True)
+    writer.start()
+    writer.join(2)
+    assert not writer.is_alive() and connector.count_chats('s1', 't1') == 1
+
+    with pending:
+        writer = threading.Thread(target=write, daemon=True)
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive()
+    writer.join(2)
+    assert connector.count_chats('s1', 't1') == 2
+
+
+def test_cached_read_during_write_does_not_fill():
+    class PausingConnector(InMemoryConnector):
+        """Holds append_chats open after the chats are stored"""
+
+        def __init__(self):
+            super().__init__()
+            self.stored = threading.Event()
+            self.release = threading.Event()
+
+        def append_chats(self, student_id, tutor_id, chats):
+            super().append_chats(student_id, tutor_id, chats)
+            self.stored.set()
+            self.release.wait(5)
+
+    inner = PausingConnector()
+    inner.upsert_tutor('s1', SessionTutor(id='t1', name='Tutor', subject=SUBJECT, chats=[
+        SessionChat(message='m0', is_reply=False, timestamp=0)
+    ]))
+    connector = CachedConnector(inner, tail_size=4)
+    writer = threading.Thread(target=connector.append_chat, daemon=True,
+                              args=('s1', 't1', SessionChat(message='m1', is_reply=False, timestamp=1)))
+    writer.start()
+    assert inner.stored.wait(5)
+    # Reads mid-write already see the new chat, but must not be cached
+    assert [c.message for c in connector.list_chats('s1', 't1')] == ['m0', 'm1']
+    assert connector.count_chats('s1', 't1') == 2
+    inner.release.set()
+    writer.join(5)
+
+    assert [c.message for c in connector.list_chats('s1', 't1')] == ['m0', 'm1']
+    assert connector.count_chats('s1', 't1') == 2
+
+
+def test_cached_get_tutor_caches_fields(tmp_path):
+    class LookupCounting(SQLiteConnector):
+        reads = 0
+
+        def get_tutor(self, student_id, tutor_id):
+            self.reads += 1
+            return super().get_tutor(student_id, tutor_id)
+
+    store = LookupCounting(str(tmp_path / 'store.db'))
+    connector = CachedConnector(store)
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='Tutor', subject=SUBJECT, persona='Kind'))
+    connector.append_chat('s1', 't1', SessionChat(message='m0', is_reply=False, timestamp=0))
+    connector.clear()
+
+    assert connector.get_tutor('s1', 't1').persona == 'Kind'
+    reads = store.reads
+    tutor = connector.get_tutor('s1', 't1')
+    assert store.reads == reads and tutor.persona == 'Kind' and tutor.chats == []
+    # Cached fields follow upserts made through the wrapper
+    tutor.persona = 'Strict'
+    connector.upsert_tutor('s1', tutor)
+    assert connector.get_tutor('s1', 't1').persona == 'Strict'
+    assert [c.message for c in connector.list_chats('s1', 't1')] == ['m0']
+
+
+@pytest.mark.parametrize('factory', [
+    lambda tmp: InMemoryConnector(dedup=True),
+    lambda tmp: SQLiteConnector(str(tmp / 'store.db'), dedup=True),
+], ids=['inmemory', 'sqlite'])
+def test_dedup_shares_and_refcounts_blobs(tmp_path, factory):
+    import json
+    connector = factory(tmp_path)
+
+    def blobs():
+        if isinstance(connector, SQLiteConnector):
+            return dict(connector._conn.execute("SELECT data, refs FROM blobs").fetchall())
+        return connector.interner.stats.blobs
+
+    persona = 'You are a patient tutor. ' * 20
+    for s in range(3):
+        connector.upsert_tutors(f"s{s}", [
+            # Fresh copies, as if each tutor were loaded separately
+            SessionTutor(id=f"t{t}", name='Tutor', subject=SUBJECT, persona=json.loads(json.dumps(persona)),
+                         context=['algebra', 'geometry'], user_profile={'grade': s})
+            for t in range(4)
+        ])
+    tutors = [t for s in range(3) for t in connector.list_tutors(f"s{s}")]
+    assert len({id(t.persona) for t in tutors}) == 1 and len({id(t.context) for t in tutors}) == 1
+    assert tutors[0].persona == persona and tutors[-1].user_profile == {'grade': 2}
+    if isinstance(connector, SQLiteConnector):
+        assert blobs()[json.dumps(persona)] == 12 and len(blobs()) == 5
+    else:
+        assert blobs() == 5 and connector.interner.stats.references == 36
+
+    tutor = connector.get_tutors_many('s0', ['t0'])['t0']
+    tutor.persona = 'Strict'
+    connector.upsert_tutor('s0', tutor)
+    connector.delete_tutor('s1', 't0')
+    connector.delete_student('s2')
+    assert connector.list_tutors('s0')[0].persona == 'Strict'
+    assert connector.list_tutors('s0')[1].persona == persona
+    if isinstance(connector, SQLiteConnector):
+        assert blobs()[json.dumps(persona)] == 6 and len(blobs()) == 5
+    else:
+        assert blobs() == 5 and connector.interner.stats.references == 21
+
+    connector.set_all({'students': []})
+    assert not blobs()
+
+
+@pytest.mark.parametrize('factory', [
+    lambda tmp: InMemoryConnector(changes=8),
+    lambda tmp: SQLiteConnector(str(tmp / 'store.db'), changes=8),
+    lambda tmp: LogConnector(str(tmp / 'log'), changes=8),
+], ids=['inmemory', 'sqlite', 'log'])
+def test_change_feed_orders_and_bounds_changes(tmp_path, factory):
+    connector = factory(tmp_path)
+    feed = connector.changes
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='T', subject=SUBJECT,
+                                              chats=[SessionChat(message='hi', is_reply=False)]))
+    connector.append_chats('s1', 't1', [SessionChat(message='a', is_reply=False),
+                                        SessionChat(message='b', is_reply=True)])
+    connector.replace_chats('s1', 't1', [])
+    connector.delete_tutor('s1', 't1')
+    connector.delete_tutor('s1', 't1')
+    changes = feed.since(0)
+    assert [c.kind for c in changes] == [
+        'tutor_upserted', 'chats_appended', 'chats_appended', 'chats_replaced', 'tutor_deleted'
+    ]
+    assert [c.seq for c in changes] == [1, 2, 3, 4, 5] and feed.last_seq == 5
+    assert [c.message for c in changes[2].chats] == ['a', 'b'] and changes[2].chats[1].is_reply
+    assert (changes[4].student_id, changes[4].tutor_id) == ('s1', 't1')
+    assert [c.seq for c in feed.since(3, limit=1)] == [4] and feed.since(5) == []
+
+    start = time.monotonic()
+    assert feed.wait(5, timeout=0.05) == [] and time.monotonic() - start >= 0.05
+    for i in range(6):
+        connector.append_chat('s2', 't1', SessionChat(message=str(i), is_reply=False))
+    with pytest.raises(ChangeFeedGapError):
+        feed.since(0)
+    tailed = list(feed.tail(10, timeout=0))
+    assert [c.seq for c in tailed] == [11, 12] and tailed[-1].chats[0].message == '5'
+
+    if not isinstance(connector, InMemoryConnector):
+        connector.close()
+        connector = factory(tmp_path)
+        assert connector.changes.last_seq == 12
+        assert [c.seq for c in connector.changes.since(4)] == list(range(5, 13))
+        connector.set_all({'students': []})
+        assert connector.changes.since(12)[0].kind == 'reset'
+        connector.close()
+
+
+def test_change_feed_wakes_waiting_consumer():
+    connector = InMemoryConnector(changes=100)
+    received = []
+    consumer = threading.Thread(target=lambda: received.extend(connector.changes.tail(0, timeout=1)))
+    consumer.start()
+    time.sleep(0.05)
+    connector.upsert_student(SessionStudent(id='s1', name='Ada'))
+    connector.delete_student('s1')
+    consumer.join()
+    assert [c.kind for c in received] == ['student_upserted', 'student_deleted']
+    with pytest.raises(ValueError):
+        EvictingConnector(InMemoryConnector(), changes=10)
+
+
+def test_sqlite_compresses_chats_outside_active_window(tmp_path):
+    path = str(tmp_path / 'store.db')
+    codec = ZlibCodec(dictionary=b'Let us work through the equation step by step.')
+    text = 'Let us work through the equation step by step. Subtract {0} from both sides.'
+    connector = SQLiteConnector(path, compression=codec, active_window=4)
+    connector.append_chats('s1', 't1', [
+        SessionChat(message=text.format(i), is_reply=True, timestamp=i) for i in range(10)
+    ])
+    packed = connector._conn.execute("SELECT COUNT(*) FROM chats WHERE packed > 0").fetchone()[0]
+    assert packed == 6
+    connector.close()
+
+    reopened = SQLiteConnector(path, compression=codec, active_window=4)
+    chats = reopened.list_chats('s1', 't1')
+    assert isinstance(chats[0], CompressedChat) and not isinstance(chats[-1], CompressedChat)
+    assert [c.message for c in chats] == [text.format(i) for i in range(10)]
+    assert reopened.list_tutors('s1')[0].chats == chats
+    reopened.close()
+
+    with pytest.raises(HenotaceError):
+        SQLiteConnector(path).list_chats('s1', 't1')
+
+
+def test_inmemory_compresses_chats_outside_active_window():
+    text = 'Great question! Remember to isolate the variable first. Step {0}.'
+    for columnar in (False, True):
+        connector = InMemoryConnector(columnar=columnar, compression='zlib', active_window=4)
+        expected = [SessionChat(message=text.format(i), is_reply=bool(i % 2), timestamp=i) for i in range(40)]
+        for chat in expected:
+            connector.append_chat('s1', 't1', chat)
+        stored = connector.list_chats('s1', 't1')
+        if columnar:
+            assert stored.packed == 32
+        else:
+            assert isinstance(stored[0], CompressedChat) and not isinstance(stored[-4], CompressedChat)
+        assert list(stored) == expected
+        replacement = expected[:10]
+        connector.replace_chats('s1', 't1', replacement)
+        assert list(connector.list_chats('s1', 't1')) == expected[:10]
+        # Only the stored copies are compressed, never the caller's lists
+        seeded = expected[:10]
+        connector.upsert_tutor('s1', SessionTutor(id='t2', name='T', subject=SUBJECT, chats=seeded))
+        assert not any(isinstance(c, CompressedChat) for c in replacement + seeded)
+        assert replacement == seeded == expected[:10]
+
+
+def test_sqlite_transaction_rolls_back(tmp_path):
+    connector = SQLiteConnector(str(tmp_path / 'store.db'))
+    try:
+        with connector.transaction():
+            connector.append_chat('s1', 't1', SessionChat(message='lost', is_reply=False, timestamp=1))
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+    assert connector.list_chats('s1', 't1') == []
+
+
+def test_log_connector(tmp_path):
+    exercise_connector(LogConnector(str(tmp_path / 'log'), fsync='never'))
+
+
+def test_log_connector_replays_and_drops_torn_tail(tmp_path):
+    directory = str(tmp_path / 'log')
+    connector = LogConnector(directory, fsync='always')
+    exercise_connector(connector)
+    with connector.transaction():
+        connector.append_chat('s1', 't1', SessionChat(message='q', is_reply=False, timestamp=5))
+        connector.append_chat('s1', 't1', SessionChat(message='a', is_reply=True, timestamp=6))
+    connector.close()
+
+    segment = os.path.join(directory, sorted(os.listdir(directory))[-1])
+    with open(segment, 'ab') as f:
+        f.write(b'{"op":"chat","s":"s1"')
+
+    reopened = LogConnector(directory)
+    assert [c.message for c in reopened.list_chats('s1', 't1')] == ['kept', 'q', 'a']
+    reopened.append_chat('s1', 't1', SessionChat(message='after', is_reply=False, timestamp=7))
+    reopened.close()
+    assert [c.message for c in LogConnector(directory).list_chats('s1', 't1')][-1] == 'after'
+
+
+def test_log_connector_compaction(tmp_path):
+    directory = str(tmp_path / 'log')
+    connector = LogConnector(directory, fsync='never', segment_bytes=2048, compact_garbage=None)
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='Tutor', subject=SUBJECT, persona='Kind'))
+    for i in range(200):
+        connector.append_chat('s1', 't1', SessionChat(message=f"m{i}", is_reply=False, timestamp=i))
+        if i % 50 == 49:
+            connector.replace_chats('s1', 't1', connector.list_chats('s1', 't1')[-5:])
+    connector.upsert_tutor('s2', SessionTutor(id='t9', name='Gone', subject=SUBJECT))
+    connector.delete_student('s2')
+    before = sum(os.path.getsize(os.path.join(directory, n)) for n in os.listdir(directory))
+
+    connector.compact()
+    connector.append_chat('s1', 't1', SessionChat(message='new', is_reply=False, timestamp=999))
+    after = sum(os.path.getsize(os.path.join(directory, n)) for n in os.listdir(directory))
+    expected = [c.message for c in connector.list_chats('s1', 't1')]
+    connector.close()
+
+    assert after < before
+    assert expected[-1] == 'new' and len(expected) == 6
+    reopened = LogConnector(directory)
+    assert [c.message for c in reopened.list_chats('s1', 't1')] == expected
+    assert reopened.list_tutors('s1')[0].persona == 'Kind'
+    assert [s.id for s in reopened.list_students()] == ['s1']
+
+
+def test_log_compaction_survives_crash_before_old_segments_are_removed(tmp_path):
+    import shutil
+    directory = str(tmp_path / 'log')
+    connector = LogConnector(directory, fsync='never', segment_bytes=512, compact_garbage=None)
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='Tutor', subject=SUBJECT))
+    for i in range(40):
+        connector.append_chat('s1', 't1', SessionChat(message=f"m{i}", is_reply=False, timestamp=i))
+    connector.replace_chats('s1', 't1', [])
+    connector.upsert_tutor('s2', SessionTutor(id='t9', name='Gone', subject=SUBJECT))
+    connector.delete_student('s2')
+    connector.flush()
+    saved = str(tmp_path / 'saved')
+    shutil.copytree(directory, saved)
+
+    connector.compact()
+    connector.append_chat('s1', 't1', SessionChat(message='new', is_reply=False, timestamp=99))
+    connector.close()
+    # As if the process died right after the compacted segment was renamed into place
+    for name in os.listdir(saved):
+        if not os.path.exists(os.path.join(directory, name)):
+            shutil.copy(os.path.join(saved, name), directory)
+
+    reopened = LogConnector(directory)
+    assert [c.message for c in reopened.list_chats('s1', 't1')] == ['new']
+    assert [s.id for s in reopened.list_students()] == ['s1']
+
+
+def test_log_background_compaction_logs_failures(tmp_path):
+    messages = []
+
+    class Recorder(NoOpLogger):
+        def error(self, message, *args, **kwargs):
+            messages.append(message)
+
+    connector = LogConnector(str(tmp_path / 'log'), fsync='never', logger=Recorder())
+    connector.compact = lambda: 1 / 0
+    connector._background_compact()
+    assert messages == ['Log compaction failed']
+    connector.close()
+
+
+def test_log_failed_compaction_is_retried(tmp_path):
+    directory = str(tmp_path / 'log')
+    connector = LogConnector(directory, fsync='never', segment_bytes=512, compact_garbage=None)
+    connector.upsert_tutor('s1', SessionTutor(id='t1', name='Tutor', subject=SUBJECT))
+    for i in range(20):
+        connector.append_chat('s1', 't1', SessionChat(message=f"m{i}", is_reply=False, timestamp=i))
+    connector.replace_chats('s1', 't1', [])
+    garbage = connector._garbage
+
+    def failing_replace(src, dst):
+        raise OSError('disk full')
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(os, 'replace', failing_replace)
+        with pytest.raises(OSError):
+            connector.compact()
+    # The garbage still counts, so the next compaction runs and reclaims it
+    assert connector._garbage == garbage
+    assert not [name for name in os.listdir(directory) if name.endswith('.tmp')]
+    connector.compact()
+    assert connector._garbage == 0
+    connector.append_chat('s1', 't1', SessionChat(message='new', is_reply=False, timestamp=99))
+    connector.close()
+    assert [c.message for c in LogConnector(directory).list_chats('s1', 't1')] == ['new']
+
+
+def test_log_delete_of_unknown_student_writes_nothing(tmp_path):
+    connector = LogConnector(str(tmp_path / 'log'), fsync='never', changes=8)
+    connector.upsert_student(SessionStudent(id='s1', name='Ada'))
+    size = connector._active_size
+
+    connector.delete_student('missing')
+    assert connector._active_size == size
+    # A student upserted earlier in the same transaction is deleted
+    with connector.transaction():
+        connector.upsert_student(SessionStudent(id='s2', name='Bo'))
+        connector.delete_student('s2')
+    assert [c.kind for c in connector.changes.since()] == ['student_upserted', 'student_upserted', 'student_deleted']
+    assert [s.id for s in connector.list_student_headers()] == ['s1']
+    connector.close()
+
+
+def test_mmap_archive_round_trip(tmp_path):
+    source = SQLiteConnector(str(tmp_path / 'source.db'))
+    exercise_connector(source)
+    source.upsert_tutor('s3', SessionTutor(id='t1', name='Big', subject=SUBJECT, metadata={'k': 1}))
+    for i in range(100):
+        source.append_chat('s3', 't1', SessionChat(message=f"é{i}", is_reply=bool(i % 2), timestamp=i if i else None))
+
+    # Students are read one at a time, never the whole tree at once
+    source.list_students = lambda: pytest.fail('write_mmap_archive loaded every student')
+    path = str(tmp_path / 'archive')
+    assert write_mmap_archive(source, path) == 101
+    archive = MmapArchiveConnector(path)
+
+    chats = archive.list_chats('s3', 't1')
+    assert len(chats) == 100
+    assert chats[0].timestamp is None and chats[-1].message == 'é99' and chats[-1].is_reply
+    assert chats == source.list_chats('s3', 't1')
+    assert list(chats.timestamps[1:4]) == [1, 2, 3]
+    assert chats[2:4][0].message == 'é2'
+    assert archive.list_tutors('s3')[0].metadata == {'k': 1}
+    assert [(s, t, len(v)) for s, t, v in archive.scan()] == [('s1', 't1', 1), ('s3', 't1', 100)]
+    assert archive.count_chats('s3', 't1') == 100
+    assert [c.message for c in archive.list_chats('s3', 't1', limit=2)] == ['é98', 'é99']
+    assert [c.message for c in archive.list_chats('s3', 't1', before_ts=3, reverse=True)] == ['é2', 'é1']
+
+    with pytest.raises(HenotaceError):
+        archive.append_chat('s3', 't1', SessionChat(message='x', is_reply=False))
+    archive.close()
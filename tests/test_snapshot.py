@@ -0,0 +1,82 @@
+import os
+import struct
+import sys
+sys.path.append('..')
+import pytest
+from src.henotace_ai import (
+    InMemoryConnector, SQLiteConnector, save_snapshot, load_snapshot, HenotaceError,
+    SessionStudent, SessionTutor, SessionSubject, SessionChat
+)
+from src.henotace_ai.connectors.mmap_archive import ChatView
+
+
+def build():
+    connector = InMemoryConnector()
+    for s in range(3):
+        connector.upsert_student(SessionStudent(id=f"s{s}", name=None if s == 2 else f"Student {s}"))
+        for t in range(2):
+            connector.upsert_tutor(f"s{s}", SessionTutor(
+                id=f"t{t}", name='Algebra tutor', subject=SessionSubject(id='math', name='Math', topic='algebra'),
+                persona='Patient and encouraging', context=['Unit 3', 'Quadratics'] if t else None,
+                user_profile={'grade': 9, 'goals': ['exam']} if t else None, metadata={'k': s}
+            ))
+            connector.append_chats(f"s{s}", f"t{t}", [
+                SessionChat(message=f"héllo {s}/{t}/{i}", is_reply=bool(i % 2), timestamp=None if i == 1 else i)
+                for i in range(4 * t)
+            ])
+    return connector
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+def test_snapshot_round_trip(tmp_path, lazy):
+    source = build()
+    path = str(tmp_path / 'state.snap')
+    assert save_snapshot(source, path) == os.path.getsize(path)
+
+    schema = load_snapshot(path, lazy=lazy)
+    assert schema['students'] == source.list_students()
+    chats = schema['students'][0].tutors[1].chats
+    assert isinstance(chats, ChatView) if lazy else isinstance(chats, list)
+    assert chats[1].timestamp is None and chats[-1].message == 'héllo 0/1/3'
+
+
+def test_snapshot_reads_one_student_at_a_time(tmp_path):
+    source = SQLiteConnector(str(tmp_path / 'source.db'))
+    source.set_all(build().get_all())
+    source.list_students = lambda: pytest.fail('save_snapshot loaded every student')
+    path = str(tmp_path / 'state.snap')
+    save_snapshot(source, path)
+    assert load_snapshot(path, lazy=False)['students'] == build().list_students()
+    assert not os.path.exists(path + '.tmp')
+
+
+def test_snapshot_stores_repeated_strings_once(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    save_snapshot(build(), path)
+    data = open(path, 'rb').read()
+    assert data.count(b'Patient and encouraging') == 1
+    assert data.count(b'Algebra tutor') == 1
+
+
+def test_warm_restart_from_lazy_snapshot(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    save_snapshot(build().get_all(), path)
+    restored = InMemoryConnector()
+    restored.set_all(load_snapshot(path))
+    restored.append_chat('s1', 't1', SessionChat(message='new', is_reply=False, timestamp=9))
+    assert [c.message for c in restored.list_chats('s1', 't1')][-2:] == ['héllo 1/1/3', 'new']
+
+
+def test_snapshot_rejects_foreign_and_newer_files(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    open(path, 'wb').write(b'{"students": []}')
+    with pytest.raises(HenotaceError):
+        load_snapshot(path)
+
+    save_snapshot({'students': []}, path)
+    assert load_snapshot(path) == {'students': []}
+    with open(path, 'r+b') as f:
+        f.seek(8)
+        f.write(struct.pack('<H', 99))
+    with pytest.raises(HenotaceError):
+        load_snapshot(path)
@@ -0,0 +1,170 @@
+import json
+import os
+import sys
+sys.path.append('..')
+import pytest
+from src.henotace_ai import (
+    InMemoryConnector, SQLiteConnector, LogConnector, AsyncConnectorAdapter,
+    export_ndjson, import_ndjson, migrate, verify_migration, HenotaceError,
+    SessionStudent, SessionTutor, SessionSubject, SessionChat
+)
+
+
+SUBJECT = SessionSubject(id='math', name='Math', topic='algebra')
+
+
+def populate(connector, students=4, chats=5):
+    for s in range(students):
+        connector.upsert_student(SessionStudent(id=f"s{s}", name=f"Student {s}"))
+        connector.upsert_tutor(f"s{s}", SessionTutor(
+            id='t1', name='Tutor', subject=SUBJECT, persona='Kind', user_profile={'grade': s}
+        ))
+        connector.append_chats(f"s{s}", 't1', [
+            SessionChat(message=f"m{s}-{i}", is_reply=bool(i % 2), timestamp=i) for i in range(chats)
+        ])
+        connector.upsert_tutor(f"s{s}", SessionTutor(id='t2', name='Empty', subject=SUBJECT))
+    return connector
+
+
+def snapshot(connector):
+    return [
+        (s.id, s.name, [(t.id, t.name, t.persona, t.user_profile, [(c.message, c.is_reply, c.timestamp) for c in t.chats])
+                        for t in s.tutors])
+        for s in connector.list_students()
+    ]
+
+
+def test_iter_export_streams_chunked_records():
+    records = list(populate(InMemoryConnector(), students=2).iter_export(chunk_size=2))
+    assert [r['type'] for r in records[:6]] == ['student', 'tutor', 'chats', 'chats', 'chats', 'tutor']
+    assert [len(r['chats']) for r in records if r['type'] == 'chats'] == [2, 2, 1] * 2
+    assert [r['id'] for r in records if r['type'] == 'student'] == ['s0', 's1']
+
+    resumed = list(populate(InMemoryConnector(), students=2).iter_export(start_after='s0'))
+    assert resumed[0] == {'type': 'student', 'id': 's1', 'name': 'Student 1'}
+    with pytest.raises(HenotaceError):
+        list(InMemoryConnector().iter_export(start_after='gone'))
+
+
+@pytest.mark.parametrize('factory', [
+    lambda tmp: InMemoryConnector(),
+    lambda tmp: SQLiteConnector(str(tmp / 'target.db')),
+    lambda tmp: LogConnector(str(tmp / 'log'), fsync='never'),
+], ids=['inmemory', 'sqlite', 'log'])
+def test_ndjson_round_trip(tmp_path, factory):
+    source = populate(SQLiteConnector(str(tmp_path / 'source.db')))
+    path = str(tmp_path / 'export.ndjson')
+    reports = []
+    stats = export_ndjson(source, path, chunk_size=2, progress=reports.append, progress_every=5)
+    assert stats.students == 4 and stats.tutors == 8 and stats.chats == 20
+    assert stats.bytes == os.path.getsize(path) and stats.records_per_second > 0
+    assert len(reports) == stats.records // 5 + 1
+
+    target = factory(tmp_path)
+    imported = import_ndjson(target, path, batch_size=3)
+    assert imported.records == stats.records
+    assert snapshot(target) == snapshot(source)
+
+
+def test_export_resumes_from_checkpoint(tmp_path):
+    class Flaky(InMemoryConnector):
+        fail = True
+
+        def list_tutors(self, student_id):
+            if student_id == 's2' and self.fail:
+                self.fail = False
+                raise RuntimeError('disk went away')
+            return super().list_tutors(student_id)
+
+    source = populate(Flaky())
+    path, checkpoint = str(tmp_path / 'export.ndjson'), str(tmp_path / 'export.ckpt')
+    with pytest.raises(RuntimeError):
+        export_ndjson(source, path, checkpoint=checkpoint)
+    assert json.load(open(checkpoint))['student_id'] == 's1'
+
+    stats = export_ndjson(source, path, checkpoint=checkpoint)
+    assert stats.students == 2 and not os.path.exists(checkpoint)
+    target = InMemoryConnector()
+    import_ndjson(target, path)
+    assert snapshot(target) == snapshot(source)
+
+
+def test_import_resumes_without_duplicating_chats(tmp_path):
+    path, checkpoint = str(tmp_path / 'export.ndjson'), str(tmp_path / 'import.ckpt')
+    source = populate(InMemoryConnector(), students=6)
+    export_ndjson(source, path, chunk_size=2)
+
+    class Flaky(SQLiteConnector):
+        calls = 0
+
+        def append_chats(self, student_id, tutor_id, chats):
+            self.calls += 1
+            if self.calls == 10:
+                raise RuntimeError('crash')
+            super().append_chats(student_id, tutor_id, chats)
+
+    target = Flaky(str(tmp_path / 'target.db'))
+    with pytest.raises(RuntimeError):
+        import_ndjson(target, path, checkpoint=checkpoint, batch_size=4)
+    assert os.path.exists(checkpoint)
+
+    stats = import_ndjson(target, path, checkpoint=checkpoint, batch_size=4)
+    assert 0 < stats.records < len(open(path).readlines())
+    assert snapshot(target) == snapshot(source)
+    assert not os.path.exists(checkpoint)
+
+
+@pytest.mark.parametrize('factory', [
+    lambda tmp: InMemoryConnector(),
+    lambda tmp: SQLiteConnector(str(tmp / 'target.db')),
+    lambda tmp: LogConnector(str(tmp / 'log'), fsync='never'),
+], ids=['inmemory', 'sqlite', 'log'])
+def test_migrate_copies_and_verifies(tmp_path, factory):
+    source = populate(SQLiteConnector(str(tmp_path / 'source.db')), students=20)
+    target = factory(tmp_path)
+    reports = []
+    stats = migrate(source, target, workers=3, batch_size=4, chunk_size=2,
+                    progress=reports.append, progress_every=10)
+    assert stats.students == 20 and stats.tutors == 40 and stats.chats == 100
+    assert stats.verified == 20 and stats.mismatched == [] and stats.records_per_second > 0
+    assert len(reports) >= stats.records // 20 and reports[-1] is stats
+    assert sorted(snapshot(target)) == sorted(snapshot(source))
+
+    target.append_chat('s3', 't1', SessionChat(message='extra', is_reply=False))
+    target.upsert_tutor('s5', SessionTutor(id='t1', name='Renamed', subject=SUBJECT))
+    target.delete_student('s7')
+    assert verify_migration(source, target) == ['s3', 's5', 's7']
+
+
+def test_migrate_resumes_from_checkpoint(tmp_path):
+    source = populate(InMemoryConnector(), students=12)
+    checkpoint = str(tmp_path / 'migrate.ckpt')
+
+    class Flaky(SQLiteConnector):
+        calls = 0
+
+        def bulk_import(self, records):
+            self.calls += 1
+            if self.calls == 4:
+                raise RuntimeError('crash')
+            return super().bulk_import(records)
+
+    target = Flaky(str(tmp_path / 'target.db'))
+    with pytest.raises(RuntimeError):
+        migrate(source, target, workers=2, batch_size=6, checkpoint=checkpoint)
+    state = json.load(open(checkpoint))
+    assert state['after'] or state['done']
+
+    stats = migrate(source, target, workers=2, batch_size=6, checkpoint=checkpoint)
+    assert 0 < stats.skipped < 12 and stats.students == 12 - stats.skipped
+    assert stats.verified == 12 and not os.path.exists(checkpoint)
+    assert sorted(snapshot(target)) == sorted(snapshot(source))
+
+
+@pytest.mark.asyncio
+async def test_async_export_and_import():
+    source = AsyncConnectorAdapter(populate(InMemoryConnector(), students=2))
+    records = [r async for r in source.iter_export(chunk_size=3)]
+    target = InMemoryConnector()
+    assert await AsyncConnectorAdapter(target).bulk_import(records) == len(records)
+    assert snapshot(target) == snapshot(source.connector)
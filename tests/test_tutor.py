@@ -0,0 +1,479 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+import sys
+sys.path.append('..')
+from src.henotace_ai import (
+    HenotaceAI, Tutor, create_tutor, InMemoryConnector, SQLiteConnector, AsyncStorageConnector,
+    AsyncConnectorAdapter, HenotaceError, SessionChat, SessionStudent, SessionTutor, SessionSubject,
+    SlidingWindowStrategy, WriteBehindConnector, FileChatArchive, SQLiteChatArchive
+)
+
+
+def make_tutor(storage=None):
+    sdk = HenotaceAI(api_key="test_key", logging={'enabled': False})
+    sdk.complete_chat = lambda **kwargs: {'ai_response': 'ok'}
+    storage = storage or InMemoryConnector()
+    storage.upsert_tutor('s1', SessionTutor(
+        id='t1', name='t1', subject=SessionSubject(id='general', name='General', topic='')
+    ))
+    return Tutor(sdk, 's1', 't1', storage)
+
+
+def fill(tutor, count):
+    for i in range(count):
+        tutor.storage.append_chat('s1', 't1', SessionChat(
+            message=f"message {i} " + 'x' * 200, is_reply=bool(i % 2), timestamp=i
+        ))
+
+
+def test_summary_stays_bounded():
+    tutor = make_tutor()
+    tutor.set_compression(max_turns=4, summary_levels=3, summary_level_chars=600)
+
+    for _ in range(200):
+        fill(tutor, 10)
+        tutor.compress_history()
+
+    metadata = tutor.storage.list_tutors('s1')[0].metadata
+    levels = metadata['summary_levels']
+    assert len(levels) == 3
+    assert all(sum(len(c) for c in level) <= 600 for level in levels)
+    # Only the levels are stored; the summary is rendered into each request
+    assert 'summary' not in metadata
+    assert len(tutor.history()) == 4
+
+
+def test_header_renders_newest_summary_first_within_budget():
+    tutor = make_tutor()
+    tutor.metadata = {'grade': 9, 'summary_levels': [['recent ' + 'r' * 300, 'newest'], ['old ' + 'o' * 2000]]}
+    meta = tutor._get_header()['content'].split('[META] ', 1)[1]
+
+    assert len(meta) <= 1000
+    rendered = json.loads(meta)
+    assert rendered['grade'] == 9 and 'summary_levels' not in rendered
+    assert rendered['summary'].startswith('newest\n---\nrecent ')
+    assert rendered['summary'].endswith('...')
+
+
+def test_summary_uses_custom_summarizer():
+    calls = []
+
+    def summarizer(text, max_chars):
+        calls.append(max_chars)
+        return 'S'
+
+    tutor = make_tutor()
+    tutor.set_compression(max_turns=2, summary_level_chars=300, summarizer=summarizer)
+    for _ in range(10):
+        fill(tutor, 6)
+        tutor.compress_history()
+
+    assert calls
+    levels = tutor.storage.list_tutors('s1')[0].metadata['summary_levels']
+    assert 'S' in [chunk for level in levels for chunk in level]
+
+
+def test_legacy_flat_summary_is_seeded():
+    tutor = make_tutor()
+    record = tutor.storage.list_tutors('s1')[0]
+    record.metadata = {'summary': 'old notes'}
+    fill(tutor, 20)
+    tutor.compress_history()
+
+    metadata = tutor.storage.list_tutors('s1')[0].metadata
+    assert metadata['summary_levels'][0][0] == 'old notes'
+    assert 'summary' not in metadata
+    assert tutor.metadata == metadata
+
+
+@pytest.mark.asyncio
+async def test_background_compression_runs_after_reply():
+    tutor = make_tutor()
+    tutor.set_compression(max_turns=4, checkpoint_every=100, background=True)
+    fill(tutor, 8)
+
+    reply = await tutor.send('hello')
+    assert reply == 'ok'
+    await tutor.flush()
+
+    history = tutor.history()
+    assert len(history) == 4
+    assert history[-1].message == 'ok'
+    assert 'summary_levels' in tutor.metadata
+
+
+def test_compression_keeps_chats_appended_meanwhile():
+    tutor = make_tutor()
+
+    push = tutor._push_summary_chunk
+
+    def slow_push(levels, chunk):
+        # Simulate a turn landing while the summary is being built
+        fill(tutor, 2)
+        return push(levels, chunk)
+
+    tutor._push_summary_chunk = slow_push
+    tutor.set_compression(max_turns=2)
+    fill(tutor, 6)
+    tutor.compress_history()
+
+    messages = [chat.message[:10] for chat in tutor.history()]
+    assert len(messages) == 4
+    assert messages[:2] == ['message 4 ', 'message 5 ']
+    assert messages[2:] == ['message 0 ', 'message 1 ']
+
+
+@pytest.mark.asyncio
+async def test_header_is_compiled_once_and_invalidated():
+    tutor = make_tutor()
+    sent = []
+    tutor.sdk.complete_chat = lambda **kwargs: sent.append(kwargs) or {'ai_response': 'ok'}
+    calls = []
+    get_config = tutor.sdk.get_config
+    tutor.sdk.get_config = lambda: calls.append(1) or get_config()
+
+    tutor.set_persona('Be brief.')
+    await tutor.send('a')
+    await tutor.send('b')
+    assert len(calls) == 1
+    assert sent[-1]['history'][-1]['content'] == '[PERSONA] Be brief.'
+
+    tutor.set_user_profile({'grade': 5})
+    await tutor.send('c')
+    assert len(calls) == 2
+    assert '[USER] {"grade": 5}' in sent[-1]['history'][-1]['content']
+
+    tutor.sdk.default_preset = 'custom'
+    await tutor.send('d')
+    assert len(calls) == 3
+    assert sent[-1]['preset'] == 'custom'
+
+
+@pytest.mark.asyncio
+async def test_stable_prefix_layout():
+    tutor = make_tutor()
+    sent = []
+    tutor.sdk.complete_chat = lambda **kwargs: sent.append(kwargs) or {'ai_response': 'ok'}
+    tutor.set_persona('Be brief.')
+    tutor.set_context('Unit 3')
+    tutor.set_prompt_layout('stable_prefix')
+
+    await tutor.send('first', context='page 12')
+    first_hash = tutor.last_prefix_hash
+    await tutor.send('second')
+
+    history = sent[-1]['history']
+    assert history[0]['content'] == '[PERSONA] Be brief.'
+    assert history[1]['content'] == '[CONTEXT]\nUnit 3'
+    assert history[0] == sent[0]['history'][0] and history[1] == sent[0]['history'][1]
+    assert sent[0]['history'][-1]['content'] == '[CONTEXT]\npage 12'
+    assert tutor.last_prefix_hash == first_hash
+
+    tutor.set_persona('Be thorough.')
+    await tutor.send('third')
+    assert tutor.last_prefix_hash != first_hash
+
+    with pytest.raises(ValueError):
+        tutor.set_prompt_layout('sideways')
+
+
+def test_compression_respects_pinned_head():
+    from src.henotace_ai import HeadTailStrategy
+    tutor = make_tutor()
+    tutor.set_history_strategy(HeadTailStrategy(head=2, tail=4))
+    tutor.set_compression(max_turns=4)
+    fill(tutor, 20)
+    tutor.compress_history()
+
+    messages = [chat.message.split()[1] for chat in tutor.history()]
+    assert messages == ['0', '1', '16', '17', '18', '19']
+
+
+@pytest.mark.parametrize('archive', [
+    lambda tmp: FileChatArchive(str(tmp / 'archive')),
+    lambda tmp: SQLiteChatArchive(str(tmp / 'archive.db'), compression=None),
+], ids=['file', 'sqlite'])
+def test_compression_archives_older_chats(tmp_path, archive):
+    from src.henotace_ai import HeadTailStrategy
+    tutor = make_tutor()
+    tutor.set_archive(archive(tmp_path))
+    tutor.set_history_strategy(HeadTailStrategy(head=2, tail=4))
+    tutor.set_compression(max_turns=4)
+    for _ in range(3):
+        fill(tutor, 10)
+        tutor.compress_history()
+
+    assert len(tutor.history()) == 6
+    assert tutor.archive.count('s1', 't1') == 24
+    messages = [chat.message.split()[1] for chat in tutor.full_history()]
+    assert messages == ['0', '1'] + [str(i) for i in range(2, 10)] + [str(i) for i in range(10)] * 2
+    assert [c.timestamp for c in tutor.full_history()][:4] == [0, 1, 2, 3]
+
+    tutor.archive.delete('s1', 't1')
+    assert len(list(tutor.full_history())) == 6
+    tutor.archive.close()
+
+
+def test_file_archive_ignores_torn_frame(tmp_path):
+    archive = FileChatArchive(str(tmp_path), compression='zlib')
+    archive.append('s1', 't1', [SessionChat(message='kept', is_reply=False, timestamp=1)])
+    path = archive._path('s1', 't1')
+    with open(path, 'ab') as f:
+        f.write(b'\x40\x00\x00\x00partial')
+    assert [c.message for c in archive.iter_chats('s1', 't1')] == ['kept']
+    archive.append('s1', 't1', [SessionChat(message='next', is_reply=True, timestamp=2)])
+    assert [c.message for c in archive.iter_chats('s1', 't1')] == ['kept', 'next']
+    assert archive.count('s1', 't1') == 2
+
+    with pytest.raises(HenotaceError):
+        list(FileChatArchive(str(tmp_path), compression=None).iter_chats('s1', 't1'))
+
+
+def test_file_archive_scans_frames_only_on_first_append(tmp_path, monkeypatch):
+    archive = FileChatArchive(str(tmp_path), compression='zlib')
+    archive.append('s1', 't1', [SessionChat(message='first', is_reply=False, timestamp=0)])
+    scans = []
+    frames = FileChatArchive._frames
+    monkeypatch.setattr(FileChatArchive, '_frames', staticmethod(lambda f: scans.append(1) or frames(f)))
+    for i in range(1, 20):
+        archive.append('s1', 't1', [SessionChat(message=str(i), is_reply=False, timestamp=i)])
+    assert scans == []
+
+    reopened = FileChatArchive(str(tmp_path), compression='zlib')
+    reopened.append('s1', 't1', [SessionChat(message='20', is_reply=False, timestamp=20)])
+    assert len(scans) == 1
+    assert [c.message for c in reopened.iter_chats('s1', 't1')] == ['first'] + [str(i) for i in range(1, 21)]
+
+
+def test_file_archive_bounds_remembered_tails(tmp_path):
+    archive = FileChatArchive(str(tmp_path), compression=None, max_tails=2)
+    for t in range(5):
+        archive.append('s1', f"t{t}", [SessionChat(message=f"m{t}", is_reply=False, timestamp=t)])
+    assert len(archive._tails) == 2
+    # A tutor whose tail was dropped rescans and appends in place
+    archive.append('s1', 't0', [SessionChat(message='again', is_reply=False, timestamp=9)])
+    assert [c.message for c in archive.iter_chats('s1', 't0')] == ['m0', 'again']
+    assert len(archive._tails) == 2
+
+
+@pytest.mark.asyncio
+async def test_send_and_compress_with_sqlite(tmp_path):
+    tutor = make_tutor(SQLiteConnector(str(tmp_path / 'store.db')))
+    tutor.set_compression(max_turns=4, checkpoint_every=100)
+    fill(tutor, 9)
+
+    await tutor.send('hello')
+    history = tutor.history()
+    assert [chat.message for chat in history[-2:]] == ['hello', 'ok']
+    assert len(history) == 6
+    assert 'summary_levels' in tutor.storage.list_tutors('s1')[0].metadata
+
+
+class CountingConnector(InMemoryConnector):
+    """InMemoryConnector that records which storage methods were called"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def __getattribute__(self, name):
+        attr = object.__getattribute__(self, name)
+        if callable(attr) and not name.startswith('_'):
+            object.__getattribute__(self, 'calls').append(name)
+        return attr
+
+
+@pytest.mark.asyncio
+async def test_turn_is_one_storage_write():
+    storage = CountingConnector()
+    tutor = make_tutor(storage)
+    storage.calls.clear()
+
+    await tutor.send('hello')
+    writes = [c for c in storage.calls if not c.startswith(('list_', 'get_', 'count_', 'lock_'))]
+    assert writes == ['append_chats']
+    assert [chat.message for chat in tutor.history()] == ['hello', 'ok']
+
+
+class LegacyConnector(InMemoryConnector):
+    """Connector written before list_chats took window arguments"""
+
+    def list_chats(self, student_id, tutor_id):
+        return super().list_chats(student_id, tutor_id)
+
+
+class WindowRecorder(InMemoryConnector):
+    """InMemoryConnector that records the window arguments of list_chats"""
+
+    def __init__(self):
+        super().__init__()
+        self.windows = []
+
+    def list_chats(self, student_id, tutor_id, **window):
+        self.windows.append(window)
+        return super().list_chats(student_id, tutor_id, **window)
+
+
+@pytest.mark.asyncio
+async def test_send_reads_a_bounded_window():
+    storage = WindowRecorder()
+    tutor = make_tutor(storage)
+    tutor.set_compression(checkpoint_every=1000, max_turns=1000)
+    fill(tutor, 300)
+    tutor.set_history_strategy(SlidingWindowStrategy(max_chats=4))
+
+    await tutor.send('hello')
+    assert storage.windows == [{'limit': 4}]
+    assert len(tutor.history(limit=2)) == 2
+
+    legacy = make_tutor(LegacyConnector())
+    fill(legacy, 5)
+    assert [c.timestamp for c in legacy.history(limit=2, reverse=True)] == [4, 3]
+
+    legacy.storage = AsyncConnectorAdapter(legacy.storage)
+    assert len(await legacy.storage.list_chats('s1', 't1')) == 5
+    assert [c.timestamp for c in await legacy.ahistory(limit=2, reverse=True)] == [4, 3]
+
+
+def test_list_chats_type_errors_propagate():
+    class Broken(InMemoryConnector):
+        def list_chats(self, student_id, tutor_id, limit=None, before_ts=None, after_ts=None, reverse=False):
+            if limit is not None:
+                raise TypeError('bug inside list_chats')
+            return super().list_chats(student_id, tutor_id)
+
+    tutor = make_tutor(Broken())
+    # Not taken for a connector without window arguments and retried unwindowed
+    with pytest.raises(TypeError, match='bug inside'):
+        tutor.history(limit=2)
+
+
+@pytest.mark.asyncio
+async def test_create_tutor_keeps_existing_history():
+    sdk = HenotaceAI(api_key="test_key", logging={'enabled': False})
+    storage = InMemoryConnector()
+    storage.append_chat('s1', 'math', SessionChat(message='earlier', is_reply=False, timestamp=1))
+
+    tutor = await create_tutor(sdk, 's1', tutor_name='math', storage=storage)
+    assert [chat.message for chat in tutor.history()] == ['earlier']
+    assert storage.list_tutors('s1')[0].name == 'math'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('factory', [
+    lambda tmp: InMemoryConnector(),
+    lambda tmp: SQLiteConnector(str(tmp / 'store.db')),
+], ids=['inmemory', 'sqlite'])
+async def test_create_tutor_updates_only_given_fields(tmp_path, factory):
+    sdk = HenotaceAI(api_key="test_key", logging={'enabled': False})
+    storage = factory(tmp_path)
+    storage.upsert_student(SessionStudent(id='s1', name='Ada'))
+    storage.upsert_tutor('s1', SessionTutor(
+        id='math', name='math', subject=SessionSubject(id='math', name='Math', topic='algebra'),
+        persona='Patient', context=['Unit 3']
+    ))
+    storage.append_chat('s1', 'math', SessionChat(message='earlier', is_reply=False, timestamp=1))
+
+    await create_tutor(sdk, 's1', tutor_name='math', storage=storage)
+    stored = storage.get_tutor('s1', 'math')
+    assert stored.subject.topic == 'algebra'
+    assert stored.persona == 'Patient' and stored.context == ['Unit 3']
+
+    geometry = SessionSubject(id='math', name='Math', topic='geometry')
+    tutor = await create_tutor(sdk, 's1', tutor_name='math', subject=geometry, storage=storage)
+    stored = storage.get_tutor('s1', 'math')
+    assert stored.subject == geometry
+    assert stored.persona == 'Patient' and stored.context == ['Topic: geometry']
+    assert [chat.message for chat in tutor.history()] == ['earlier']
+    assert storage.list_student_headers()[0].name == 'Ada'
+
+
+@pytest.mark.asyncio
+async def test_send_and_compress_with_write_behind(tmp_path):
+    inner = SQLiteConnector(str(tmp_path / 'store.db'))
+    tutor = make_tutor(WriteBehindConnector(inner, flush_interval=None))
+    tutor.set_compression(max_turns=4, checkpoint_every=100)
+    fill(tutor, 9)
+    tutor.set_persona('Patient')
+
+    await tutor.send('hello')
+    assert [chat.message for chat in tutor.history()[-2:]] == ['hello', 'ok']
+    tutor.storage.close()
+    assert len(inner.list_chats('s1', 't1')) == 6
+    assert inner.list_tutors('s1')[0].persona == 'Patient'
+
+
+def test_threaded_sends_keep_turns_intact():
+    first = make_tutor()
+    tutors = [first] + [Tutor(first.sdk, 's1', 't1', first.storage) for _ in range(7)]
+    for tutor in tutors:
+        tutor.set_compression(max_turns=1000, checkpoint_every=10000)
+
+    def chat(n):
+        for i in range(25):
+            asyncio.run(tutors[n].send(f"{n}:{i}"))
+
+    threads = [threading.Thread(target=chat, args=(n,)) for n in range(len(tutors))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    chats = first.history()
+    assert len(chats) == 8 * 25 * 2
+    assert all(not q.is_reply and a.message == 'ok' for q, a in zip(chats[::2], chats[1::2]))
+
+
+class SlowAsyncConnector(AsyncStorageConnector):
+    """Async connector over an InMemoryConnector with simulated network latency"""
+
+    def __init__(self, delay=0.02):
+        self.inner = InMemoryConnector()
+        self.delay = delay
+
+    def __getattribute__(self, name):
+        if name in ('inner', 'delay') or name.startswith('__'):
+            return object.__getattribute__(self, name)
+        method = getattr(self.inner, name)
+
+        async def call(*args):
+            await asyncio.sleep(self.delay)
+            return method(*args)
+        return call
+
+
+@pytest.mark.asyncio
+async def test_async_connector_sessions_overlap():
+    sdk = HenotaceAI(api_key="test_key", logging={'enabled': False})
+    sdk.complete_chat = lambda **kwargs: {'ai_response': 'ok'}
+    storage = SlowAsyncConnector()
+    tutors = [await create_tutor(sdk, f"s{i}", tutor_name='t', storage=storage) for i in range(10)]
+    tutors[0].set_persona('Kind')
+    await tutors[0].flush()
+    assert storage.inner.list_tutors('s0')[0].persona == 'Kind'
+
+    start = time.perf_counter()
+    replies = await asyncio.gather(*(tutor.send('hi') for tutor in tutors))
+    elapsed = time.perf_counter() - start
+
+    assert replies == ['ok'] * 10
+    assert [len(await tutor.ahistory()) for tutor in tutors] == [2] * 10
+    # Four storage round trips per send; serialized that would be 10 * 4 * 20ms
+    assert elapsed < 0.4
+
+
+@pytest.mark.asyncio
+async def test_async_adapter_with_background_compression():
+    tutor = make_tutor()
+    tutor.storage = AsyncConnectorAdapter(tutor.storage)
+    tutor.set_compression(max_turns=4, checkpoint_every=100, background=True)
+    for _ in range(6):
+        await tutor.send('hello')
+    await tutor.flush()
+
+    assert len(await tutor.ahistory()) <= 8
+    with pytest.raises(HenotaceError):
+        tutor.history()
@@ -0,0 +1,42 @@
+import sys
+sys.path.append('..')
+from src.henotace_ai import (
+    SessionChat, SlidingWindowStrategy, HeadTailStrategy,
+    SizeWeightedStrategy, ImportanceScoredStrategy
+)
+
+
+def chats(count, size=10):
+    return [SessionChat(message=f"{i:<{size}}", is_reply=bool(i % 2), timestamp=i) for i in range(count)]
+
+
+def stamps(selected):
+    return [chat.timestamp for chat in selected]
+
+
+def test_sliding_window():
+    assert stamps(SlidingWindowStrategy(3).select(chats(10))) == [7, 8, 9]
+    assert stamps(SlidingWindowStrategy(0).select(chats(10))) == []
+    assert SlidingWindowStrategy(3).fetch_limit() == 3
+
+
+def test_head_tail_keeps_opening_turns():
+    strategy = HeadTailStrategy(head=2, tail=3)
+    assert stamps(strategy.select(chats(10))) == [0, 1, 7, 8, 9]
+    assert stamps(strategy.select(chats(4))) == [0, 1, 2, 3]
+    assert strategy.pinned() == 2
+    assert strategy.fetch_limit() is None
+
+
+def test_size_weighted_budget():
+    assert stamps(SizeWeightedStrategy(max_size=35).select(chats(10))) == [7, 8, 9]
+    assert stamps(SizeWeightedStrategy(max_size=6, measure='tokens').select(chats(10))) == [8, 9]
+
+
+def test_importance_keeps_recent_and_important():
+    history = chats(10)
+    history[3] = SessionChat(message='Remember: my exam is Friday?', is_reply=False, timestamp=3)
+    selected = ImportanceScoredStrategy(max_chars=70, recent=2).select(history)
+    assert stamps(selected)[-2:] == [8, 9]
+    assert 3 in stamps(selected)
+    assert stamps(selected) == sorted(stamps(selected))